@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, connection
 from aplicaciones.proyectos.models import Proyectos
 
 # Create your models here.
@@ -12,6 +12,8 @@ class Fases(models.Model):
     fecha_inicio: Campo de tipo fecha que contendra la fecha de inicio de la fase.
     duracion: campo de tipo numerico que contendra la duracion de la fase en semanas.
     is_active: campo de tipo logico que indicara si la fase esta eliminada.
+    version_dibujo: cambia, con un valor nuevo de la secuencia proyectos_versiones_seq, cada vez que se modifican los items
+    de la fase o las relaciones que llegan a ella. El dibujo de la fase se guarda en cache indexado por ella.
     Las fases seran ordenadas en la tabla por nombre.
     
     @author:  Romina Diaz de Bedoya 
@@ -25,6 +27,7 @@ class Fases(models.Model):
     duracion = models.IntegerField(null=True)
     proyecto = models.ForeignKey(Proyectos)
     is_active = models.BooleanField(default=True)
+    version_dibujo = models.BigIntegerField(default=0)
     
     class Meta:
         permissions = (
@@ -34,3 +37,25 @@ class Fases(models.Model):
     
     def __unicode__ (self):
         return self.nombre
+    
+    def save(self, *args, **kwargs):
+        
+        """ Al guardar una fase existente no se escribe version_dibujo, que solo cambia con incrementar_versiones_fase,
+        para no volver a una version anterior leida con la fase. """
+        
+        if not self._state.adding and not kwargs.get('update_fields') and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [campo.name for campo in self._meta.concrete_fields if not campo.primary_key and campo.name != 'version_dibujo']
+        super(Fases, self).save(*args, **kwargs)
+
+INCREMENTAR_VERSIONES = "UPDATE fases_fases SET version_dibujo = nextval('proyectos_versiones_seq') WHERE id = ANY(%s)"
+
+def incrementar_versiones_fase(*ids_fases):
+    
+    """ Informa que cambiaron los items de las fases indicadas o las relaciones que llegan a ellas, para que solo
+    se vuelvan a dibujar esas fases. Debe llamarse en la misma transaccion que hace los cambios, de modo que los
+    demas procesos vean la nueva version recien cuando se confirman. """
+    
+    ids_fases = sorted(set(int(id_fase) for id_fase in ids_fases if id_fase is not None))
+    if ids_fases:
+        cursor = connection.cursor()
+        cursor.execute(INCREMENTAR_VERSIONES, [ids_fases])
@@ -0,0 +1,23 @@
+from datetime import datetime
+from .models import Fases
+
+def importar_fase(trabajo, id_proyecto, id_fase, nombre, descripcion, duracion):
+
+    """ Tarea de procesar_trabajos que crea en el proyecto una fase importada de otro proyecto.
+
+    @type id_fase: entero.
+    @param id_fase: id de la fase importada.
+
+    @rtype: diccionario.
+    @return: id de la fase creada.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    #El nombre se valido al encolar, pero otro trabajo pudo crear una fase con el mismo nombre
+    if Fases.objects.filter(nombre=nombre, is_active=True, proyecto_id=id_proyecto).exclude(id=id_fase).exists():
+        raise ValueError('El nombre de Fase ya existe')
+    fase = Fases.objects.create(nombre=nombre, descripcion=descripcion, estado='DF', fechainicio=datetime.now(), duracion=duracion,
+                                proyecto_id=id_proyecto, is_active=True)
+    return {'id_fase':fase.id}
@@ -3,6 +3,8 @@ from django.test.client import RequestFactory
 from django.contrib.auth.models import User
 from .models import Fases
 from aplicaciones.proyectos.models import Proyectos
+from django.core.management import call_command
+from StringIO import StringIO
 from .views import adm_fases, crear_fase, consultar_fase, eliminar_fase, modificar_fase, importar_fase, importarf
 
 # Create your tests here.
@@ -98,6 +100,7 @@ class test_fase(TestCase):
         request.user = self.user
         response = importarf(request, 1, 1)
         self.assertEqual(response.status_code, 200)
+        call_command('procesar_trabajos', una_vez=True, stdout=StringIO())
         faseImportada = Fases.objects.get(nombre='Fase 15 imp')
         self.assertTrue(faseImportada)
         print 'Test de Importar fase ejecutado exitosamente.'
@@ -6,6 +6,7 @@ from django.http import HttpResponseRedirect, HttpResponse
 from django.template.context import RequestContext
 from forms import FaseNuevaForm, FaseModificadaForm, FaseModificadaFormProyectoActivo
 from .models import Fases
+from aplicaciones.trabajos.ejecucion import encolar
 from aplicaciones.proyectos.models import Proyectos
 from datetime import datetime
 from django.contrib.auth.decorators import login_required, permission_required
@@ -373,7 +374,7 @@ def importarf (request, id_proyecto, id_fase):
     """ Recibe un request y el id de la fase a ser importada, se verifica si el usuario tiene
     permisos para importar una fase existente, luego se lo redirige a la pagina para completar los
     datos del formulario de nueva fase importada, una vez completado correctamente el formulario el
-    sistema crea una nueva fase con las caracteristicas de la fase importada.
+    sistema encola la creacion de una nueva fase con las caracteristicas de la fase importada.
     
     @type request: django.http.HttpRequest.
     @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista importar.
@@ -383,7 +384,7 @@ def importarf (request, id_proyecto, id_fase):
     
     @rtype: django.shortcuts.render_to_response.
     @return: crearfaseimportada.html, donde se redirige al usuario para completar los datos de la nueva
-    fase importada o a fasealerta.html donde se notifica que la fase fue importada correctamente.
+    fase importada o a trabajo.html donde se muestra el avance de la importacion.
     
     @author:Romina Diaz de Bedoya.
     
@@ -421,11 +422,11 @@ def importarf (request, id_proyecto, id_fase):
                 template_name='Fases/crearfaseimportada.html'
                 return render_to_response(template_name, ctx, context_instance=RequestContext(request))
             
-            fase.save()
-                
-            mensaje="Fase importada exitosamente"
-            ctx = {'mensaje':mensaje, 'id_proyecto':id_proyecto}
-            return render_to_response('Fases/fasealerta.html',ctx, context_instance=RequestContext(request))
+            #La fase se crea en segundo plano y la pagina del trabajo muestra su avance
+            parametros = {'id_proyecto':int(id_proyecto), 'id_fase':faseImportada.id, 'nombre':nombre, 'descripcion':descripcion, 'duracion':duracion}
+            trabajo = encolar('aplicaciones.fases.tareas.importar_fase', parametros, 'Importar la fase %s como %s' % (faseImportada.nombre, nombre), request.user)
+            ctx = {'trabajo':trabajo}
+            return render_to_response('trabajos/trabajo.html',ctx, context_instance=RequestContext(request))
     else:
         data ={'Nombre_de_Fase':faseImportada.nombre, 'Descripcion':faseImportada.descripcion, 'Estado':faseImportada.estado, 'Duracion':faseImportada.duracion}   
         form = FaseModificadaForm(data)
@@ -0,0 +1,48 @@
+from django.core.management.base import NoArgsCommand
+from django.db import connection, transaction
+
+""" Columnas agregadas a tablas existentes, que syncdb no crea en una base de datos ya instalada: tabla,
+columna, definicion y sentencia opcional para completar las filas existentes """
+COLUMNAS = (
+    ('proyectos_proyectos', 'version_relaciones', 'bigint NOT NULL DEFAULT 0', None),
+    ('fases_fases', 'version_dibujo', 'bigint NOT NULL DEFAULT 0', None),
+    ('relaciones_relaciones', 'fecha_baja', 'timestamp with time zone NULL',
+     'UPDATE relaciones_relaciones SET fecha_baja = now() WHERE is_active = false AND fecha_baja IS NULL'),
+)
+
+""" Secuencias creadas despues de instalar el sistema """
+SECUENCIAS = ('proyectos_versiones_seq',)
+
+EXISTE_COLUMNA = "SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = %s"
+EXISTE_SECUENCIA = "SELECT 1 FROM pg_class WHERE relkind = 'S' AND relname = %s"
+
+class Command(NoArgsCommand):
+    
+    """ Agrega a una base de datos existente las columnas que se incorporaron a los modelos despues de crear
+    sus tablas, completa sus valores en las filas existentes y crea las secuencias que usan. Debe ejecutarse
+    al actualizar el sistema, antes de iniciar el servidor, ya que los modelos consultan esas columnas. Solo
+    agrega lo que falta, de modo que puede ejecutarse mas de una vez. En una base nueva syncdb ya crea las
+    columnas y las secuencias.
+    
+    Uso: python manage.py actualizar_base
+    """
+    
+    help = 'Agrega las columnas nuevas de los modelos a una base de datos existente.'
+    
+    def handle_noargs(self, **options):
+        agregadas = 0
+        with transaction.atomic():
+            cursor = connection.cursor()
+            for secuencia in SECUENCIAS:
+                cursor.execute(EXISTE_SECUENCIA, [secuencia])
+                if not cursor.fetchone():
+                    cursor.execute('CREATE SEQUENCE %s' % secuencia)
+            for tabla, columna, definicion, completar in COLUMNAS:
+                cursor.execute(EXISTE_COLUMNA, [tabla, columna])
+                if cursor.fetchone():
+                    continue
+                cursor.execute('ALTER TABLE %s ADD COLUMN %s %s' % (tabla, columna, definicion))
+                if completar:
+                    cursor.execute(completar)
+                agregadas = agregadas + 1
+        self.stdout.write('%s columnas agregadas' % agregadas)
@@ -0,0 +1,31 @@
+from django.core.management import call_command
+from django.core.management.base import NoArgsCommand
+from django.core.management.color import no_style
+from django.core.management.sql import custom_sql_for_model
+from django.db import connection, transaction
+from django.db.models import get_apps, get_models
+
+class Command(NoArgsCommand):
+    
+    """ Ejecuta los archivos sql/<modelo>.postgresql_psycopg2.sql de todas las aplicaciones, que
+    contienen los indices de las consultas mas frecuentes. syncdb solo los ejecuta al crear cada
+    tabla, por lo que este comando permite agregarlos a una base de datos ya existente. Antes ejecuta
+    actualizar_base, ya que algunos indices usan columnas nuevas. Los indices se crean con IF NOT
+    EXISTS, de modo que puede ejecutarse mas de una vez.
+    
+    Uso: python manage.py crear_indices
+    """
+    
+    help = 'Crea los indices definidos en los archivos sql de las aplicaciones sobre una base existente.'
+    
+    def handle_noargs(self, **options):
+        call_command('actualizar_base', stdout=self.stdout)
+        ejecutadas = 0
+        with transaction.atomic():
+            cursor = connection.cursor()
+            for app in get_apps():
+                for modelo in get_models(app):
+                    for sentencia in custom_sql_for_model(modelo, no_style(), connection):
+                        cursor.execute(sentencia)
+                        ejecutadas = ejecutadas + 1
+        self.stdout.write('%s sentencias ejecutadas' % ejecutadas)
@@ -0,0 +1,71 @@
+from optparse import make_option
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from aplicaciones.items.models import Items, ValorItem, ValorAtributo, ItemVersionSnapshot
+from aplicaciones.items.views import CAMPOS_VALOR, consultar_valores, serializar_atributos
+
+class Command(BaseCommand):
+    
+    """ Genera los ItemVersionSnapshot que faltan para las versiones ya existentes de los items.
+    Por cada item se leen una sola vez sus filas de ValorItem y se recorren las versiones en orden
+    ascendente aplicando las diferencias de cada una, de modo que el costo es lineal en la cantidad
+    de filas del item y no en versiones por atributos.
+    
+    Uso: python manage.py generar_snapshots [--proyecto=ID]
+    """
+    
+    help = 'Genera las fotos materializadas de todas las versiones de los items.'
+    option_list = BaseCommand.option_list + (
+        make_option('--proyecto', action='store', type='int', dest='proyecto', default=None,
+                    help='Limita la generacion a los items de un proyecto.'),
+    )
+    
+    def handle(self, *args, **options):
+        items = Items.objects.order_by('id')
+        if options['proyecto']:
+            items = items.filter(proyecto_id=options['proyecto'])
+        generados = 0
+        for item in items.iterator():
+            generados = generados + self.generar(item)
+        self.stdout.write('%s snapshots generados' % generados)
+    
+    def generar(self, item):
+        existentes = set(ItemVersionSnapshot.objects.filter(item_id=item.id).values_list('version', flat=True))
+        faltantes = [version for version in range(1, item.version + 1) if version not in existentes]
+        if not faltantes:
+            return 0
+        
+        filas_por_version = {}
+        for fila in ValorItem.objects.filter(item_id=item.id, version__lte=item.version):
+            filas_por_version.setdefault(fila.version, []).append(fila)
+        
+        # Se aplican las diferencias version a version sobre el estado vigente de cada atributo
+        vigentes = {}
+        estados = {}
+        for version in range(1, faltantes[-1] + 1):
+            for fila in filas_por_version.get(version, []):
+                vigentes[fila.nombre_atributo] = fila
+            if version in faltantes:
+                estados[version] = sorted([fila for fila in vigentes.values() if fila.valor_id is not None], key=lambda fila: fila.orden)
+        
+        # Los valores se resuelven una sola vez por tabla para todas las versiones del item
+        filas = dict((fila.id, fila) for estado in estados.values() for fila in estado)
+        valores_por_tabla = consultar_valores(filas.values())
+        por_fila = {}
+        for fila in filas.values():
+            campo = CAMPOS_VALOR.get(fila.tipo_dato)
+            if not campo:
+                continue
+            valorfuturo = ValorAtributo(fila.nombre_atributo, fila.tipo_dato, fila.orden)
+            valor = valores_por_tabla.get(fila.tabla_valor_nombre, {}).get(fila.valor_id)
+            if valor is not None:
+                setattr(valorfuturo, campo, valor.valor)
+            por_fila[fila.id] = valorfuturo
+        
+        snapshots = []
+        for version in faltantes:
+            lista_valores = [por_fila[fila.id] for fila in estados[version] if fila.id in por_fila]
+            snapshots.append(ItemVersionSnapshot(item_id=item.id, version=version, atributos=serializar_atributos(lista_valores)))
+        with transaction.atomic():
+            ItemVersionSnapshot.objects.bulk_create(snapshots)
+        return len(snapshots)
@@ -0,0 +1,37 @@
+from optparse import make_option
+from django.core.management.base import BaseCommand
+from aplicaciones.items.models import Items, indexar_item
+from aplicaciones.items.views import indexar_atributos
+
+class Command(BaseCommand):
+    
+    """ Carga o reconstruye el indice de busqueda de texto completo (ItemBusqueda) para los items ya
+    existentes. Los items se procesan por lotes, cargando los atributos de cada lote de una vez.
+    
+    Uso: python manage.py indexar_busqueda [--proyecto=ID] [--lote=N]
+    """
+    
+    help = 'Reconstruye el indice de busqueda de texto completo de los items.'
+    option_list = BaseCommand.option_list + (
+        make_option('--proyecto', action='store', type='int', dest='proyecto', default=None,
+                    help='Limita la indexacion a los items de un proyecto.'),
+        make_option('--lote', action='store', type='int', dest='lote', default=500,
+                    help='Cantidad de items indexados por vez.'),
+    )
+    
+    def handle(self, *args, **options):
+        items = Items.objects.order_by('id')
+        if options['proyecto']:
+            items = items.filter(proyecto_id=options['proyecto'])
+        ultimo = 0
+        indexados = 0
+        while True:
+            lote = list(items.filter(id__gt=ultimo)[:options['lote']])
+            if not lote:
+                break
+            for item in lote:
+                indexar_item(Items, item)
+            indexar_atributos([item.id for item in lote])
+            indexados = indexados + len(lote)
+            ultimo = lote[-1].id
+        self.stdout.write('%s items indexados' % indexados)
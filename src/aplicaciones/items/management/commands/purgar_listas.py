@@ -0,0 +1,36 @@
+from optparse import make_option
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from aplicaciones.items.models import ListaValores
+from aplicaciones.relaciones.models import ListaRelaciones
+
+class Command(BaseCommand):
+    
+    """ Elimina las filas de ListaValores y ListaRelaciones que las vistas de items y relaciones
+    guardaban en cada consulta y que nunca vuelven a leerse. El borrado se hace por lotes de ids,
+    cada lote en su propia transaccion, para no mantener bloqueos largos sobre las tablas.
+    
+    Uso: python manage.py purgar_listas [--lote=N]
+    """
+    
+    help = 'Elimina las filas acumuladas en las tablas ListaValores y ListaRelaciones.'
+    option_list = BaseCommand.option_list + (
+        make_option('--lote', action='store', type='int', dest='lote', default=10000,
+                    help='Cantidad de filas eliminadas por transaccion.'),
+    )
+    
+    def handle(self, *args, **options):
+        lote = options['lote']
+        for modelo in (ListaValores, ListaRelaciones):
+            eliminadas = self.purgar(modelo, lote)
+            self.stdout.write('%s: %s filas eliminadas' % (modelo._meta.db_table, eliminadas))
+    
+    def purgar(self, modelo, lote):
+        eliminadas = 0
+        while True:
+            ids = list(modelo.objects.order_by('id').values_list('id', flat=True)[:lote])
+            if not ids:
+                return eliminadas
+            with transaction.atomic():
+                modelo.objects.filter(id__gte=ids[0], id__lte=ids[-1]).delete()
+            eliminadas = eliminadas + len(ids)
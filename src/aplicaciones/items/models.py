@@ -1,6 +1,7 @@
 from django.db import models
+from django.db.models.signals import post_save
 from aplicaciones.proyectos.models import Proyectos
-from aplicaciones.fases.models import Fases
+from aplicaciones.fases.models import Fases, incrementar_versiones_fase
 from aplicaciones.tipoitem.models import TipoItem
 
 # Create your models here.
@@ -16,7 +17,7 @@ class Items(models.Model):
     is_active: campo de tipo logico que indicara si la fase esta eliminada.
     Las fases seran ordenadas en la tabla por nombre.
     
-    @author:  Romina Díaz de Bedoya 
+    @author:  Romina Diaz de Bedoya 
     """
     
     nombre = models.CharField(max_length=30, null=True)
@@ -50,7 +51,84 @@ class ValorItem(models.Model):
     def __unicode__ (self):
         return self.valor_id
     
+class ItemVersionSnapshot(models.Model):
+    
+    """ El modelo ItemVersionSnapshot guarda, para cada version de un item, la lista completa y
+    ordenada de sus atributos ya resuelta, de manera que consultar o comparar una version cuesta
+    una sola consulta por (item, version) en lugar de reconstruirla desde ValorItem y las tablas
+    de valores. Se escribe al guardar los atributos de un item y al revertir una version.
+    item: item al que pertenece la version.
+    version: numero de version del item.
+    atributos: lista serializada en JSON de [nombre, tipo de dato, orden, valor] de cada atributo.
+    
+    @author: Romina Diaz de Bedoya
+    """
+    
+    item = models.ForeignKey(Items)
+    version = models.IntegerField()
+    atributos = models.TextField()
+    
+    class Meta:
+        unique_together = (('item', 'version'),)
+    
+    def __unicode__(self):
+        return u'%s v%s' % (self.item_id, self.version)
+
+""" Expresion tsvector sobre ItemBusqueda. Debe coincidir exactamente con la del indice GIN de
+sql/itembusqueda.postgresql_psycopg2.sql para que las busquedas lo utilicen """
+VECTOR_BUSQUEDA = ("(setweight(to_tsvector('spanish', coalesce(items_itembusqueda.nombre, '')), 'A') || "
+                   "setweight(to_tsvector('spanish', coalesce(items_itembusqueda.descripcion, '')), 'B') || "
+                   "setweight(to_tsvector('spanish', coalesce(items_itembusqueda.observaciones, '')), 'C') || "
+                   "setweight(to_tsvector('spanish', coalesce(items_itembusqueda.atributos, '')), 'D'))")
+
+class ItemBusqueda(models.Model):
+    
+    """ El modelo ItemBusqueda guarda el texto buscable de cada item, sobre el cual se define un
+    indice de texto completo (GIN) de PostgreSQL. Los campos del item se actualizan al guardarlo y
+    los valores de atributos Texto de la ultima version al guardar o revertir sus atributos.
+    item: item indexado.
+    proyecto: id del proyecto del item, para limitar la busqueda a un proyecto.
+    nombre, descripcion, observaciones: copia de los campos del item.
+    atributos: valores de los atributos de tipo Texto de la version actual del item.
+    
+    @author: Romina Diaz de Bedoya
+    """
+    
+    item = models.OneToOneField(Items, primary_key=True)
+    proyecto_id = models.IntegerField(db_index=True)
+    nombre = models.CharField(max_length=30, null=True)
+    descripcion = models.CharField(max_length=300, null=True)
+    observaciones = models.CharField(max_length=300, null=True)
+    atributos = models.TextField(blank=True, default='')
+    
+    def __unicode__(self):
+        return self.nombre
+
+def indexar_item(sender, instance, **kwargs):
+    
+    """ Actualiza los campos del item en ItemBusqueda cada vez que se guarda el item. """
+    
+    campos = {'proyecto_id': instance.proyecto_id, 'nombre': instance.nombre, 'descripcion': instance.descripcion, 'observaciones': instance.observaciones}
+    if not ItemBusqueda.objects.filter(item_id=instance.id).update(**campos):
+        ItemBusqueda.objects.create(item_id=instance.id, **campos)
+
+post_save.connect(indexar_item, sender=Items)
+
+def item_guardado(sender, instance, **kwargs):
+    
+    """ Cambia la version de dibujo de la fase del item cada vez que se crea, modifica o elimina el item. """
+    
+    incrementar_versiones_fase(instance.fase_id)
+
+post_save.connect(item_guardado, sender=Items)
+
 class ListaValores(models.Model):
+    
+    """ Tabla en desuso: las vistas ya no guardan filas en ella, los valores a desplegar se
+    construyen con ValorAtributo. Se mantiene para poder purgar las filas acumuladas con el
+    comando purgar_listas.
+    """
+    
     nombre_atributo = models.CharField(max_length=20, null=True)
     tipo_dato = models.CharField(max_length=20, null=True)
     valor_texto = models.CharField(max_length=300, null=True)
@@ -62,3 +140,29 @@ class ListaValores(models.Model):
     
     def __unicode__(self):
         return self.nombre_atributo
+
+class ValorAtributo(object):
+    
+    """ Proyeccion en memoria del valor de un atributo de una version de item, utilizada para
+    desplegar los atributos en los templates. A diferencia de ListaValores no se persiste en la
+    base de datos, por lo que cargar una version no genera escrituras.
+    Los campos son los mismos que los de ListaValores, mas valor_logico.
+    
+    @author: Romina Diaz de Bedoya
+    """
+    
+    __slots__ = ('nombre_atributo', 'tipo_dato', 'orden', 'valor_texto', 'valor_numerico',
+                 'valor_fecha', 'valor_logico', 'valor_archivoexterno')
+    
+    def __init__(self, nombre_atributo=None, tipo_dato=None, orden=None):
+        self.nombre_atributo = nombre_atributo
+        self.tipo_dato = tipo_dato
+        self.orden = orden
+        self.valor_texto = ""
+        self.valor_numerico = ""
+        self.valor_fecha = ""
+        self.valor_logico = ""
+        self.valor_archivoexterno = ""
+    
+    def __unicode__(self):
+        return self.nombre_atributo
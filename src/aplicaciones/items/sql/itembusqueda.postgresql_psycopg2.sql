@@ -0,0 +1,2 @@
+-- Indice de texto completo sobre ItemBusqueda. La expresion debe coincidir con VECTOR_BUSQUEDA de items/models.py
+CREATE INDEX IF NOT EXISTS items_itembusqueda_vector ON items_itembusqueda USING gin ((setweight(to_tsvector('spanish', coalesce(items_itembusqueda.nombre, '')), 'A') || setweight(to_tsvector('spanish', coalesce(items_itembusqueda.descripcion, '')), 'B') || setweight(to_tsvector('spanish', coalesce(items_itembusqueda.observaciones, '')), 'C') || setweight(to_tsvector('spanish', coalesce(items_itembusqueda.atributos, '')), 'D')));
@@ -0,0 +1,3 @@
+-- Indices de Items. Se crean al crear la tabla con syncdb; en bases existentes ejecutar "python manage.py crear_indices"
+-- Listado paginado de los items activos de una fase, ordenado por id
+CREATE INDEX IF NOT EXISTS items_items_fase_activos ON items_items (proyecto_id, fase_id, id) WHERE is_active = true;
@@ -0,0 +1,5 @@
+-- Indices de ValorItem. Se crean al crear la tabla con syncdb; en bases existentes ejecutar "python manage.py crear_indices"
+-- Carga de los atributos de una version de un item: filtro por proyecto, fase, item y version
+CREATE INDEX IF NOT EXISTS items_valoritem_version ON items_valoritem (proyecto_id, fase_id, item_id, version, orden);
+-- Estado vigente de cada atributo (DISTINCT ON item, nombre_atributo con la version mas reciente)
+CREATE INDEX IF NOT EXISTS items_valoritem_vigente ON items_valoritem (item_id, nombre_atributo, version DESC);
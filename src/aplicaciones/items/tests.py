@@ -1,3 +1,298 @@
 from django.test import TestCase
+from django.test.client import RequestFactory
+from django.contrib.auth.models import User
+from django.core.management import call_command
+import json
+from django.db import connection
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext
+from aplicaciones.pruebas import consultas_sin_cache, plan_consulta
+from aplicaciones.proyectos.models import Proyectos
+from aplicaciones.fases.models import Fases
+from aplicaciones.tipoitem.models import TipoItem, ListaAtributo
+from aplicaciones.tipoatributo.models import TipoAtributo, Texto, Numerico, Fecha, Logico, ArchivoExterno
+from .models import Items, ValorItem, ListaValores, ItemVersionSnapshot, ItemBusqueda
+from .views import atributos_version, atributos_items, atributos_snapshot, consultar_version, cargar_valores, revertir_version, comparar_versiones, revertir_fase, adm_items, buscar_items
 
-# Create your tests here.
+class test_items (TestCase):
+
+    def setUp(self):
+        """ Inicializamos la variable factory que posteriormente nos permitira cargar
+            un request para utilizarlo en las vistas, y creamos un proyecto con una fase,
+            un tipo de item y dos items con sus atributos.
+        """
+        self.factory = RequestFactory()
+        cache.clear()
+        self.user = User.objects.create_user('tester', 'tester@sicp.com', 'tester')
+        self.proyecto = Proyectos.objects.create(nombre='Proyecto Items', fecha_inicio='2014-04-17', duracion=2, estado='En Construccion')
+        self.fase = Fases.objects.create(nombre='Fase 1', estado='DR', proyecto=self.proyecto)
+        self.tipoitem = TipoItem.objects.create(nombre='Requerimiento', descripcion='ninguna', id_proyecto=self.proyecto.id)
+        for orden in range(1, 21):
+            tipo = 'Texto' if orden % 2 else 'Numerico'
+            tipoatributo = TipoAtributo.objects.create(nombre='Atributo %s' % orden, tipo=tipo, precision=2, longitud=10, descripcion='ninguna')
+            listaatributo = ListaAtributo.objects.create(id_atributo=tipoatributo.id, id_tipoitem=self.tipoitem.id, orden=orden, nombre=tipoatributo.nombre)
+            self.tipoitem.listaAtributo.add(listaatributo)
+        self.items = []
+        for nombre in ('Item 1', 'Item 2'):
+            item = Items.objects.create(nombre=nombre, version=2, estado='En Construccion', fase=self.fase, proyecto=self.proyecto, tipo_item=self.tipoitem)
+            self.items.append(item)
+            for orden in range(1, 21):
+                if orden % 2:
+                    valor = Texto.objects.create(valor='texto %s' % orden, id_item=item.id, nombre_atributo='Atributo %s' % orden, longitud=300)
+                    tabla, tipo = 'tipoatributo_texto', 'Texto'
+                else:
+                    valor = Numerico.objects.create(valor=orden, id_item=item.id, nombre_atributo='Atributo %s' % orden, longitud=10, precision=2)
+                    tabla, tipo = 'tipoatributo_numerico', 'Numerico'
+                ValorItem.objects.create(item=item, valor_id=valor.id, tabla_valor_nombre=tabla, nombre_atributo='Atributo %s' % orden, tipo_dato=tipo, version=2, orden=orden, fase=self.fase, proyecto=self.proyecto)
+
+    def test_atributos_version(self):
+
+        item = self.items[0]
+        with self.assertNumQueries(3):
+            lista_valores = atributos_version(self.proyecto.id, self.fase.id, item.id, 2)
+        self.assertEqual(len(lista_valores), 20)
+        self.assertEqual([valor.orden for valor in lista_valores], range(1, 21))
+        self.assertEqual(lista_valores[0].valor_texto, 'texto 1')
+        self.assertEqual(lista_valores[1].valor_numerico, 2)
+        print 'Test de carga de atributos de una version ejecutado exitosamente.'
+
+    def test_atributos_items(self):
+
+        with self.assertNumQueries(3):
+            atributos = atributos_items(self.items)
+        self.assertEqual(sorted(atributos.keys()), sorted([item.id for item in self.items]))
+        for item in self.items:
+            self.assertEqual(len(atributos[item.id]), 20)
+        print 'Test de carga de atributos de varios items ejecutado exitosamente.'
+
+    def test_consultar_version(self):
+
+        item = self.items[0]
+        request = self.factory.get('/adm_proyectos/gestionar/%s/adm_items/%s/versiones/%s/version/2/' % (self.proyecto.id, self.fase.id, item.id))
+        request.user = self.user
+        response = consultar_version(request, str(self.proyecto.id), str(self.fase.id), str(item.id), '2')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'texto 19')
+        self.assertFalse(ListaValores.objects.exists())
+        print 'Test de consultar version de item ejecutado exitosamente.'
+
+    def datos_formulario(self, item):
+        datos = {}
+        for valor in atributos_version(self.proyecto.id, self.fase.id, item.id, item.version):
+            if valor.tipo_dato == 'Texto':
+                datos[str(valor.orden)] = valor.valor_texto
+            else:
+                datos[str(valor.orden)] = str(valor.valor_numerico)
+        return datos
+
+    def test_cargar_valores_guarda_diferencias(self):
+
+        item = self.items[0]
+        datos = self.datos_formulario(item)
+        datos['3'] = 'texto modificado'
+        request = self.factory.post('/adm_proyectos/gestionar/%s/adm_items/%s/atributos/%s/' % (self.proyecto.id, self.fase.id, item.id), datos)
+        request.user = self.user
+        response = cargar_valores(request, str(self.proyecto.id), str(self.fase.id), str(item.id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Items.objects.get(id=item.id).version, 3)
+        self.assertEqual(ValorItem.objects.filter(item=item, version=3).count(), 1)
+        lista_valores = atributos_version(self.proyecto.id, self.fase.id, item.id, 3)
+        self.assertEqual(len(lista_valores), 20)
+        self.assertEqual(lista_valores[2].valor_texto, 'texto modificado')
+        self.assertEqual(lista_valores[1].valor_numerico, 2)
+        self.assertEqual(atributos_version(self.proyecto.id, self.fase.id, item.id, 2)[2].valor_texto, 'texto 3')
+        print 'Test de guardar solo los atributos modificados ejecutado exitosamente.'
+
+    def test_revertir_version(self):
+
+        item = self.items[0]
+        datos = self.datos_formulario(item)
+        datos['3'] = 'texto modificado'
+        request = self.factory.post('/adm_proyectos/gestionar/%s/adm_items/%s/atributos/%s/' % (self.proyecto.id, self.fase.id, item.id), datos)
+        request.user = self.user
+        cargar_valores(request, str(self.proyecto.id), str(self.fase.id), str(item.id))
+        request = self.factory.get('/adm_proyectos/gestionar/%s/adm_items/%s/versiones/%s/revertir/2/' % (self.proyecto.id, self.fase.id, item.id))
+        request.user = self.user
+        response = revertir_version(request, str(self.proyecto.id), str(self.fase.id), str(item.id), '2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Items.objects.get(id=item.id).version, 4)
+        self.assertEqual(ValorItem.objects.filter(item=item, version=4).count(), 1)
+        revertida = atributos_version(self.proyecto.id, self.fase.id, item.id, 4)
+        original = atributos_version(self.proyecto.id, self.fase.id, item.id, 2)
+        self.assertEqual([(valor.nombre_atributo, valor.valor_texto, valor.valor_numerico) for valor in revertida],
+                         [(valor.nombre_atributo, valor.valor_texto, valor.valor_numerico) for valor in original])
+        print 'Test de revertir version ejecutado exitosamente.'
+
+    def test_purgar_listas(self):
+
+        for i in range(5):
+            ListaValores.objects.create(nombre_atributo='Atributo %s' % i, tipo_dato='Texto')
+        call_command('purgar_listas', lote=2)
+        self.assertFalse(ListaValores.objects.exists())
+        print 'Test de purgar listas ejecutado exitosamente.'
+
+    def test_snapshots(self):
+
+        item = self.items[0]
+        datos = self.datos_formulario(item)
+        datos['3'] = 'texto modificado'
+        request = self.factory.post('/adm_proyectos/gestionar/%s/adm_items/%s/atributos/%s/' % (self.proyecto.id, self.fase.id, item.id), datos)
+        request.user = self.user
+        cargar_valores(request, str(self.proyecto.id), str(self.fase.id), str(item.id))
+        self.assertTrue(ItemVersionSnapshot.objects.filter(item=item, version=3).exists())
+        with self.assertNumQueries(1):
+            lista_valores = atributos_snapshot(self.proyecto.id, self.fase.id, item.id, 3)
+        self.assertEqual(len(lista_valores), 20)
+        self.assertEqual(lista_valores[2].valor_texto, 'texto modificado')
+        self.assertEqual(lista_valores[1].valor_numerico, 2)
+
+        request = self.factory.get('/adm_proyectos/gestionar/%s/adm_items/%s/versiones/%s/comparar/2/3/' % (self.proyecto.id, self.fase.id, item.id))
+        request.user = self.user
+        response = comparar_versiones(request, str(self.proyecto.id), str(self.fase.id), str(item.id), '2', '3')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'texto modificado')
+        print 'Test de snapshots de versiones ejecutado exitosamente.'
+
+    def test_generar_snapshots(self):
+
+        call_command('generar_snapshots', proyecto=self.proyecto.id)
+        self.assertEqual(ItemVersionSnapshot.objects.count(), 4)
+        for item in self.items:
+            generada = atributos_snapshot(self.proyecto.id, self.fase.id, item.id, 2)
+            original = atributos_version(self.proyecto.id, self.fase.id, item.id, 2)
+            self.assertEqual([(valor.nombre_atributo, valor.valor_texto, valor.valor_numerico) for valor in generada],
+                             [(valor.nombre_atributo, valor.valor_texto, valor.valor_numerico) for valor in original])
+        call_command('generar_snapshots')
+        self.assertEqual(ItemVersionSnapshot.objects.count(), 4)
+        print 'Test de generar snapshots ejecutado exitosamente.'
+
+    def test_cargar_valores_por_lotes(self):
+
+        item = self.items[0]
+        datos = self.datos_formulario(item)
+        for orden in range(1, 21):
+            datos[str(orden)] = 'nuevo %s' % orden if orden % 2 else str(orden * 10)
+        request = self.factory.post('/adm_proyectos/gestionar/%s/adm_items/%s/atributos/%s/' % (self.proyecto.id, self.fase.id, item.id), datos)
+        request.user = self.user
+        with CaptureQueriesContext(connection) as consultas:
+            cargar_valores(request, str(self.proyecto.id), str(self.fase.id), str(item.id))
+        self.assertLess(len(consultas_sin_cache(consultas)), 30)
+        self.assertEqual(ValorItem.objects.filter(item=item, version=3).count(), 20)
+        lista_valores = atributos_version(self.proyecto.id, self.fase.id, item.id, 3)
+        self.assertEqual(lista_valores[0].valor_texto, 'nuevo 1')
+        self.assertEqual(lista_valores[19].valor_numerico, 200)
+        print 'Test de guardar atributos por lotes ejecutado exitosamente.'
+
+    def test_revertir_fase(self):
+
+        call_command('generar_snapshots')
+        for item in self.items:
+            datos = self.datos_formulario(item)
+            datos['3'] = 'texto modificado'
+            datos['4'] = '40'
+            request = self.factory.post('/adm_proyectos/gestionar/%s/adm_items/%s/atributos/%s/' % (self.proyecto.id, self.fase.id, item.id), datos)
+            request.user = self.user
+            cargar_valores(request, str(self.proyecto.id), str(self.fase.id), str(item.id))
+        eliminado = Items.objects.create(nombre='Eliminado', version=3, estado='En Construccion', fase=self.fase, proyecto=self.proyecto, tipo_item=self.tipoitem, is_active=False)
+        request = self.factory.get('/adm_proyectos/gestionar/%s/adm_items/%s/revertir/2/' % (self.proyecto.id, self.fase.id))
+        request.user = self.user
+        self.assertEqual(revertir_fase(request, str(self.proyecto.id), str(self.fase.id), '2').status_code, 405)
+        self.assertEqual(Items.objects.get(id=self.items[0].id).version, 3)
+        request = self.factory.post('/adm_proyectos/gestionar/%s/adm_items/%s/revertir/2/' % (self.proyecto.id, self.fase.id))
+        request.user = self.user
+        with CaptureQueriesContext(connection) as consultas:
+            response = revertir_fase(request, str(self.proyecto.id), str(self.fase.id), '2')
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(consultas), 16)
+        for item in self.items:
+            self.assertEqual(Items.objects.get(id=item.id).version, 4)
+            self.assertEqual(ValorItem.objects.filter(item=item, version=4).count(), 2)
+            revertida = atributos_snapshot(self.proyecto.id, self.fase.id, item.id, 4)
+            original = atributos_version(self.proyecto.id, self.fase.id, item.id, 4)
+            self.assertEqual([(valor.nombre_atributo, valor.valor_texto, valor.valor_numerico) for valor in revertida],
+                             [(valor.nombre_atributo, valor.valor_texto, valor.valor_numerico) for valor in original])
+            self.assertEqual(original[2].valor_texto, 'texto 3')
+            self.assertEqual(original[3].valor_numerico, 4)
+        self.assertEqual(Items.objects.get(id=eliminado.id).version, 3)
+        print 'Test de revertir los items de una fase ejecutado exitosamente.'
+
+    def test_adm_items_paginado(self):
+
+        for i in range(60):
+            Items.objects.create(nombre='Pagina %s' % i, version=1, estado='En Construccion' if i % 2 else 'Validado', prioridad=i % 3, costoMonetario=i * 10,
+                                 fase=self.fase, proyecto=self.proyecto, tipo_item=self.tipoitem)
+        url = '/adm_proyectos/gestionar/%s/adm_items/%s/' % (self.proyecto.id, self.fase.id)
+        request = self.factory.get(url, {'formato': 'json'})
+        request.user = self.user
+        datos = json.loads(adm_items(request, str(self.proyecto.id), str(self.fase.id)).content)
+        self.assertEqual(len(datos['items']), 50)
+        self.assertEqual(datos['total_aproximado'], 62)
+        self.assertIsNone(datos['anterior'])
+        ids = [item['id'] for item in datos['items']]
+        self.assertEqual(ids, sorted(ids))
+
+        request = self.factory.get(url, {'formato': 'json', 'despues': datos['siguiente']})
+        request.user = self.user
+        segunda = json.loads(adm_items(request, str(self.proyecto.id), str(self.fase.id)).content)
+        self.assertEqual(len(segunda['items']), 12)
+        self.assertIsNone(segunda['siguiente'])
+        self.assertTrue(segunda['items'][0]['id'] > ids[-1])
+
+        request = self.factory.get(url, {'formato': 'json', 'antes': segunda['anterior']})
+        request.user = self.user
+        self.assertEqual([item['id'] for item in json.loads(adm_items(request, str(self.proyecto.id), str(self.fase.id)).content)['items']], ids)
+
+        request = self.factory.get(url, {'formato': 'json', 'estado': 'Validado', 'prioridad': '0', 'costo_min': '100', 'costo_max': '400'})
+        request.user = self.user
+        filtrados = json.loads(adm_items(request, str(self.proyecto.id), str(self.fase.id)).content)
+        self.assertEqual(sorted(item['costoMonetario'] for item in filtrados['items']), [120, 180, 240, 300, 360])
+
+        request = self.factory.get(url, {'estado': 'Validado'})
+        request.user = self.user
+        response = adm_items(request, str(self.proyecto.id), str(self.fase.id))
+        self.assertContains(response, 'Pagina 0')
+        print 'Test de listado paginado de items ejecutado exitosamente.'
+
+    def test_buscar_items(self):
+
+        item = self.items[0]
+        item.descripcion = 'Requerimiento de facturacion electronica'
+        item.save()
+        datos = self.datos_formulario(item)
+        datos['3'] = 'integracion con pasarela de pagos'
+        request = self.factory.post('/adm_proyectos/gestionar/%s/adm_items/%s/atributos/%s/' % (self.proyecto.id, self.fase.id, item.id), datos)
+        request.user = self.user
+        cargar_valores(request, str(self.proyecto.id), str(self.fase.id), str(item.id))
+        self.assertEqual(ItemBusqueda.objects.filter(proyecto_id=self.proyecto.id).count(), 2)
+
+        url = '/adm_proyectos/gestionar/%s/buscar_items/' % self.proyecto.id
+        for busqueda in ('facturacion', 'pasarela pagos'):
+            request = self.factory.get(url, {'busqueda': busqueda})
+            request.user = self.user
+            response = buscar_items(request, str(self.proyecto.id))
+            self.assertContains(response, 'Item 1')
+            self.assertNotContains(response, 'Item 2')
+        request = self.factory.get(url, {'busqueda': 'inexistente'})
+        request.user = self.user
+        self.assertContains(buscar_items(request, str(self.proyecto.id)), 'No se encontraron coincidencias')
+
+        ItemBusqueda.objects.all().delete()
+        call_command('indexar_busqueda', proyecto=self.proyecto.id)
+        self.assertIn('pasarela', ItemBusqueda.objects.get(item_id=item.id).atributos)
+        print 'Test de busqueda de texto completo de items ejecutado exitosamente.'
+
+    def test_planes_consulta(self):
+
+        item = self.items[0]
+        consultas = [
+            ValorItem.objects.filter(proyecto=self.proyecto.id, fase=self.fase.id, item=item.id, version__lte=2).order_by('version', 'orden'),
+            ValorItem.objects.filter(item=item.id, version__lte=2).order_by('item', 'nombre_atributo', '-version').distinct('item', 'nombre_atributo'),
+            Items.objects.filter(proyecto_id=self.proyecto.id, fase_id=self.fase.id, is_active=True).order_by('id'),
+            ListaAtributo.objects.filter(id_tipoitem=self.tipoitem.id, is_active=True).exclude(orden='0').order_by('orden'),
+        ]
+        for modelo in (Texto, Numerico, Fecha, Logico, ArchivoExterno):
+            consultas.append(modelo.objects.filter(id_item=item.id))
+        for consulta in consultas:
+            plan = plan_consulta(consulta)
+            self.assertNotIn('Seq Scan', plan, plan)
+        print 'Test de planes de consulta de items ejecutado exitosamente.'
@@ -8,36 +8,580 @@ from aplicaciones.proyectos.models import Proyectos
 from aplicaciones.fases.models import Fases
 from aplicaciones.tipoitem.models import TipoItem
 from aplicaciones.tipoatributo.models import TipoAtributo, Numerico, Fecha, Texto, ArchivoExterno, Logico
-from .models import Items, ListaValores, ValorItem
+from .models import Items, ValorItem, ValorAtributo, ItemVersionSnapshot, ItemBusqueda, VECTOR_BUSQUEDA
 from datetime import datetime
+from decimal import Decimal
+import json
 from django.contrib.auth.decorators import login_required, permission_required
 from django.db.models import Q
+from django.db import connection, transaction
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.core.exceptions import ValidationError
+from django.views.decorators.http import require_POST
 from forms import ItemNuevoForm
-from aplicaciones.tipoitem.views import ordenar_mantener
+from aplicaciones.tipoitem.views import esquema_tipoitem
 
 # Create your views here.
 
+""" Tablas en las que se almacenan los valores de los atributos, indexadas por el tipo de dato
+del atributo """
+MODELOS_VALOR = {
+    'Texto': Texto,
+    'Numerico': Numerico,
+    'Fecha': Fecha,
+    'Logico': Logico,
+    'Archivo Externo': ArchivoExterno,
+}
+
+""" Las mismas tablas indexadas por el nombre de tabla que se guarda en ValorItem.tabla_valor_nombre """
+TABLAS_VALOR = dict((modelo._meta.db_table, modelo) for modelo in MODELOS_VALOR.values())
+
+""" Campo de ValorAtributo en el que se despliega el valor segun el tipo de dato del atributo """
+CAMPOS_VALOR = {
+    'Texto': 'valor_texto',
+    'Numerico': 'valor_numerico',
+    'Fecha': 'valor_fecha',
+    'Logico': 'valor_logico',
+    'Archivo Externo': 'valor_archivoexterno',
+}
+
+def filas_vigentes(filas):
+    
+    """ Las versiones de un item se guardan como diferencias: una version nueva solo agrega filas de
+    ValorItem para los atributos que cambiaron, y los demas se heredan de la version anterior. Un
+    atributo quitado del item se marca con una fila sin valor_id. Esta funcion recibe las filas de
+    ValorItem hasta la version deseada (version__lte) y se queda, con un DISTINCT ON de Postgres, con
+    la ultima fila de cada atributo de cada item.
+    
+    @type filas: QuerySet de ValorItem.
+    @param filas: Filas de ValorItem filtradas hasta la version que se desea reconstruir.
+    
+    @rtype: lista.
+    @return: lista de filas vigentes de ValorItem, sin los atributos quitados, ordenada por item y orden.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    filas = filas.order_by('item', 'nombre_atributo', '-version').distinct('item', 'nombre_atributo')
+    vigentes = [fila for fila in filas if fila.valor_id is not None]
+    vigentes.sort(key=lambda fila: (fila.item_id, fila.orden))
+    return vigentes
+
+def consultar_valores(filas):
+    
+    """ Agrupa los valor_id de las filas de ValorItem por tabla de valores y consulta cada tabla una
+    sola vez con un IN, de manera que la cantidad de consultas no depende de la cantidad de atributos.
+    
+    @type filas: lista de ValorItem.
+    @param filas: Filas de ValorItem cuyos valores se desean obtener.
+    
+    @rtype: diccionario.
+    @return: diccionario nombre de tabla -> diccionario valor_id -> objeto de la tabla de valores.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    ids_por_tabla = {}
+    for fila in filas:
+        if fila.valor_id is not None:
+            ids_por_tabla.setdefault(fila.tabla_valor_nombre, []).append(fila.valor_id)
+    
+    valores_por_tabla = {}
+    for tabla, ids in ids_por_tabla.items():
+        modelo = TABLAS_VALOR.get(tabla)
+        if modelo:
+            valores_por_tabla[tabla] = modelo.objects.in_bulk(ids)
+    return valores_por_tabla
+
+def cargar_atributos(filas):
+    
+    """ Recibe filas de ValorItem (de uno o varios items) ordenadas por item y orden y arma la lista
+    de atributos a desplegar de cada item, consultando cada tabla de valores una sola vez.
+    
+    @type filas: iterable de ValorItem.
+    @param filas: Filas de ValorItem a resolver, ya ordenadas por item y orden.
+    
+    @rtype: diccionario.
+    @return: diccionario id de item -> lista ordenada de objetos ValorAtributo con los valores cargados.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    filas = list(filas)
+    valores_por_tabla = consultar_valores(filas)
+    
+    atributos = {}
+    for fila in filas:
+        campo = CAMPOS_VALOR.get(fila.tipo_dato)
+        if not campo:
+            continue
+        valorfuturo = ValorAtributo(fila.nombre_atributo, fila.tipo_dato, fila.orden)
+        valor = valores_por_tabla.get(fila.tabla_valor_nombre, {}).get(fila.valor_id)
+        if valor is not None:
+            setattr(valorfuturo, campo, valor.valor)
+        atributos.setdefault(fila.item_id, []).append(valorfuturo)
+    return atributos
+
+def atributos_version(id_proyecto, id_fase, id_item, version):
+    
+    """ Obtiene la lista ordenada de atributos de una version de un item con una consulta a
+    ValorItem mas una consulta por cada tabla de valores utilizada.
+    
+    @type id_item: string.
+    @param id_item: Contiene el id del item cuyos atributos se desean obtener.
+    
+    @type version: string.
+    @param version: Contiene la version del item a consultar.
+    
+    @rtype: lista.
+    @return: lista de objetos ValorAtributo ordenados por el campo orden.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    filas = filas_vigentes(ValorItem.objects.filter(proyecto_id=id_proyecto, fase_id=id_fase, item_id=id_item, version__lte=version))
+    return cargar_atributos(filas).get(int(id_item), [])
+
+def atributos_items(items):
+    
+    """ Obtiene los atributos de la version actual de varios items a la vez, util para las vistas
+    que despliegan mas de un item. La cantidad de consultas es fija sin importar la cantidad de
+    items o de atributos.
+    
+    @type items: iterable de Items.
+    @param items: Items cuyos atributos se desean obtener, en su version actual.
+    
+    @rtype: diccionario.
+    @return: diccionario id de item -> lista ordenada de objetos ValorAtributo.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    qset = Q()
+    for item in items:
+        qset = qset | Q(item_id=item.id, version__lte=item.version)
+    if not qset:
+        return {}
+    return cargar_atributos(filas_vigentes(ValorItem.objects.filter(qset)))
+
+def mismo_valor(modelo, actual, crudo):
+    
+    """ Compara el valor guardado de un atributo con el valor recibido en el formulario, utilizando
+    la conversion del campo valor de la tabla correspondiente.
+    
+    @type modelo: clase de modelo.
+    @param modelo: Tabla de valores del tipo de dato del atributo.
+    
+    @type actual: instancia de modelo.
+    @param actual: Valor vigente del atributo, o None si el atributo no tenia valor.
+    
+    @type crudo: string.
+    @param crudo: Valor recibido en el formulario.
+    
+    @rtype: booleano.
+    @return: True si el valor recibido es igual al vigente.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    if actual is None:
+        return False
+    campo = modelo._meta.get_field('valor')
+    try:
+        return campo.get_prep_value(crudo) == campo.get_prep_value(actual.valor)
+    except (ValidationError, ValueError):
+        return False
+
+def serializar_atributos(lista_valores):
+    
+    """ Convierte una lista de ValorAtributo en el texto JSON compacto que se guarda en
+    ItemVersionSnapshot.atributos, como una lista de [nombre, tipo de dato, orden, valor].
+    
+    @type lista_valores: lista de ValorAtributo.
+    @param lista_valores: Atributos ordenados de una version de item.
+    
+    @rtype: string.
+    @return: texto JSON con los atributos de la version.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    filas = []
+    for valorfuturo in lista_valores:
+        valor = getattr(valorfuturo, CAMPOS_VALOR[valorfuturo.tipo_dato])
+        if isinstance(valor, Decimal):
+            valor = unicode(valor)
+        elif hasattr(valor, 'name'):
+            valor = valor.name
+        filas.append([valorfuturo.nombre_atributo, valorfuturo.tipo_dato, valorfuturo.orden, valor])
+    return json.dumps(filas, separators=(',', ':'))
+
+def deserializar_atributos(texto):
+    
+    """ Reconstruye la lista de ValorAtributo guardada en ItemVersionSnapshot.atributos.
+    
+    @type texto: string.
+    @param texto: texto JSON generado por serializar_atributos.
+    
+    @rtype: lista.
+    @return: lista de objetos ValorAtributo ordenados por el campo orden.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    lista_valores = []
+    for nombre, tipo, orden, valor in json.loads(texto):
+        valorfuturo = ValorAtributo(nombre, tipo, orden)
+        if tipo=='Numerico' and valor not in (None, ''):
+            valor = Decimal(valor)
+        setattr(valorfuturo, CAMPOS_VALOR[tipo], valor)
+        lista_valores.append(valorfuturo)
+    return lista_valores
+
+def guardar_snapshot(item, version, lista_valores=None):
+    
+    """ Reconstruye una version de un item desde ValorItem y guarda (o reemplaza) su
+    ItemVersionSnapshot.
+    
+    @type item: Items.
+    @param item: Item cuya version se desea materializar.
+    
+    @type version: entero.
+    @param version: Numero de version a materializar.
+    
+    @type lista_valores: lista de ValorAtributo.
+    @param lista_valores: Atributos de la version si ya fueron cargados, para no volver a consultarlos.
+    
+    @rtype: ItemVersionSnapshot.
+    @return: snapshot guardado.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    if lista_valores is None:
+        lista_valores = atributos_version(item.proyecto_id, item.fase_id, item.id, version)
+    snapshot, creado = ItemVersionSnapshot.objects.get_or_create(item_id=item.id, version=version, defaults={'atributos': serializar_atributos(lista_valores)})
+    if not creado:
+        snapshot.atributos = serializar_atributos(lista_valores)
+        snapshot.save()
+    return snapshot
+
+def atributos_snapshot(id_proyecto, id_fase, id_item, version):
+    
+    """ Obtiene los atributos de una version de un item desde su ItemVersionSnapshot con una sola
+    consulta. Si la version todavia no fue materializada se reconstruye desde ValorItem.
+    
+    @rtype: lista.
+    @return: lista de objetos ValorAtributo ordenados por el campo orden.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    snapshot = ItemVersionSnapshot.objects.filter(item_id=id_item, version=version).first()
+    if snapshot:
+        return deserializar_atributos(snapshot.atributos)
+    return atributos_version(id_proyecto, id_fase, id_item, version)
+
+def texto_atributos(lista_valores):
+    
+    """ Devuelve el texto buscable de una version de item: los valores de sus atributos de tipo Texto. """
+    
+    return ' '.join(valor.valor_texto for valor in lista_valores if valor.tipo_dato=='Texto' and valor.valor_texto)
+
+def indexar_atributos(ids_items):
+    
+    """ Actualiza en ItemBusqueda el texto de los atributos de tipo Texto de la version actual de
+    los items recibidos, para que la busqueda de texto completo los encuentre.
+    
+    @type ids_items: lista de enteros.
+    @param ids_items: ids de los items cuyos atributos cambiaron.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    items = list(Items.objects.filter(id__in=ids_items))
+    atributos = atributos_items(items)
+    for item in items:
+        texto = texto_atributos(atributos.get(item.id, []))
+        if not ItemBusqueda.objects.filter(item_id=item.id).update(atributos=texto):
+            ItemBusqueda.objects.create(item_id=item.id, proyecto_id=item.proyecto_id, nombre=item.nombre, descripcion=item.descripcion,
+                                        observaciones=item.observaciones, atributos=texto)
+
+def reservar_ids(modelo, cantidad):
+    
+    """ Reserva ids de la secuencia de la tabla del modelo con una sola consulta, para poder
+    asignarlos a objetos que se insertan con bulk_create (que en esta version de Django no
+    devuelve los ids generados).
+    
+    @type modelo: clase de modelo de django.
+    @param modelo: Modelo cuya secuencia de ids se utiliza.
+    
+    @type cantidad: entero.
+    @param cantidad: Cantidad de ids a reservar.
+    
+    @rtype: lista.
+    @return: lista de ids reservados.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    if not cantidad:
+        return []
+    cursor = connection.cursor()
+    cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)", ['%s_id_seq' % modelo._meta.db_table, cantidad])
+    return [fila[0] for fila in cursor.fetchall()]
+
+def guardar_valores(request, itemactual, id_proyecto, id_fase):
+    
+    """ Guarda como nueva version del item los valores de atributos enviados en el request. Solo se
+    escriben los atributos que cambiaron respecto a la version actual; las filas de valores y de
+    ValorItem se insertan con un bulk_create por tabla. Debe llamarse dentro de una transaccion.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene los valores de los atributos en POST y FILES indexados por posicion.
+    
+    @type itemactual: Items.
+    @param itemactual: Item a modificar, bloqueado con select_for_update.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    id_item = itemactual.id
+    versionitem = itemactual.version + 1
+    esquema = esquema_tipoitem(itemactual.tipo_item_id)
+    #Solo se guardan los atributos que cambiaron respecto a la version actual, el resto se hereda
+    vigentes = filas_vigentes(ValorItem.objects.filter(item_id=id_item, version__lte=itemactual.version))
+    valores_vigentes = consultar_valores(vigentes)
+    anteriores = dict((fila.nombre_atributo, fila) for fila in vigentes)
+    
+    nuevos_valores = {}
+    nuevos_valoritems = []
+    posicion = 1
+    for atributo in esquema:
+        nombreatributo = atributo.nombre
+        tipodatoatributo = atributo.tipo
+        modelo = MODELOS_VALOR.get(tipodatoatributo)
+        anterior = anteriores.pop(nombreatributo, None)
+        if modelo:
+            if tipodatoatributo=='Archivo Externo':
+                crudo = request.FILES.get(str(posicion))
+            else:
+                crudo = request.POST.get(str(posicion), '')
+            if anterior and anterior.tipo_dato==tipodatoatributo:
+                actual = valores_vigentes.get(anterior.tabla_valor_nombre, {}).get(anterior.valor_id)
+                if (tipodatoatributo=='Archivo Externo' and not crudo) or mismo_valor(modelo, actual, crudo):
+                    #Valor sin cambios: si solo cambio la posicion se reutiliza la misma fila de valor
+                    if anterior.orden != posicion:
+                        nuevos_valoritems.append(ValorItem(item_id=id_item, valor_id=anterior.valor_id, tabla_valor_nombre=anterior.tabla_valor_nombre, nombre_atributo=nombreatributo,
+                                                           tipo_dato=tipodatoatributo, version=versionitem, orden=posicion, proyecto_id=id_proyecto, fase_id=id_fase))
+                    posicion = posicion+1
+                    continue
+            archivo = modelo()
+            archivo.valor = crudo
+            archivo.id_item = id_item
+            archivo.nombre_atributo = nombreatributo
+            if tipodatoatributo=='Texto' or tipodatoatributo=='Numerico':
+                archivo.longitud = atributo.longitud
+            if tipodatoatributo=='Numerico':
+                archivo.precision = atributo.precision
+            valoritems = ValorItem(item_id=id_item, tabla_valor_nombre=modelo._meta.db_table, nombre_atributo=nombreatributo, tipo_dato=tipodatoatributo,
+                                   version=versionitem, orden=posicion, proyecto_id=id_proyecto, fase_id=id_fase)
+            nuevos_valores.setdefault(modelo, []).append((archivo, valoritems))
+            nuevos_valoritems.append(valoritems)
+        posicion = posicion+1
+    
+    #Los atributos que ya no forman parte del tipo de item se marcan como quitados
+    for anterior in anteriores.values():
+        nuevos_valoritems.append(ValorItem(item_id=id_item, valor_id=None, tabla_valor_nombre=anterior.tabla_valor_nombre, nombre_atributo=anterior.nombre_atributo,
+                                           tipo_dato=anterior.tipo_dato, version=versionitem, orden=anterior.orden, proyecto_id=id_proyecto, fase_id=id_fase))
+    
+    #Un insert por tabla de valores, con los ids reservados de antemano para enlazarlos en ValorItem
+    for modelo, pares in nuevos_valores.items():
+        for id_valor, (archivo, valoritems) in zip(reservar_ids(modelo, len(pares)), pares):
+            archivo.id = id_valor
+            valoritems.valor_id = id_valor
+        modelo.objects.bulk_create([archivo for archivo, valoritems in pares])
+    ValorItem.objects.bulk_create(nuevos_valoritems)
+    
+    #Solo cambia la version, por lo que no hace falta reindexar los campos del item
+    Items.objects.filter(id=id_item).update(version=versionitem)
+    itemactual.version = versionitem
+    lista_valores = atributos_version(id_proyecto, id_fase, id_item, versionitem)
+    guardar_snapshot(itemactual, versionitem, lista_valores)
+    ItemBusqueda.objects.filter(item_id=id_item).update(atributos=texto_atributos(lista_valores))
+
+""" Cantidad de items por pagina en adm_items, y maxima que puede pedirse con el parametro cantidad """
+TAMANIO_PAGINA = 50
+TAMANIO_PAGINA_MAXIMO = 200
+
+""" Por debajo de esta estimacion se cuenta el total exacto de items, por encima se usa la del planificador """
+UMBRAL_CONTEO_EXACTO = 1000
+
+def entero(parametros, nombre):
+    
+    """ Devuelve el parametro GET indicado convertido a entero, o None si no esta o no es un numero. """
+    
+    try:
+        return int(parametros.get(nombre, ''))
+    except ValueError:
+        return None
+
+def filtrar_items(id_proyecto, id_fase, parametros):
+    
+    """ Arma la consulta de los items activos de una fase aplicando los filtros recibidos por GET:
+    busqueda (por nombre), estado, prioridad, tipo_item y rangos de costo monetario
+    (costo_min, costo_max) y temporal (tiempo_min, tiempo_max). Los filtros vacios o invalidos
+    se ignoran.
+    
+    @type parametros: django.http.QueryDict.
+    @param parametros: Parametros GET de la solicitud.
+    
+    @rtype: QuerySet.
+    @return: items de la fase que cumplen los filtros.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    items = Items.objects.filter(proyecto_id=id_proyecto, fase_id=id_fase, is_active=True)
+    busqueda = parametros.get('busqueda', '')
+    if busqueda:
+        items = items.filter(nombre__icontains=busqueda)
+    if parametros.get('estado'):
+        items = items.filter(estado=parametros.get('estado'))
+    filtros_enteros = (
+        ('prioridad', 'prioridad'),
+        ('tipo_item', 'tipo_item_id'),
+        ('costo_min', 'costoMonetario__gte'),
+        ('costo_max', 'costoMonetario__lte'),
+        ('tiempo_min', 'costoTemporal__gte'),
+        ('tiempo_max', 'costoTemporal__lte'),
+    )
+    for parametro, campo in filtros_enteros:
+        valor = entero(parametros, parametro)
+        if valor is not None:
+            items = items.filter(**{campo: valor})
+    return items
+
+def paginar_items(items, parametros):
+    
+    """ Pagina los items por clave (keyset) sobre el id, de modo que el costo de cada pagina no
+    depende de su posicion. El parametro despues trae el ultimo id de la pagina anterior y el
+    parametro antes el primer id de la pagina siguiente, para retroceder.
+    
+    @type items: QuerySet.
+    @param items: items ya filtrados.
+    
+    @type parametros: django.http.QueryDict.
+    @param parametros: Parametros GET de la solicitud.
+    
+    @rtype: tupla.
+    @return: (lista de items de la pagina, id para la pagina siguiente o None, id para la pagina anterior o None).
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    cantidad = entero(parametros, 'cantidad') or TAMANIO_PAGINA
+    cantidad = max(1, min(cantidad, TAMANIO_PAGINA_MAXIMO))
+    despues = entero(parametros, 'despues')
+    antes = entero(parametros, 'antes')
+    if antes is not None:
+        pagina = list(items.filter(id__lt=antes).order_by('-id')[:cantidad + 1])
+        hay_mas = len(pagina) > cantidad
+        pagina = list(reversed(pagina[:cantidad]))
+        siguiente = pagina[-1].id if pagina else None
+        anterior = pagina[0].id if pagina and hay_mas else None
+    else:
+        if despues is not None:
+            items = items.filter(id__gt=despues)
+        pagina = list(items.order_by('id')[:cantidad + 1])
+        hay_mas = len(pagina) > cantidad
+        pagina = pagina[:cantidad]
+        siguiente = pagina[-1].id if pagina and hay_mas else None
+        anterior = pagina[0].id if pagina and despues is not None else None
+    return pagina, siguiente, anterior
+
+def contar_aproximado(items):
+    
+    """ Devuelve la cantidad de filas de la consulta estimada por el planificador de PostgreSQL con
+    un EXPLAIN, que no recorre la tabla. Si la estimacion es chica se cuenta el total exacto.
+    
+    @type items: QuerySet.
+    @param items: consulta a contar.
+    
+    @rtype: entero.
+    @return: cantidad aproximada de filas.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    sql, parametros = items.query.sql_with_params()
+    cursor = connection.cursor()
+    cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, parametros)
+    plan = cursor.fetchone()[0]
+    if not isinstance(plan, list):
+        plan = json.loads(plan)
+    estimado = int(plan[0]['Plan']['Plan Rows'])
+    if estimado < UMBRAL_CONTEO_EXACTO:
+        return items.count()
+    return estimado
+
 def adm_items(request, id_proyecto, id_fase):
     
-    """ Recibe un request, se verifica cual es el usuario registrado y el proyecto del cual se solicita,
-    se obtiene la lista de fases con las que estan relacionados el usuario y el proyecto 
-    desplegandola en pantalla, ademas permite realizar busquedas avanzadas sobre
-    las fases que puede mostrar.
+    """ Recibe un request, el proyecto y la fase, y lista los items activos de la fase paginados
+    por clave y ordenados por id, aplicando los filtros de busqueda recibidos por GET. Con el
+    parametro formato=json devuelve la misma pagina en JSON para clientes automatizados.
     
     @type request: django.http.HttpRequest.
     @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista.
     
-    @rtype: django.shortcuts.render_to_response.
-    @return: fases.html, donde se listan las fases, ademas de las funcionalidades para cada fase.
+    @rtype: django.shortcuts.render_to_response o django.http.HttpResponse.
+    @return: items.html, donde se listan los items, ademas de las funcionalidades para cada item,
+    o la pagina de items en JSON.
     
     @author:Romina Diaz de Bedoya.
     
     """
 
-    #lista_items=Items.objects.get(proyecto=id_proyecto, fase=id_fase, is_active=True)
-    lista_items = Items.objects.filter(proyecto_id=id_proyecto, fase_id=id_fase, is_active=True)
+    items = filtrar_items(id_proyecto, id_fase, request.GET)
+    lista_items, siguiente, anterior = paginar_items(items, request.GET)
+    total = contar_aproximado(items)
+    
+    if request.GET.get('formato') == 'json':
+        datos = {
+            'items': [{'id': item.id, 'nombre': item.nombre, 'estado': item.estado, 'version': item.version, 'prioridad': item.prioridad,
+                       'tipo_item': item.tipo_item_id, 'costoMonetario': item.costoMonetario, 'costoTemporal': item.costoTemporal} for item in lista_items],
+            'siguiente': siguiente,
+            'anterior': anterior,
+            'total_aproximado': total,
+        }
+        return HttpResponse(json.dumps(datos), content_type='application/json')
+    
+    #Los enlaces de paginacion conservan los filtros aplicados
+    filtros = request.GET.copy()
+    for parametro in ('despues', 'antes', 'formato'):
+        filtros.pop(parametro, None)
+    busqueda = request.GET.get('busqueda', '')
+    error = bool(request.GET.get('busqueda') and not lista_items)
     mensaje = ''
-    ctx = {'lista_items': lista_items, 'mensaje': mensaje, 'id_proyecto':id_proyecto, 'id_fase': id_fase}
+    ctx = {'lista_items': lista_items, 'mensaje': mensaje, 'id_proyecto':id_proyecto, 'id_fase': id_fase, 'query': busqueda, 'error': error,
+           'siguiente': siguiente, 'anterior': anterior, 'total_aproximado': total, 'filtros': filtros.urlencode(), 'parametros': request.GET,
+           'lista_tipoitem': TipoItem.objects.filter(id_proyecto=id_proyecto)}
     template_name = './items/items.html'
     return render_to_response(template_name, ctx, context_instance=RequestContext(request))
 
@@ -104,6 +648,7 @@ def crear_item(request, id_proyecto, id_fase, id_tipoitem):
             item.is_active = True
             item.tipo_item_id = id_tipoitem
             item.save()
+            ItemVersionSnapshot.objects.create(item=item, version=1, atributos=serializar_atributos([]))
             
 
             mensaje = 'Item creado con exito.'
@@ -128,184 +673,20 @@ def cargar_valores(request, id_proyecto, id_fase, id_item):
         template_name = './items/itemalerta.html'
         return render_to_response(template_name, ctx, context_instance=RequestContext(request))
     if request.method=='POST': 
-        idtipoitem = itemactual.tipo_item_id
-        versionitem = itemactual.version + 1
-        lista_atributos = ordenar_mantener(idtipoitem)
-        i = 1
-        posicion = 1
-        for listaatributo in lista_atributos:
-            nombreatributo = listaatributo.nombre
-            idatributo = listaatributo.id_atributo
-            iditematributo = listaatributo.id_tipoitem 
-            tipoatributoobjetos = TipoAtributo.objects.filter(id=listaatributo.id_atributo)
-            valoritems = ValorItem()
-            for tipoatributoobjeto in tipoatributoobjetos:
-                tipodatoatributo= tipoatributoobjeto.tipo
-            if tipodatoatributo=='Archivo Externo':
-                archivo = ArchivoExterno()
-                archivo.valor = request.FILE[str(i)]
-                archivo.id_item = id_item
-                archivo.nombre_atributo = nombreatributo
-                archivo.save()
-                valoritems.item_id = id_item
-                valoritems.valor_id = archivo.id
-                valoritems.tabla_valor_nombre = 'tipoatributo_archivoexterno'
-                valoritems.nombre_atributo = nombreatributo
-                valoritems.tipo_dato = tipodatoatributo
-                valoritems.version = versionitem
-                valoritems.orden = posicion
-                valoritems.proyecto_id = id_proyecto
-                valoritems.fase_id = id_fase
-                valoritems.save()
-            elif tipodatoatributo=='Texto':
-                archivo = Texto()
-                archivo.valor = request.POST.get(str(i), '')
-                archivo.id_item = id_item
-                archivo.nombre_atributo = nombreatributo
-                for tipoatributoobjeto in tipoatributoobjetos:
-                    archivo.longitud = tipoatributoobjeto.longitud
-                archivo.save()
-                valoritems.item_id = id_item
-                valoritems.valor_id = archivo.id
-                valoritems.tabla_valor_nombre = 'tipoatributo_texto'
-                valoritems.nombre_atributo = nombreatributo
-                valoritems.tipo_dato = tipodatoatributo
-                valoritems.version = versionitem
-                valoritems.orden = posicion
-                valoritems.proyecto_id = id_proyecto
-                valoritems.fase_id = id_fase
-                valoritems.save()
-            elif tipodatoatributo=='Numerico':
-                archivo = Numerico()
-                archivo.valor = request.POST.get(str(i), '')
-                archivo.id_item = id_item
-                archivo.nombre_atributo = nombreatributo
-                for tipoatributoobjeto in tipoatributoobjetos:
-                    archivo.longitud = tipoatributoobjeto.longitud
-                    archivo.precision = tipoatributoobjeto.precision
-                archivo.save()
-                valoritems.item_id = id_item
-                valoritems.valor_id = archivo.id
-                valoritems.tabla_valor_nombre = 'tipoatributo_numerico'
-                valoritems.nombre_atributo = nombreatributo
-                valoritems.tipo_dato = tipodatoatributo
-                valoritems.version = versionitem
-                valoritems.orden = posicion
-                valoritems.proyecto_id = id_proyecto
-                valoritems.fase_id = id_fase
-                valoritems.save()
-            elif tipodatoatributo=='Fecha':
-                archivo = Fecha()
-                archivo.valor = request.POST.get(str(i), '')
-                archivo.id_item = id_item
-                archivo.nombre_atributo = nombreatributo
-                archivo.save()
-                valoritems.item_id = id_item
-                valoritems.valor_id = archivo.id
-                valoritems.tabla_valor_nombre = 'tipoatributo_fecha'
-                valoritems.nombre_atributo = nombreatributo
-                valoritems.tipo_dato = tipodatoatributo
-                valoritems.version = versionitem
-                valoritems.orden = posicion
-                valoritems.proyecto_id = id_proyecto
-                valoritems.fase_id = id_fase
-                valoritems.save()
-            elif tipodatoatributo=='Logico':
-                archivo = Logico()
-                archivo.valor = request.POST.get(str(i), '')
-                archivo.id_item = id_item
-                archivo.nombre_atributo = nombreatributo
-                archivo.save()
-                valoritems.item_id = id_item
-                valoritems.valor_id = archivo.id
-                valoritems.tabla_valor_nombre = 'tipoatributo_logico'
-                valoritems.nombre_atributo = nombreatributo
-                valoritems.tipo_dato = tipodatoatributo
-                valoritems.version = versionitem
-                valoritems.orden = posicion
-                valoritems.proyecto_id = id_proyecto
-                valoritems.fase_id = id_fase
-                valoritems.save()
-            i = i+1
-            posicion = posicion+1
-        
-        itemactual.version = versionitem
-        itemactual.save()
+        with transaction.atomic():
+            #Se bloquea el item para que dos ediciones simultaneas no generen la misma version
+            itemactual = Items.objects.select_for_update().get(id=id_item)
+            guardar_valores(request, itemactual, id_proyecto, id_fase)
         mensaje = 'Atributos modificados con extito.'
         template_name='./items/itemalerta.html'
         ctx = {'mensaje': mensaje, 'id_proyecto':id_proyecto, 'id_fase': id_fase,}
         return render_to_response(template_name, ctx, context_instance=RequestContext(request))
         
     idtipo = itemactual.tipo_item_id     
-    lista_atributos = ordenar_mantener(idtipo)
-    lista_valores = []
-    orden = 0
-    atributositem = ValorItem.objects.filter(proyecto_id=id_proyecto, fase_id=id_fase, item_id=id_item, version=itemactual.version).order_by('orden')
-    if atributositem:
-        for i in atributositem:
-            valorfuturo = ListaValores()
-            valorfuturo.nombre_atributo = i.nombre_atributo
-            valorfuturo.tipo_dato = i.tipo_dato
-            valorfuturo.orden = i.orden
-            if i.tipo_dato=='Texto':
-                textos = Texto.objects.filter(id=i.valor_id)
-                if textos:
-                    for texto in textos:
-                        valorfuturo.valor_texto = texto.valor
-                else:
-                    valorfuturo.valor_texto = ""
-                valorfuturo.save()
-                lista_valores.append(valorfuturo)
-            if i.tipo_dato=='Numerico':
-                textos = Numerico.objects.filter(id=i.valor_id)
-                if textos:
-                    for texto in textos:
-                        valorfuturo.valor_numerico = texto.valor
-                else:
-                    valorfuturo.valor_numerico = ""
-                valorfuturo.save()
-                lista_valores.append(valorfuturo)
-            if i.tipo_dato=='Fecha':
-                textos = Fecha.objects.filter(id=i.valor_id)
-                if textos:
-                    for texto in textos:
-                        valorfuturo.valor_fecha = texto.valor
-                else:
-                    valorfuturo.valor_fecha = ""
-                valorfuturo.save()
-                lista_valores.append(valorfuturo)
-            if i.tipo_dato=='Archivo Externo':
-                textos = Texto.objects.filter(id=i.valor_id)
-                if textos:
-                    for texto in textos:
-                        valorfuturo.valor_archivoexterno = texto.valor
-                else:
-                    valorfuturo.valor_archivoexterno = ""
-                valorfuturo.save()
-                lista_valores.append(valorfuturo)
-            if i.tipo_dato=='Logico':
-                textos = Logico.objects.filter(id=i.valor_id)
-                if textos:
-                    for texto in textos:
-                        valorfuturo.valor_logico = texto.valor
-                else:
-                    valorfuturo.valor_logico = ""
-                valorfuturo.save()
-                lista_valores.append(valorfuturo)
-    else:
-        for atributo in lista_atributos:
-            orden = orden+1
-            valorfuturo = ListaValores()
-            valorfuturo.nombre_atributo = atributo.nombre
-            atributoobjeto = TipoAtributo.objects.get(id=atributo.id_atributo)
-            valorfuturo.tipo_dato = atributoobjeto.tipo
-            valorfuturo.orden = orden
-            valorfuturo.valor_archivoexterno = ""
-            valorfuturo.valor_texto = ""
-            valorfuturo.valor_numerico = ""
-            valorfuturo.valor_fecha = ""
-            
-            lista_valores.append(valorfuturo)
+    lista_valores = atributos_snapshot(id_proyecto, id_fase, id_item, itemactual.version)
+    if not lista_valores:
+        for atributo in esquema_tipoitem(idtipo):
+            lista_valores.append(ValorAtributo(atributo.nombre, atributo.tipo, atributo.orden))
             
     template_name='./items/cargaratributos.html'
     return render(request, template_name, {'id_proyecto':id_proyecto, 'id_fase': id_fase, 'id_tipoitem': idtipo, 'lista_valores': lista_valores, 'id_item': id_item})        
@@ -328,154 +709,198 @@ def listar_versiones(request, id_proyecto, id_fase, id_item):
             lista_versiones.append(i)
             i = i+1
              
-    ctx={'lista_versiones':lista_versiones, 'id_proyecto':id_proyecto, 'id_fase':id_fase, 'id_item': id_item}
+    ctx={'lista_versiones':lista_versiones, 'id_proyecto':id_proyecto, 'id_fase':id_fase, 'id_item': id_item, 'versionactual': versionactual}
     template_name = './items/listarversiones.html'
     return render_to_response(template_name, ctx, context_instance=RequestContext(request))
 
 def consultar_version(request, id_proyecto, id_fase, id_item, version):
-    item = Items.objects.get(id=id_item)
-    atributos = ValorItem.objects.filter(proyecto=id_proyecto, fase=id_fase, item=id_item, version=version).order_by('orden')
-    lista_valores = []
-    if atributos:
-        for i in atributos:
-            valorfuturo = ListaValores()
-            valorfuturo.nombre_atributo = i.nombre_atributo
-            valorfuturo.tipo_dato = i.tipo_dato
-            valorfuturo.orden = i.orden
-            if i.tipo_dato=='Texto':
-                textos = Texto.objects.filter(id=i.valor_id)
-                if textos:
-                    for texto in textos:
-                        valorfuturo.valor_texto = texto.valor
-                else:
-                    valorfuturo.valor_texto = ""
-                valorfuturo.save()
-                lista_valores.append(valorfuturo)
-            if i.tipo_dato=='Numerico':
-                textos = Numerico.objects.filter(id=i.valor_id)
-                if textos:
-                    for texto in textos:
-                        valorfuturo.valor_numerico = texto.valor
-                else:
-                    valorfuturo.valor_numerico = ""
-                valorfuturo.save()
-                lista_valores.append(valorfuturo)
-            if i.tipo_dato=='Fecha':
-                textos = Fecha.objects.filter(id=i.valor_id)
-                if textos:
-                    for texto in textos:
-                        valorfuturo.valor_fecha = texto.valor
-                else:
-                    valorfuturo.valor_fecha = ""
-                valorfuturo.save()
-                lista_valores.append(valorfuturo)
-            if i.tipo_dato=='Archivo Externo':
-                textos = Texto.objects.filter(id=i.valor_id)
-                if textos:
-                    for texto in textos:
-                        valorfuturo.valor_archivoexterno = texto.valor
-                else:
-                    valorfuturo.valor_archivoexterno = ""
-                valorfuturo.save()
-                lista_valores.append(valorfuturo)
-            if i.tipo_dato=='Logico':
-                textos = Logico.objects.filter(id=i.valor_id)
-                if textos:
-                    for texto in textos:
-                        valorfuturo.valor_logico = texto.valor
-                else:
-                    valorfuturo.valor_logico = ""
-                valorfuturo.save()
-                lista_valores.append(valorfuturo)
-                
+    lista_valores = atributos_snapshot(id_proyecto, id_fase, id_item, version)
+
     template_name='./items/mostraratributos.html'
     return render(request, template_name, {'id_proyecto':id_proyecto, 'id_fase': id_fase, 'lista_valores': lista_valores, 'id_item': id_item})
 
+def comparar_versiones(request, id_proyecto, id_fase, id_item, version, otra_version):
+    
+    """ Recibe un request, el id del item y dos numeros de version, y despliega los atributos de
+    ambas versiones lado a lado marcando los que difieren. Ambas versiones se obtienen de sus
+    ItemVersionSnapshot con una sola consulta.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista.
+    
+    @rtype: django.shortcuts.render.
+    @return: compararversiones.html, donde se listan los atributos de ambas versiones.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    snapshots = dict((snapshot.version, snapshot) for snapshot in ItemVersionSnapshot.objects.filter(item_id=id_item, version__in=[version, otra_version]))
+    versiones = []
+    for numero in (int(version), int(otra_version)):
+        if numero in snapshots:
+            versiones.append(deserializar_atributos(snapshots[numero].atributos))
+        else:
+            versiones.append(atributos_version(id_proyecto, id_fase, id_item, numero))
+    
+    atributos = {}
+    for posicion, lista_valores in enumerate(versiones):
+        for valorfuturo in lista_valores:
+            fila = atributos.setdefault(valorfuturo.nombre_atributo, [valorfuturo.orden, valorfuturo.nombre_atributo, None, None])
+            fila[2 + posicion] = getattr(valorfuturo, CAMPOS_VALOR[valorfuturo.tipo_dato])
+    lista_comparacion = []
+    for orden, nombre, valor, otro_valor in sorted(atributos.values()):
+        lista_comparacion.append({'nombre_atributo': nombre, 'valor': valor, 'otro_valor': otro_valor, 'distinto': valor != otro_valor})
+    
+    ctx = {'id_proyecto':id_proyecto, 'id_fase': id_fase, 'id_item': id_item, 'version': version, 'otra_version': otra_version, 'lista_comparacion': lista_comparacion}
+    template_name='./items/compararversiones.html'
+    return render(request, template_name, ctx)
+
+def revertir_items(ids_items, version):
+    
+    """ Revierte a la version indicada todos los items recibidos en una sola transaccion y con
+    consultas de conjunto: un INSERT ... SELECT agrega en ValorItem, para cada item, las filas de
+    los atributos que difieren entre la version elegida y la actual (reutilizando las mismas filas
+    de valores, que nunca se modifican) y las marcas de los atributos que hay que quitar; luego se
+    incrementa la version de todos los items y se copian sus snapshots. Los items cuya version
+    actual no es posterior a la elegida se ignoran.
+    
+    @type ids_items: lista de enteros.
+    @param ids_items: ids de los items a revertir.
+    
+    @type version: entero.
+    @param version: Numero de version a la que se revierten los items.
+    
+    @rtype: lista.
+    @return: ids de los items revertidos.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    version = int(version)
+    tablas = {'items': Items._meta.db_table, 'valoritem': ValorItem._meta.db_table, 'snapshot': ItemVersionSnapshot._meta.db_table}
+    with transaction.atomic():
+        revertidos = list(Items.objects.select_for_update().filter(id__in=ids_items, version__gt=version).order_by('id').values_list('id', flat=True))
+        if not revertidos:
+            return []
+        cursor = connection.cursor()
+        cursor.execute("""
+            WITH objetivo AS (
+                SELECT DISTINCT ON (v.item_id, v.nombre_atributo) v.*
+                FROM %(valoritem)s v
+                WHERE v.item_id = ANY(%%s) AND v.version <= %%s
+                ORDER BY v.item_id, v.nombre_atributo, v.version DESC
+            ), actual AS (
+                SELECT DISTINCT ON (v.item_id, v.nombre_atributo) v.*
+                FROM %(valoritem)s v JOIN %(items)s i ON i.id = v.item_id
+                WHERE v.item_id = ANY(%%s) AND v.version <= i.version
+                ORDER BY v.item_id, v.nombre_atributo, v.version DESC
+            )
+            INSERT INTO %(valoritem)s (item_id, valor_id, tabla_valor_nombre, nombre_atributo, tipo_dato, version, orden, fase_id, proyecto_id)
+            SELECT o.item_id, o.valor_id, o.tabla_valor_nombre, o.nombre_atributo, o.tipo_dato, i.version + 1, o.orden, i.fase_id, i.proyecto_id
+            FROM objetivo o JOIN %(items)s i ON i.id = o.item_id
+            LEFT JOIN actual a ON a.item_id = o.item_id AND a.nombre_atributo = o.nombre_atributo
+            WHERE o.valor_id IS NOT NULL
+              AND (a.valor_id, a.tabla_valor_nombre, a.orden) IS DISTINCT FROM (o.valor_id, o.tabla_valor_nombre, o.orden)
+            UNION ALL
+            SELECT a.item_id, NULL, a.tabla_valor_nombre, a.nombre_atributo, a.tipo_dato, i.version + 1, a.orden, i.fase_id, i.proyecto_id
+            FROM actual a JOIN %(items)s i ON i.id = a.item_id
+            LEFT JOIN objetivo o ON o.item_id = a.item_id AND o.nombre_atributo = a.nombre_atributo
+            WHERE a.valor_id IS NOT NULL AND (o.item_id IS NULL OR o.valor_id IS NULL)
+        """ % tablas, [revertidos, version, revertidos])
+        cursor.execute("UPDATE %(items)s SET version = version + 1 WHERE id = ANY(%%s)" % tablas, [revertidos])
+        cursor.execute("""
+            INSERT INTO %(snapshot)s (item_id, version, atributos)
+            SELECT s.item_id, i.version, s.atributos
+            FROM %(snapshot)s s JOIN %(items)s i ON i.id = s.item_id
+            WHERE s.item_id = ANY(%%s) AND s.version = %%s
+            RETURNING item_id
+        """ % tablas, [revertidos, version])
+        copiados = set(fila[0] for fila in cursor.fetchall())
+        #Las versiones sin snapshot materializado se reconstruyen desde ValorItem
+        for item in Items.objects.filter(id__in=[id_item for id_item in revertidos if id_item not in copiados]):
+            guardar_snapshot(item, item.version)
+        indexar_atributos(revertidos)
+    return revertidos
+
 def revertir_version(request, id_proyecto, id_fase, id_item, version):
-    item = Items.objects.get(id=id_item)
-    versionnueva = item.version + 1
-    valoresitem = ValorItem.objects.filter(proyecto=id_proyecto, fase=id_fase, item=id_item, version=version).order_by('orden')
-    if valoresitem:
-        for filaitem in valoresitem:
-            valor = ValorItem()
-            valor.item_id = id_item
-            valor.orden = filaitem.orden
-            valor.proyecto_id = id_proyecto
-            valor.fase_id = id_fase
-            valor.version = versionnueva
-            if filaitem.tipo_dato=='Numerico':
-                num = Numerico()
-                viejo = Numerico.objects.get(id=filaitem.valor_id)
-                num.valor = viejo.valor
-                num.id_item = id_item
-                num.nombre_atributo = viejo.nombre_atributo
-                num.precision = viejo.precision
-                num.longitud = viejo.longitud
-                num.obligatorio = viejo.obligatorio
-                num.save()
-                valor.valor_id = num.id
-                valor.tabla_valor_nombre = 'tipoatributo_numerico'
-                valor.nombre_atributo = filaitem.nombre_atributo
-                valor.tipo_dato = filaitem.tipo_dato
-                valor.save()
-            if filaitem.tipo_dato=='Texto':
-                num = Texto()
-                viejo = Texto.objects.get(id=filaitem.valor_id)
-                num.valor = viejo.valor
-                num.id_item = id_item
-                num.nombre_atributo = viejo.nombre_atributo
-                num.longitud = viejo.longitud
-                num.obligatorio = viejo.obligatorio
-                num.save()
-                valor.valor_id = num.id
-                valor.tabla_valor_nombre = 'tipoatributo_texto'
-                valor.nombre_atributo = filaitem.nombre_atributo
-                valor.tipo_dato = filaitem.tipo_dato
-                valor.save()
-            if filaitem.tipo_dato=='Fecha':
-                num = Fecha()
-                viejo = Fecha.objects.get(id=filaitem.valor_id)
-                num.valor = viejo.valor
-                num.id_item = id_item
-                num.nombre_atributo = viejo.nombre_atributo
-                num.obligatorio = viejo.obligatorio
-                num.save()
-                valor.valor_id = num.id
-                valor.tabla_valor_nombre = 'tipoatributo_fecha'
-                valor.nombre_atributo = filaitem.nombre_atributo
-                valor.tipo_dato = filaitem.tipo_dato
-                valor.save()
-            if filaitem.tipo_dato=='Logico':
-                num = Logico()
-                viejo = Logico.objects.get(id=filaitem.valor_id)
-                num.valor = viejo.valor
-                num.id_item = id_item
-                num.nombre_atributo = viejo.nombre_atributo
-                num.obligatorio = viejo.obligatorio
-                num.save()
-                valor.valor_id = num.id
-                valor.tabla_valor_nombre = 'tipoatributo_logico'
-                valor.nombre_atributo = filaitem.nombre_atributo
-                valor.tipo_dato = filaitem.tipo_dato
-                valor.save()
-            if filaitem.tipo_dato=='Archivo Externo':
-                num = ArchivoExterno()
-                viejo = ArchivoExterno.objects.get(id=filaitem.valor_id)
-                num.valor = viejo.valor
-                num.id_item = id_item
-                num.nombre_atributo = viejo.nombre_atributo
-                num.obligatorio = viejo.obligatorio
-                num.save()
-                valor.valor_id = num.id
-                valor.tabla_valor_nombre = 'tipoatributo_archivoexterno'
-                valor.nombre_atributo = filaitem.nombre_atributo
-                valor.tipo_dato = filaitem.tipo_dato
-                valor.save()
-    item.version = versionnueva
-    item.save()
+    revertir_items([int(id_item)], version)
     
     mensaje = 'Version Revertida con exito.'
     template_name='./items/itemalerta.html'
     ctx = {'mensaje': mensaje, 'id_proyecto':id_proyecto, 'id_fase': id_fase}
     return render_to_response(template_name, ctx, context_instance=RequestContext(request))
 
+
+@require_POST
+def revertir_fase(request, id_proyecto, id_fase, version):
+    
+    """ Recibe un request, el id de una fase y un numero de version, y revierte a esa version en una
+    sola operacion los items activos de la fase que se pueden modificar. Si el request trae una lista
+    de items en el parametro 'items' solo se revierten esos. Solo acepta POST.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene en POST la lista opcional de items a revertir.
+    
+    @rtype: django.shortcuts.render_to_response.
+    @return: itemalerta.html, con la cantidad de items revertidos.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    fase = Fases.objects.get(id=id_fase)
+    proyecto = Proyectos.objects.get(id=id_proyecto)
+    if fase.estado =='FD' or proyecto.estado=='Inactivo':
+        mensaje = 'No se pueden revertir los items de esta fase.'
+    else:
+        items = Items.objects.filter(fase_id=id_fase, proyecto_id=id_proyecto, is_active=True).exclude(estado__in=['En Revision', 'Bloqueado', 'Validado'])
+        seleccionados = request.POST.getlist('items')
+        if seleccionados:
+            items = items.filter(id__in=seleccionados)
+        revertidos = revertir_items(list(items.values_list('id', flat=True)), version)
+        mensaje = '%s items revertidos a la version %s.' % (len(revertidos), version)
+    template_name='./items/itemalerta.html'
+    ctx = {'mensaje': mensaje, 'id_proyecto':id_proyecto, 'id_fase': id_fase}
+    return render_to_response(template_name, ctx, context_instance=RequestContext(request))
+
+""" Cantidad de resultados por pagina en la busqueda de items """
+RESULTADOS_POR_PAGINA = 20
+
+def buscar_items(request, id_proyecto):
+    
+    """ Recibe un request con el texto a buscar en el parametro busqueda y lista los items activos
+    del proyecto que lo contienen en su nombre, descripcion, observaciones o en los atributos de
+    tipo Texto de su version actual. Utiliza el indice de texto completo de ItemBusqueda y ordena
+    los resultados por relevancia, paginados con el parametro pagina.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista.
+    
+    @rtype: django.shortcuts.render_to_response.
+    @return: buscaritems.html, donde se listan los items encontrados.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    busqueda = request.GET.get('busqueda', '').strip()
+    resultados = None
+    error = False
+    if busqueda:
+        consulta = "plainto_tsquery('spanish', %s)"
+        encontrados = ItemBusqueda.objects.filter(proyecto_id=id_proyecto, item__is_active=True).select_related('item').extra(
+            select={'rango': 'ts_rank(%s, %s)' % (VECTOR_BUSQUEDA, consulta)}, select_params=[busqueda],
+            where=['%s @@ %s' % (VECTOR_BUSQUEDA, consulta)], params=[busqueda]).order_by('-rango', 'item')
+        paginador = Paginator(encontrados, RESULTADOS_POR_PAGINA)
+        try:
+            resultados = paginador.page(request.GET.get('pagina', 1))
+        except PageNotAnInteger:
+            resultados = paginador.page(1)
+        except EmptyPage:
+            resultados = paginador.page(paginador.num_pages)
+        error = not resultados.object_list
+    ctx = {'resultados': resultados, 'query': busqueda, 'error': error, 'id_proyecto': id_proyecto}
+    template_name = './items/buscaritems.html'
+    return render_to_response(template_name, ctx, context_instance=RequestContext(request))
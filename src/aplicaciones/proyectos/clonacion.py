@@ -0,0 +1,80 @@
+from django.db import transaction
+from aplicaciones.fases.models import Fases
+from aplicaciones.tipoitem.models import TipoItem, ListaAtributo
+from aplicaciones.tipoatributo.models import TipoAtributo
+from aplicaciones.items.views import reservar_ids
+from .models import Proyectos
+
+def clonar_proyecto(id_proyecto, nombre, fecha_inicio, duracion, lider=None, avance=None):
+
+    """ Crea un proyecto nuevo con la estructura de un proyecto existente: sus fases activas, sus tipos de
+    item activos, los atributos de cada tipo de item y las filas que los enlazan. Cada tabla se copia con un
+    unico bulk_create, con ids reservados de antemano para poder traducir los ids del proyecto original a
+    los de la copia, y todo se hace en una sola transaccion. Los items, relaciones y roles no se copian.
+
+    @type id_proyecto: entero.
+    @param id_proyecto: id del proyecto a clonar.
+
+    @type nombre: string.
+    @param nombre: Nombre del proyecto nuevo.
+
+    @type fecha_inicio: date.
+    @param fecha_inicio: Fecha de inicio del proyecto nuevo.
+
+    @type duracion: entero.
+    @param duracion: Duracion en semanas del proyecto nuevo.
+
+    @type lider: User.
+    @param lider: Lider del proyecto nuevo, None para dejarlo sin lider.
+
+    @type avance: funcion.
+    @param avance: Si se indica, se llama con el porcentaje completado y un mensaje antes de copiar cada tabla.
+
+    @rtype: tupla.
+    @return: El proyecto creado y un diccionario con la traduccion de ids (viejo a nuevo) de fases,
+    tiposItem y atributos.
+
+    @author: Juana Maldonado.
+
+    """
+
+    if avance is None:
+        avance = lambda progreso, mensaje: None
+    with transaction.atomic():
+        avance(0, 'Creando el proyecto')
+        proyecto = Proyectos.objects.create(nombre=nombre, lider=lider, fecha_inicio=fecha_inicio, duracion=duracion, is_active=True)
+
+        avance(10, 'Copiando fases')
+        fases = list(Fases.objects.filter(proyecto=id_proyecto, is_active=True).order_by('id').values_list('id', 'nombre'))
+        nuevas = reservar_ids(Fases, len(fases))
+        Fases.objects.bulk_create([Fases(id=id_nueva, nombre=nombre_fase, estado='DF', proyecto=proyecto)
+                                   for id_nueva, (id_fase, nombre_fase) in zip(nuevas, fases)])
+        mapa_fases = dict(zip([id_fase for id_fase, nombre_fase in fases], nuevas))
+
+        avance(30, 'Copiando tipos de item')
+        tipos = list(TipoItem.objects.filter(id_proyecto=id_proyecto, is_active=True).order_by('id').values_list('id', 'nombre', 'descripcion'))
+        nuevos = reservar_ids(TipoItem, len(tipos))
+        TipoItem.objects.bulk_create([TipoItem(id=id_nuevo, nombre=nombre_tipo, descripcion=descripcion, id_proyecto=proyecto.id, is_active=True)
+                                      for id_nuevo, (id_tipo, nombre_tipo, descripcion) in zip(nuevos, tipos)])
+        mapa_tipos = dict(zip([id_tipo for id_tipo, nombre_tipo, descripcion in tipos], nuevos))
+
+        avance(50, 'Copiando atributos')
+        #Los mismos atributos que el esquema del tipo de item: activos, con orden y con un tipo de atributo existente
+        atributos = list(ListaAtributo.objects.filter(id_tipoitem__in=mapa_tipos.keys(), is_active=True).exclude(orden=0)
+                         .order_by('id_tipoitem', 'orden', 'id').values_list('id', 'id_tipoitem', 'id_atributo', 'nombre'))
+        existentes = set(TipoAtributo.objects.filter(id__in=set(fila[2] for fila in atributos)).values_list('id', flat=True))
+        atributos = [fila for fila in atributos if fila[2] in existentes]
+        nuevos = reservar_ids(ListaAtributo, len(atributos))
+        copias = []
+        enlaces = []
+        orden = {}
+        for id_nuevo, (id_lista, id_tipoitem, id_atributo, nombre_atributo) in zip(nuevos, atributos):
+            orden[id_tipoitem] = orden.get(id_tipoitem, 0) + 1
+            copias.append(ListaAtributo(id=id_nuevo, id_atributo=id_atributo, id_tipoitem=mapa_tipos[id_tipoitem], nombre=nombre_atributo,
+                                        orden=orden[id_tipoitem], is_active=True))
+            enlaces.append(TipoItem.listaAtributo.through(tipoitem_id=mapa_tipos[id_tipoitem], listaatributo_id=id_nuevo))
+        ListaAtributo.objects.bulk_create(copias, batch_size=1000)
+        TipoItem.listaAtributo.through.objects.bulk_create(enlaces, batch_size=1000)
+        mapa_atributos = dict(zip([fila[0] for fila in atributos], nuevos))
+
+    return proyecto, {'fases':mapa_fases, 'tipos':mapa_tipos, 'atributos':mapa_atributos}
@@ -25,6 +25,29 @@ def opcionLider():
             tupla = (usuario.id, usuario.username)
             resultado.append(tupla)
     return resultado
+
+def candidatos_lider(id_proyecto, busqueda=''):
+    
+    """ Obtiene los usuarios activos que tienen algun rol del proyecto, con una sola consulta que une los
+    grupos de los usuarios con los roles del proyecto. El administrador no puede ser lider.
+    
+    @type id_proyecto: string.
+    @param id_proyecto: id del proyecto.
+    
+    @type busqueda: string.
+    @param busqueda: Si se indica, solo se incluyen los usuarios cuyo nombre de usuario empieza con ella.
+    
+    @rtype: QuerySet.
+    @return: Los candidatos ordenados por nombre de usuario.
+    
+    @author: Juana Maldonado
+    
+    """
+    
+    usuarios = User.objects.filter(is_active=True, groups__roles__proyecto=str(id_proyecto)).exclude(id=1)
+    if busqueda:
+        usuarios = usuarios.filter(username__istartswith=busqueda)
+    return usuarios.distinct().order_by('username')
         
 ESTADOS_PROYECTO=(
         ('Inactivo', 'Inactivo'),
@@ -70,14 +93,23 @@ class ProyectoModificadoForm(forms.Form):
     """
     
     Nombre_del_Proyecto = forms.CharField(widget=forms.TextInput(), max_length=15, min_length=2, required=True, error_messages={'required': 'Ingrese un nombre para el proyecto', 'max_length': 'Longitud maxima: 15', 'min_length': 'Longitud minima: 2 caracteres'})
-    Nuevo_Lider =  forms.ChoiceField(widget=forms.Select(), choices= (opcionLider()), required=False)
+    Nuevo_Lider =  forms.CharField(widget=forms.TextInput(), max_length=30, required=False)
     Nuevo_Estado = forms.ChoiceField(widget=forms.Select(), choices= (ESTADOS_PROYECTO), required=False)
     Duracion = forms.IntegerField(required=True, help_text='En semanas', validators=[validate_duracion_proyecto], error_messages={'required': 'Ingrese la duracion del proyecto',})
     
     def __init__(self, *args, **kwargs):
-        self.Nuevo_Lider = opcionLider()
+        self.id_proyecto = kwargs.pop('id_proyecto', None)
         super(ProyectoModificadoForm, self).__init__( *args, **kwargs)
-        self.fields['Nuevo_Lider']= forms.ChoiceField(widget=forms.Select(), choices= (self.Nuevo_Lider), required=False)
+        
+    def clean_Nuevo_Lider(self):
+        """ Convierte el nombre de usuario ingresado en el usuario, que debe tener algun rol del proyecto. """
+        username = self.cleaned_data['Nuevo_Lider']
+        if not username:
+            return None
+        try:
+            return candidatos_lider(self.id_proyecto).get(username=username)
+        except User.DoesNotExist:
+            raise ValidationError(u'El usuario no tiene ningun rol en el proyecto y no puede ser lider')
         
 
    
\ No newline at end of file
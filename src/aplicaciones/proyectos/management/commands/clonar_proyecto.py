@@ -0,0 +1,48 @@
+from datetime import datetime
+from optparse import make_option
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from aplicaciones.proyectos.models import Proyectos
+from aplicaciones.proyectos.clonacion import clonar_proyecto
+
+class Command(BaseCommand):
+    
+    """ Crea un proyecto nuevo copiando las fases, los tipos de item y sus atributos de un proyecto
+    existente, igual que la importacion de proyectos desde la interfaz pero sin el limite de tiempo
+    de una solicitud web.
+    
+    Uso: python manage.py clonar_proyecto ID --nombre=NOMBRE --fecha-inicio=dd/mm/aaaa --duracion=N [--lider=USUARIO]
+    """
+    
+    args = '<id_proyecto>'
+    help = 'Clona la estructura de un proyecto en un proyecto nuevo.'
+    option_list = BaseCommand.option_list + (
+        make_option('--nombre', action='store', dest='nombre', default=None,
+                    help='Nombre del proyecto nuevo.'),
+        make_option('--fecha-inicio', action='store', dest='fecha_inicio', default=None,
+                    help='Fecha de inicio del proyecto nuevo, en formato dia/mes/anho.'),
+        make_option('--duracion', action='store', type='int', dest='duracion', default=None,
+                    help='Duracion en semanas del proyecto nuevo.'),
+        make_option('--lider', action='store', dest='lider', default=None,
+                    help='Nombre de usuario del lider del proyecto nuevo.'),
+    )
+    
+    def handle(self, *args, **options):
+        if len(args) != 1 or not options['nombre'] or not options['fecha_inicio'] or not options['duracion']:
+            raise CommandError('Indique el proyecto a clonar, --nombre, --fecha-inicio y --duracion.')
+        if not Proyectos.objects.filter(id=args[0], is_active=True).exists():
+            raise CommandError('No existe el proyecto %s.' % args[0])
+        if Proyectos.objects.filter(nombre=options['nombre'], is_active=True).exists():
+            raise CommandError('El nombre del proyecto ya existe y no puede haber duplicados.')
+        try:
+            fecha_inicio = datetime.strptime(options['fecha_inicio'], '%d/%m/%Y').date()
+        except ValueError:
+            raise CommandError('La fecha de inicio debe tener el formato dia/mes/anho.')
+        lider = None
+        if options['lider']:
+            try:
+                lider = User.objects.get(username=options['lider'], is_active=True)
+            except User.DoesNotExist:
+                raise CommandError('No existe el usuario %s.' % options['lider'])
+        proyecto, mapas = clonar_proyecto(int(args[0]), options['nombre'], fecha_inicio, options['duracion'], lider)
+        self.stdout.write('Proyecto %s creado con %s fases, %s tipos de item y %s atributos' % (proyecto.id, len(mapas['fases']), len(mapas['tipos']), len(mapas['atributos'])))
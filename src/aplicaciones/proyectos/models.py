@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import m2m_changed
+from django.core.cache import cache
 from django.contrib.auth.models import User
 from aplicaciones.usuarios.models import Usuarios
 
@@ -14,6 +16,8 @@ class Proyectos(models.Model):
     duracion: campo de tipo numerico que contendra la duracion de proyecto en semanas.
     is_active: campo de tipo logico que indicara si el proyecto esta eliminado.
     miembros: campo que contendra la lista de miembros que trabajan en un proyecto. Es un muchos a muchos con la tabla Usuarios.
+    version_relaciones: cambia, con un valor nuevo de la secuencia proyectos_versiones_seq, cada vez que se modifican las
+    relaciones del proyecto. Los grafos y resultados calculados a partir de las relaciones se guardan indexados por ella.
     Los proyectos seran ordenados en la tabla por nombre.
     
     @author:  Romina Diaz de Bedoya
@@ -30,13 +34,48 @@ class Proyectos(models.Model):
     fecha_inicio = models.DateField()
     duracion = models.IntegerField()
     is_active = models.BooleanField(default=True)
+    version_relaciones = models.BigIntegerField(default=0)
     
     def __unicode__ (self):
         return self.nombre
+    
+    def save(self, *args, **kwargs):
+        
+        """ Al guardar un proyecto existente no se escribe version_relaciones, que solo cambia con las relaciones
+        (ver relaciones.grafo.incrementar_version), para no volver a una version anterior leida con el proyecto. """
+        
+        if not self._state.adding and not kwargs.get('update_fields') and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [campo.name for campo in self._meta.concrete_fields if not campo.primary_key and campo.name != 'version_relaciones']
+        super(Proyectos, self).save(*args, **kwargs)
 
     class Meta:
         ordering = ["nombre"]
         permissions = (
                       ("listar_miembros", "puede listar los miembros de un proyecto"),
                       ("importar_proyecto", "puede importar proyectos"),
-                      )
\ No newline at end of file
+                      )
+
+def clave_proyectos_visibles(id_usuario):
+    return 'proyectos:visibles:%s' % id_usuario
+
+def invalidar_proyectos_visibles(ids_usuarios):
+    
+    """ Descarta de la cache los proyectos visibles de los usuarios, cuando cambian sus roles. """
+    
+    if ids_usuarios:
+        cache.delete_many([clave_proyectos_visibles(id_usuario) for id_usuario in ids_usuarios])
+
+def roles_usuario_cambiados(sender, instance, action, reverse, pk_set, **kwargs):
+    
+    """ Invalida los proyectos visibles de los usuarios a los que se asigna o quita un rol, ya sea desde
+    el usuario (usuario.groups) o desde el rol (rol.user_set). """
+    
+    if reverse:
+        if action == 'pre_clear':
+            invalidar_proyectos_visibles(list(instance.user_set.values_list('id', flat=True)))
+        elif action in ('post_add', 'post_remove'):
+            invalidar_proyectos_visibles(pk_set)
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        invalidar_proyectos_visibles([instance.id])
+
+m2m_changed.connect(roles_usuario_cambiados, sender=User.groups.through)
@@ -0,0 +1,2 @@
+-- Secuencia de las versiones de Proyectos.version_relaciones. Se crea al crear la tabla con syncdb; en bases existentes ejecutar "python manage.py actualizar_base"
+CREATE SEQUENCE IF NOT EXISTS proyectos_versiones_seq;
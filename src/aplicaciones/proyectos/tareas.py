@@ -0,0 +1,25 @@
+from datetime import datetime
+from aplicaciones.trabajos.ejecucion import avanzar
+from .models import Proyectos
+from .clonacion import clonar_proyecto
+
+def importar_proyecto(trabajo, id_proyecto, nombre, fecha_inicio, duracion):
+
+    """ Tarea de procesar_trabajos que crea un proyecto importando la estructura de otro (ver clonar_proyecto).
+
+    @type fecha_inicio: string.
+    @param fecha_inicio: Fecha de inicio del proyecto nuevo en formato aaaa-mm-dd.
+
+    @rtype: diccionario.
+    @return: id del proyecto creado y cantidad de fases, tipos de item y atributos copiados.
+
+    @author: Juana Maldonado.
+
+    """
+
+    #El nombre se valido al encolar, pero otro trabajo pudo crear un proyecto con el mismo nombre
+    if Proyectos.objects.filter(nombre=nombre, is_active=True).exists():
+        raise ValueError('El nombre del proyecto ya existe y no puede haber duplicados')
+    fecha = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
+    proyecto, mapas = clonar_proyecto(id_proyecto, nombre, fecha, duracion, avance=lambda progreso, mensaje: avanzar(trabajo, progreso, mensaje))
+    return {'id_proyecto':proyecto.id, 'fases':len(mapas['fases']), 'tipos':len(mapas['tipos']), 'atributos':len(mapas['atributos'])}
@@ -4,7 +4,19 @@ from aplicaciones.fases.models import Fases
 from aplicaciones.usuarios.models import Usuarios
 from django.contrib.auth.models import User
 from django.test.client import RequestFactory 
-from .views import adm_proyectos, crear_proyecto, modificar_proyecto, consultar_proyecto, eliminar_proyecto, listar_miembros, importar_proyecto, importar
+import json
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from aplicaciones.pruebas import consultas_sin_cache
+from aplicaciones.roles.models import Roles
+from aplicaciones.tipoitem.models import TipoItem, ListaAtributo
+from aplicaciones.tipoatributo.models import TipoAtributo
+from django.core.management import call_command
+from datetime import date
+from StringIO import StringIO
+from .clonacion import clonar_proyecto
+from .views import proyectos_visibles, adm_proyectos, proyecto_finalizado, crear_proyecto, modificar_proyecto, consultar_proyecto, eliminar_proyecto, listar_miembros, listar_miembros_json, buscar_lider, importar_proyecto, importar
 
 class test_proyectos (TestCase):
     
@@ -15,6 +27,7 @@ class test_proyectos (TestCase):
             un request para utilizarlo en las vista.
         """
         self.factory = RequestFactory()
+        cache.clear()
         
     def test_adm_proyectos (self):
         
@@ -98,9 +111,131 @@ class test_proyectos (TestCase):
         request.user = self.user
         response = importar(request, proyecto_id)
         self.assertEqual(response.status_code, 200)
+        call_command('procesar_trabajos', una_vez=True, stdout=StringIO())
         proyectoImportado = Proyectos.objects.get(nombre='Proyecto 15 imp')
         self.assertTrue(proyectoImportado)
         print 'Test de Importar proyecto ejecutado exitosamente.'
+
+    def test_proyectos_visibles(self):
+        """ Los proyectos visibles de un usuario se obtienen con una consulta, se guardan en la cache y se
+            invalidan al asignar o quitar roles o al cambiar el proyecto de un rol.
+        """
+        usuario = User.objects.create_user('visible', 'visible@sicp.com', 'visible')
+        rol = Roles.objects.create(name='Rol Visible', proyecto='1', descripcion='ninguna')
+        otro = Roles.objects.create(name='Rol Sin Proyecto', proyecto='', descripcion='ninguna')
+        self.assertEqual(proyectos_visibles(usuario.id), [])
+        usuario.groups.add(rol, otro)
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(proyectos_visibles(usuario.id), [1])
+        self.assertEqual(len(consultas_sin_cache(consultas)), 1)
+        #Solo se lee la cache
+        with self.assertNumQueries(1):
+            proyectos_visibles(usuario.id)
+
+        request = self.factory.get('/adm_proyectos/', {'pagina': '9'})
+        request.user = usuario
+        response = adm_proyectos(request)
+        self.assertContains(response, Proyectos.objects.get(id=1).nombre)
+        self.assertContains(response, 'Pagina 1 de 1')
+
+        rol.proyecto = '2'
+        rol.save()
+        self.assertEqual(proyectos_visibles(usuario.id), [2])
+        rol.user_set.remove(usuario)
+        self.assertEqual(proyectos_visibles(usuario.id), [])
+        request = self.factory.get('/adm_proyectos/proyecto_finalizado/')
+        request.user = usuario
+        response = proyecto_finalizado(request)
+        self.assertEqual(response.status_code, 200)
+        print 'Test de proyectos visibles para un usuario ejecutado exitosamente.'
+
+    def test_miembros_proyecto(self):
+        """ Los miembros del proyecto y sus roles se obtienen con una sola consulta, agrupados por usuario,
+            y se listan paginados tanto en la pagina como en JSON.
+        """
+        miembro = User.objects.create_user('miembro', 'miembro@sicp.com', 'miembro')
+        inactivo = User.objects.create_user('inactivo', 'inactivo@sicp.com', 'inactivo')
+        inactivo.is_active = False
+        inactivo.save()
+        analista = Roles.objects.create(name='Analista Miembros', proyecto='1', descripcion='ninguna')
+        lider = Roles.objects.create(name='Lider Miembros', proyecto='1', descripcion='ninguna')
+        ajeno = Roles.objects.create(name='Rol Ajeno', proyecto='2', descripcion='ninguna')
+        miembro.groups.add(analista, lider, ajeno)
+        inactivo.groups.add(analista)
+
+        request = self.factory.get('adm_proyectos/listar_miembros/1/json/')
+        request.user = User.objects.get(pk=1)
+        with self.assertNumQueries(1):
+            response = listar_miembros_json(request, '1')
+        datos = json.loads(response.content)
+        miembros = dict((m['username'], m['roles']) for m in datos['miembros'])
+        self.assertEqual(miembros['miembro'], ['Analista Miembros', 'Lider Miembros'])
+        self.assertNotIn('inactivo', miembros)
+        self.assertEqual(datos['pagina'], 1)
+        self.assertEqual(datos['total'], len(datos['miembros']))
+
+        request = self.factory.get('adm_proyectos/listar_miembros/1', {'pagina': 'x'})
+        request.user = User.objects.get(pk=1)
+        response = listar_miembros(request, '1')
+        self.assertContains(response, 'Lider Miembros')
+        self.assertContains(response, 'Pagina 1 de 1')
+        self.assertNotContains(response, 'Rol Ajeno')
+        print 'Test de miembros de un proyecto con sus roles ejecutado exitosamente.'
+
+    def test_buscar_lider(self):
+        """ Los candidatos a lider son los usuarios activos con algun rol del proyecto, se sugieren por el
+            comienzo del nombre de usuario y solo ellos pueden asignarse como lider.
+        """
+        candidato = User.objects.create_user('candidato', 'candidato@sicp.com', 'candidato')
+        externo = User.objects.create_user('cand_externo', 'externo@sicp.com', 'externo')
+        rol = Roles.objects.create(name='Rol Candidato', proyecto='1', descripcion='ninguna')
+        otro = Roles.objects.create(name='Otro Rol Candidato', proyecto='1', descripcion='ninguna')
+        candidato.groups.add(rol, otro)
+
+        request = self.factory.get('adm_proyectos/modificar/1/lideres/', {'q': 'cand'})
+        request.user = User.objects.get(pk=1)
+        with self.assertNumQueries(1):
+            response = buscar_lider(request, '1')
+        self.assertEqual([c['username'] for c in json.loads(response.content)], ['candidato'])
+
+        proyecto = Proyectos.objects.get(id=1)
+        request = self.factory.post('adm_proyectos/modificar/1/', {'Nombre_del_Proyecto': proyecto.nombre, 'Nuevo_Lider': 'cand_externo', 'Duracion': '2'})
+        request.user = User.objects.get(pk=1)
+        response = modificar_proyecto(request, '1')
+        self.assertContains(response, 'no puede ser lider')
+        request = self.factory.post('adm_proyectos/modificar/1/', {'Nombre_del_Proyecto': proyecto.nombre, 'Nuevo_Lider': 'candidato', 'Duracion': '2'})
+        request.user = User.objects.get(pk=1)
+        response = modificar_proyecto(request, '1')
+        self.assertEqual(Proyectos.objects.get(id=1).lider, candidato)
+        print 'Test de buscar candidatos a lider de un proyecto ejecutado exitosamente.'
+
+    def test_clonar_proyecto(self):
+        """ La clonacion copia fases, tipos de item y atributos con una cantidad de consultas que no depende
+            del tamanio del proyecto, traduciendo los ids a los de la copia.
+        """
+        for numero in range(3):
+            tipoitem = TipoItem.objects.create(nombre='Tipo Clon %s' % numero, descripcion='ninguna', id_proyecto=1)
+            for orden in range(1, 5):
+                tipoatributo = TipoAtributo.objects.create(nombre='Clon %s %s' % (numero, orden), tipo='Texto', precision=0, longitud=10, descripcion='ninguna')
+                lista = ListaAtributo.objects.create(id_atributo=tipoatributo.id, id_tipoitem=tipoitem.id, nombre='Atributo %s' % orden, orden=orden)
+                tipoitem.listaAtributo.add(lista)
+        fases = Fases.objects.filter(proyecto=1, is_active=True).count()
+        tipos = TipoItem.objects.filter(id_proyecto=1, is_active=True).count()
+
+        with self.assertNumQueries(14):
+            proyecto, mapas = clonar_proyecto(1, 'Proyecto Clon', date(2014, 4, 17), 2)
+        self.assertEqual(Fases.objects.filter(proyecto=proyecto, estado='DF').count(), fases)
+        self.assertEqual(TipoItem.objects.filter(id_proyecto=proyecto.id).count(), tipos)
+        for viejo, nuevo in mapas['tipos'].items():
+            originales = ListaAtributo.objects.filter(id_tipoitem=viejo).order_by('orden')
+            copias = TipoItem.objects.get(id=nuevo).listaAtributo.order_by('orden')
+            self.assertEqual([(a.id_atributo, a.nombre, a.orden) for a in originales], [(c.id_atributo, c.nombre, c.orden) for c in copias])
+            self.assertTrue(all(c.id_tipoitem == nuevo for c in copias))
+
+        salida = StringIO()
+        call_command('clonar_proyecto', '1', nombre='Proyecto Clon 2', fecha_inicio='17/04/2014', duracion=2, stdout=salida)
+        self.assertIn('%s tipos de item' % tipos, salida.getvalue())
+        print 'Test de clonar un proyecto ejecutado exitosamente.'
         
     if __name__ == '__main__':
-        unittest.main()
\ No newline at end of file
+        unittest.main()
@@ -1,16 +1,84 @@
+import json
 from django.shortcuts import render_to_response, render, HttpResponseRedirect
+from django.http import HttpResponse
 from django.template import RequestContext
-from .forms import ProyectoNuevoForm, ProyectoModificadoForm
-from .models import Proyectos
+from .forms import ProyectoNuevoForm, ProyectoModificadoForm, candidatos_lider
+from .models import Proyectos, clave_proyectos_visibles
+from aplicaciones.trabajos.ejecucion import encolar
+from django.core.cache import cache
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib.auth.models import User
 from django.db.models import Q
 from aplicaciones.usuarios.models import Usuarios
 from aplicaciones.fases.models import Fases
 from django.contrib.auth.decorators import login_required, permission_required
 from aplicaciones.roles.models import Roles
-from aplicaciones.tipoitem.models import TipoItem, ListaAtributo
-from aplicaciones.tipoitem.views import ordenar_mantener
 
+PROYECTOS_POR_PAGINA = 20
+DURACION_VISIBLES = 3600
+LIDERES_SUGERIDOS = 10
+
+def proyectos_visibles(id_usuario):
+    
+    """ Obtiene los ids de los proyectos en los que el usuario tiene algun rol, con una sola consulta que
+    une los grupos del usuario con los roles. El resultado se guarda en la cache y se descarta al
+    asignar o quitar roles al usuario o al cambiar el proyecto de uno de sus roles. La cache es la de
+    la base de datos (ver CACHES en settings), compartida por todos los procesos del servidor, por lo
+    que el descarte se ve en todos ellos.
+    
+    @type id_usuario: entero.
+    @param id_usuario: id del usuario.
+    
+    @rtype: lista.
+    @return: ids de los proyectos visibles para el usuario.
+    
+    @author: Juana Maldonado.
+    
+    """
+    
+    clave = clave_proyectos_visibles(id_usuario)
+    ids = cache.get(clave)
+    if ids is None:
+        proyectos = Roles.objects.filter(user__id=id_usuario).exclude(proyecto='').values_list('proyecto', flat=True).distinct()
+        ids = sorted(int(id_proyecto) for id_proyecto in proyectos if id_proyecto.isdigit())
+        cache.set(clave, ids, DURACION_VISIBLES)
+    return ids
+
+def paginar_proyectos(request, proyectos):
+    
+    """ Devuelve la pagina de proyectos (o de miembros) indicada en el parametro pagina del request. """
+    
+    paginator = Paginator(proyectos, PROYECTOS_POR_PAGINA)
+    try:
+        return paginator.page(request.GET.get('pagina', 1))
+    except PageNotAnInteger:
+        return paginator.page(1)
+    except EmptyPage:
+        return paginator.page(paginator.num_pages)
+
+def miembros_proyecto(id_proyecto):
+    
+    """ Obtiene los usuarios activos que tienen algun rol en el proyecto junto con esos roles, con una sola
+    consulta que une los roles del proyecto con sus usuarios, agrupando las filas por usuario.
+    
+    @type id_proyecto: string.
+    @param id_proyecto: id del proyecto.
+    
+    @rtype: lista.
+    @return: Un diccionario por miembro con id, username, first_name, last_name y la lista de nombres de sus
+    roles en el proyecto, ordenados por nombre de usuario.
+    
+    @author: Juana Maldonado.
+    
+    """
+    
+    filas = Roles.objects.filter(proyecto=str(id_proyecto), user__is_active=True).order_by('user__username', 'user__id', 'name')
+    miembros = []
+    for id_usuario, username, first_name, last_name, rol in filas.values_list('user__id', 'user__username', 'user__first_name', 'user__last_name', 'name'):
+        if not miembros or miembros[-1]['id'] != id_usuario:
+            miembros.append({'id':id_usuario, 'username':username, 'first_name':first_name, 'last_name':last_name, 'roles':[]})
+        miembros[-1]['roles'].append(rol)
+    return miembros
 
 @login_required(login_url='/login/')
 def adm_proyectos (request):
@@ -30,15 +98,7 @@ def adm_proyectos (request):
     """
     
     if request.user.id != 1:
-        id_p=[]
-        usuario = User.objects.get(id=request.user.id)
-        rolesUsuario=usuario.groups.all()
-        roles = Roles.objects.all()
-        for rls in roles:
-            for ru in rolesUsuario:
-                if rls.name == ru.name and rls.proyecto:
-                    id_p.append(rls.proyecto)
-        proyectos = Proyectos.objects.filter(pk__in=id_p, is_active=True)
+        proyectos = Proyectos.objects.filter(pk__in=proyectos_visibles(request.user.id), is_active=True)
 
     else:
         proyectos = Proyectos.objects.filter(is_active=True)
@@ -62,7 +122,8 @@ def adm_proyectos (request):
             if not proyectos:
                 error = True
         
-    ctx = {'lista_proyectos':proyectos, 'query':busqueda, 'error':error}   
+    pagina = paginar_proyectos(request, proyectos.select_related('lider'))
+    ctx = {'lista_proyectos':pagina.object_list, 'pagina':pagina, 'query':busqueda, 'error':error}
     template_name = 'index.html'
     return render_to_response(template_name, ctx, context_instance=RequestContext(request))
 
@@ -83,15 +144,7 @@ def proyecto_finalizado (request):
     
     """
     if request.user.id != 1:
-        id_p=[]
-        usuario = User.objects.get(id=request.user.id)
-        rolesUsuario=usuario.groups.all()
-        roles = Roles.objects.all()
-        for rls in roles:
-            for ru in rolesUsuario:
-                if rls.name == ru.name:
-                    id_p.append(rls.proyecto)
-        proyectos = Proyectos.objects.filter(pk__in=id_p, is_active=True, estado='Finalizado')
+        proyectos = Proyectos.objects.filter(pk__in=proyectos_visibles(request.user.id), is_active=True, estado='Finalizado')
 
     else:
         proyectos = Proyectos.objects.filter(is_active=True, estado='Finalizado')
@@ -113,7 +166,8 @@ def proyecto_finalizado (request):
             if not proyectos:
                 error = True
     
-    ctx = {'lista_proyectos':proyectos, 'query':busqueda, 'error':error}
+    pagina = paginar_proyectos(request, proyectos.select_related('lider'))
+    ctx = {'lista_proyectos':pagina.object_list, 'pagina':pagina, 'query':busqueda, 'error':error}
     template_name = 'proyectos/proyectofinalizado.html'
     return render_to_response(template_name, ctx, context_instance=RequestContext(request))
 
@@ -188,22 +242,6 @@ def modificar_proyecto (request, id_proyecto):
     
     """
     mensaje=''
-    lista=[]      
-    roles = Roles.objects.filter(proyecto=id_proyecto)
-    users = User.objects.filter(is_active=True).exclude(id=1)
-    for rol in roles:
-        for user in users:
-            roles_usuario=user.groups.all()
-            for ru in roles_usuario:
-                if ru.name == rol.name:
-                    tupla=(user.id, user.username)
-                    lista.append(tupla)
-    choices_lider=[]
-    if not lista:
-        mensaje='No existen opciones de lider para este proyecto'
-    for eleccion in lista:
-        if eleccion not in choices_lider:
-            choices_lider.append(eleccion)
      
     ESTADOS_PROYECTO = (
         ('Inactivo', 'Inactivo'),
@@ -213,7 +251,7 @@ def modificar_proyecto (request, id_proyecto):
      
     proyecto = Proyectos.objects.get(id=id_proyecto)
     if request.method == 'POST':
-        form = ProyectoModificadoForm(request.POST)
+        form = ProyectoModificadoForm(request.POST, id_proyecto=id_proyecto)
         if form.is_valid():
             form.clean()
             nombreNuevo = form.cleaned_data['Nombre_del_Proyecto'] 
@@ -223,11 +261,9 @@ def modificar_proyecto (request, id_proyecto):
             
             #Si no se ha suministrado un nuevo lider, el proyecto se queda con el lider actual
             if not lider:
-                if proyecto.lider:
-                    lideruser = User.objects.get(username=proyecto.lider)
-                else:
-                    lideruser = None
-            #lideruser = User.objects.get(id=lider)
+                lideruser = proyecto.lider
+            else:
+                lideruser = lider
             
             #Si no se ha suministrado un nuevo estado, el proyecto se queda con el estado actual
             if not estado:
@@ -236,7 +272,7 @@ def modificar_proyecto (request, id_proyecto):
             # Comprobar cantidad miembros de comite para pasar a un estado en construccion con un elif
             #si exite ya un proyecto con el nombre suministrado y el nombre suminitrado es distinto al del proyecto que esta siendo modificado
             if Proyectos.objects.filter(nombre=nombreNuevo) and nombreNuevo != proyecto.nombre:  
-                form = ProyectoModificadoForm()
+                form = ProyectoModificadoForm(id_proyecto=id_proyecto)
                 mensaje = 'El nombre del proyecto ya existe y no puede haber duplicados'
             
             else:
@@ -258,12 +294,38 @@ def modificar_proyecto (request, id_proyecto):
                 template_name='proyectos/proyectoalerta.html'
                 return render_to_response(template_name, ctx, context_instance=RequestContext(request))
     else:       
-        form = ProyectoModificadoForm()
+        form = ProyectoModificadoForm(id_proyecto=id_proyecto)
         
-    ctx ={'form': form, 'mensaje':mensaje, 'proyecto':proyecto, 'choices_lider':choices_lider, 'ESTADOS_PROYECTO':ESTADOS_PROYECTO}      
+    ctx ={'form': form, 'mensaje':mensaje, 'proyecto':proyecto, 'ESTADOS_PROYECTO':ESTADOS_PROYECTO}      
     template_name='proyectos/modificarproyecto.html'
     return render_to_response(template_name, ctx, context_instance=RequestContext(request))
 
+@login_required(login_url='/login/')
+@permission_required('proyectos.change_proyectos',raise_exception=True)
+def buscar_lider (request, id_proyecto):
+    
+    """ Recibe un request con el comienzo de un nombre de usuario en el parametro q y el id del proyecto,
+    y devuelve en JSON los primeros candidatos a lider del proyecto que coinciden, para sugerirlos mientras
+    se escribe en el formulario de modificacion.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista buscar_lider.
+     
+    @rtype: django.http.HttpResponse.
+    @return: Lista de candidatos con id, username y nombre completo.
+    
+    @type id_proyecto : string.
+    @param id_proyecto : Contiene el id del proyecto cuyo lider se busca.
+    
+    @author: Juana Maldonado.
+    
+    """
+    
+    candidatos = candidatos_lider(id_proyecto, request.GET.get('q', '').strip())[:LIDERES_SUGERIDOS]
+    datos = [{'id':id_usuario, 'username':username, 'nombre':(u'%s %s' % (first_name, last_name)).strip()}
+             for id_usuario, username, first_name, last_name in candidatos.values_list('id', 'username', 'first_name', 'last_name')]
+    return HttpResponse(json.dumps(datos), content_type='application/json')
+
 @login_required(login_url='/login/')
 def consultar_proyecto (request, id_proyecto):
     
@@ -347,55 +409,37 @@ def listar_miembros (request, id_proyecto):
     
     """
     
-    """proyecto = Proyectos.objects.get(id=id_proyecto)
-    miembros = Proyectos.objects.get(id=id_proyecto).miembros.all()
-    user_rol={}
-    for miembro in miembros:
-        usuario = User.objects.get(username=miembro)
-        rolesmiembro = usuario.groups.all()
-        lista = []
-        for rol in rolesmiembro:
-            lista.append(rol)
-        user_rol[usuario.id]= lista"""
-    
-    
-    users = User.objects.all()
     proyecto = Proyectos.objects.get(id=id_proyecto)
-    rolesProyecto = Roles.objects.filter(proyecto=id_proyecto)
-    
-    #conseguimos la lista de usuarios que tienen un rol en el proyecto
-    lista = []
-    roluser=[]
-    for user in users:
-        if user.is_active:
-            rols = user.groups.all()
-            for rol in rols:
-                for roluser in rolesProyecto:
-                    if rol.name == roluser.name:
-                        lista.append(user)
-                        
-    #eliminamos los usuarios duplicados si existen
-    listamiembro = []                    
-    for lis in lista:
-        if lis not in listamiembro:
-            listamiembro.append(lis)
-            
-    #Armamos una lista de tuplas de usuario con sus roles en el proyecto
-    lista=[]
-    for miembro in listamiembro:
-        rls=[]
-        roles = miembro.groups.all()
-        for r in roles:
-            for rp in rolesProyecto:
-                if r.name == rp.name:
-                    rls.append(rp)
-        tupla = (miembro, rls)
-        lista.append(tupla)                       
-        
-    ctx ={'miembros':lista, 'proyecto':proyecto}
+    pagina = paginar_proyectos(request, miembros_proyecto(id_proyecto))
+    ctx ={'miembros':pagina.object_list, 'pagina':pagina, 'proyecto':proyecto}
     template_name = 'proyectos/listarmiembrosproyecto.html'
     return render_to_response(template_name, ctx, context_instance=RequestContext(request))
 
+@login_required(login_url='/login/')
+@permission_required('proyectos.listar_miembros',raise_exception=True)
+def listar_miembros_json (request, id_proyecto):
+    
+    """ Recibe un request y el id del proyecto y devuelve en JSON la misma pagina de miembros, con sus
+    roles en el proyecto, que lista listar_miembros.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista listar_miembros_json
+     
+    @rtype: django.http.HttpResponse.
+    @return: Los miembros de la pagina solicitada junto con el numero de pagina, la cantidad de paginas y
+    la cantidad total de miembros.
+    
+    @type id_proyecto : string.
+    @param id_proyecto : Contiene el id del proyecto cuyos miembros seran listados.
+    
+    @author: Juana Maldonado
+    
+    """
+    
+    pagina = paginar_proyectos(request, miembros_proyecto(id_proyecto))
+    datos = {'miembros':pagina.object_list, 'pagina':pagina.number, 'paginas':pagina.paginator.num_pages, 'total':pagina.paginator.count}
+    return HttpResponse(json.dumps(datos), content_type='application/json')
+
 @login_required(login_url='/login/')
 @permission_required('proyectos.importar_proyecto',raise_exception=True)
 def importar_proyecto (request):
@@ -424,7 +468,7 @@ def importar (request, id_proyecto):
     """ Recibe un request y el id del proyecto a ser importado, se verifica si el usuario tiene
     permisos para importar un proyecto existente, luego se lo redirige a la pagina para completar los
     datos del formulario de nuevo proyecto importado, una vez completado correctamente el formulario el
-    sistema crea un nuevo proyecto con las caracteristicas del proyecto importado.
+    sistema encola la creacion de un nuevo proyecto con las caracteristicas del proyecto importado.
     
     @type request: django.http.HttpRequest.
     @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista importar.
@@ -434,7 +478,7 @@ def importar (request, id_proyecto):
     
     @rtype: django.shortcuts.render_to_response.
     @return: crearproyectoimportado.html, donde se redirige al usuario para completar los datos del nuevo
-    proyecto importado o a proyectoalerta.html donde se notifica que el proyecto fue importado correctamente.
+    proyecto importado o trabajo.html donde se muestra el avance de la importacion.
     
     @author: Juana Maldonado.
     
@@ -449,51 +493,11 @@ def importar (request, id_proyecto):
             fecha_inicio = form.cleaned_data['Fecha_de_Inicio']
             duracion =  form.cleaned_data['Duracion']
             
-            proyecto = Proyectos()
-            proyecto.nombre=nombre
-            proyecto.lider=None
-            proyecto.fecha_inicio=fecha_inicio
-            proyecto.duracion=duracion
-            proyecto.is_active='True'
-            proyecto.save()
-                
-            fasesImportadas = Fases.objects.filter(proyecto=id_proyecto, is_active=True)     
-            for faseImport in fasesImportadas:
-                fase = Fases()
-                fase.nombre = faseImport.nombre
-                fase.estado = 'DF'
-                fase.proyecto = proyecto
-                fase.save()
-                
-            tipoitems=TipoItem.objects.filter(id_proyecto=id_proyecto, is_active=True)
-            for tipoitem in tipoitems:
-                TI= TipoItem()
-                TI.nombre=tipoitem.nombre
-                TI.descripcion=tipoitem.descripcion
-                TI.id_proyecto=proyecto.id
-                TI.is_active='True'
-                TI.save()
-                    
-                elementos_existentes = ordenar_mantener(tipoitem.id)
-                for elemento in elementos_existentes:
-                    lista_atributo = ListaAtributo()
-                    lista_atributo.id_atributo = elemento.id
-                    lista_atributo.id_tipoitem = TI.id
-                    lista_atributo.nombre = elemento.nombre
-                    lista_atributo.is_active = True
-                    
-                    elementos = ordenar_mantener(TI.id)
-                    if elementos:
-                        lista_atributo.orden = len(elementos_existentes) + 1
-                    else:
-                        lista_atributo.orden = 1
-                    lista_atributo.save()
-                        
-                    TI.listaAtributo.add(lista_atributo)
-            
-            mensaje="Proyecto importado exitosamente"
-            ctx = {'mensaje':mensaje}
-            return render_to_response('proyectos/proyectoalerta.html',ctx, context_instance=RequestContext(request))
+            #La copia se hace en segundo plano y la pagina del trabajo muestra su avance
+            parametros = {'id_proyecto':proyectoImportado.id, 'nombre':nombre, 'fecha_inicio':fecha_inicio.isoformat(), 'duracion':duracion}
+            trabajo = encolar('aplicaciones.proyectos.tareas.importar_proyecto', parametros, 'Importar %s como %s' % (proyectoImportado.nombre, nombre), request.user)
+            ctx = {'trabajo':trabajo}
+            return render_to_response('trabajos/trabajo.html',ctx, context_instance=RequestContext(request))
     else:   
         form = ProyectoNuevoForm()
         
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db import connection
+
+""" Tabla de la cache compartida (ver CACHES en settings) """
+TABLA_CACHE = settings.CACHES['default'].get('LOCATION', '')
+
+def consultas_sin_cache(consultas):
+    
+    """ Devuelve el sql de las consultas capturadas con CaptureQueriesContext sin las que leen o escriben la
+    cache ni los savepoints con los que se protegen sus escrituras, para que las pruebas cuenten solo las
+    consultas propias de la funcion probada. """
+    
+    return [consulta['sql'] for consulta in consultas.captured_queries
+            if not (TABLA_CACHE and TABLA_CACHE in consulta['sql']) and 'SAVEPOINT' not in consulta['sql']]
+
+def plan_consulta(consulta):
+    
+    """ Devuelve el plan de ejecucion (EXPLAIN) de un queryset con los recorridos secuenciales desalentados,
+    de modo que solo aparecen si no hay un indice que resuelva la consulta. """
+    
+    sql, parametros = consulta.query.sql_with_params()
+    cursor = connection.cursor()
+    cursor.execute('SET LOCAL enable_seqscan = off')
+    cursor.execute('EXPLAIN ' + sql, parametros)
+    return '\n'.join(fila[0] for fila in cursor.fetchall())
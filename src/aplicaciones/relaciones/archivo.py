@@ -0,0 +1,117 @@
+from datetime import timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+
+COLUMNAS_RELACION = 'id, padre_id, antecesor_id, sucesor_id, hijo_id, proyecto, faseprimera, fasesegunda, fecha_baja'
+
+#Registra como fecha de baja la actual en un lote de relaciones inactivas que no la tienen
+FECHAR_LOTE = """
+    UPDATE relaciones_relaciones SET fecha_baja = %(ahora)s WHERE id IN (
+        SELECT id FROM relaciones_relaciones
+        WHERE is_active = false AND fecha_baja IS NULL {filtro}
+        ORDER BY id LIMIT %(lote)s)"""
+
+#Mueve un lote de relaciones inactivas dadas de baja hasta el limite a la tabla de archivo
+ARCHIVAR_LOTE = """
+    WITH movidas AS (
+        DELETE FROM relaciones_relaciones WHERE id IN (
+            SELECT id FROM relaciones_relaciones
+            WHERE is_active = false AND fecha_baja <= %(limite)s {filtro}
+            ORDER BY id LIMIT %(lote)s)
+        RETURNING """ + COLUMNAS_RELACION + """
+    )
+    INSERT INTO relaciones_relacionarchivada (""" + COLUMNAS_RELACION + """, fecha_archivo)
+    SELECT """ + COLUMNAS_RELACION + """, %(ahora)s FROM movidas"""
+
+#Devuelve un lote de relaciones archivadas a Relaciones, inactivas como estaban
+RESTAURAR_LOTE = """
+    WITH restauradas AS (
+        DELETE FROM relaciones_relacionarchivada WHERE id IN (
+            SELECT id FROM relaciones_relacionarchivada WHERE true {filtro} ORDER BY id LIMIT %(lote)s)
+        RETURNING """ + COLUMNAS_RELACION + """
+    )
+    INSERT INTO relaciones_relaciones (""" + COLUMNAS_RELACION + """, is_active)
+    SELECT """ + COLUMNAS_RELACION + """, false FROM restauradas"""
+
+def tamanio_relaciones():
+
+    """ Obtiene el espacio que ocupa en disco la tabla de relaciones, con sus indices.
+
+    @rtype: entero.
+    @return: Tamanio en bytes.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    cursor = connection.cursor()
+    cursor.execute("SELECT pg_total_relation_size('relaciones_relaciones')")
+    return cursor.fetchone()[0]
+
+def mover_lotes(sql, parametros, lote):
+    cursor = connection.cursor()
+    parametros = dict(parametros, lote=lote)
+    movidas = 0
+    while True:
+        with transaction.atomic():
+            cursor.execute(sql, parametros)
+            cantidad = cursor.rowcount
+        movidas = movidas + cantidad
+        if cantidad < lote:
+            return movidas
+
+def archivar_relaciones(dias, id_proyecto=None, lote=1000):
+
+    """ Mueve a RelacionArchivada las relaciones inactivas dadas de baja hace mas de la cantidad de dias
+    indicada. Las relaciones inactivas sin fecha de baja reciben antes la fecha actual, de modo que se
+    archivan cuando pasa el plazo desde que se detectaron en lugar de archivarse enseguida. Se procesan
+    por lotes, cada uno en su propia transaccion, para no bloquear la tabla.
+
+    @type dias: entero.
+    @param dias: Antiguedad minima de la baja.
+
+    @type id_proyecto: entero.
+    @param id_proyecto: Limita el archivo a un proyecto, None para todos.
+
+    @rtype: entero.
+    @return: Cantidad de relaciones archivadas.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    ahora = timezone.now()
+    parametros = {'limite': ahora - timedelta(days=dias), 'ahora': ahora, 'proyecto': id_proyecto}
+    filtro = 'AND proyecto = %(proyecto)s' if id_proyecto is not None else ''
+    mover_lotes(FECHAR_LOTE.format(filtro=filtro), parametros, lote)
+    return mover_lotes(ARCHIVAR_LOTE.format(filtro=filtro), parametros, lote)
+
+def restaurar_relaciones(id_proyecto=None, lote=1000):
+
+    """ Devuelve a Relaciones las relaciones archivadas, con su id original y todavia inactivas.
+
+    @type id_proyecto: entero.
+    @param id_proyecto: Limita la restauracion a un proyecto, None para todos.
+
+    @rtype: entero.
+    @return: Cantidad de relaciones restauradas.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    filtro = 'AND proyecto = %(proyecto)s' if id_proyecto is not None else ''
+    return mover_lotes(RESTAURAR_LOTE.format(filtro=filtro), {'proyecto': id_proyecto}, lote)
+
+def vaciar_relaciones(completo=False):
+
+    """ Ejecuta VACUUM sobre la tabla de relaciones para que el espacio de las filas archivadas pueda
+    reutilizarse o, con completo, devolverse al sistema operativo (VACUUM FULL bloquea la tabla).
+    Debe ejecutarse fuera de una transaccion.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    cursor = connection.cursor()
+    cursor.execute('VACUUM FULL ANALYZE relaciones_relaciones' if completo else 'VACUUM ANALYZE relaciones_relaciones')
@@ -0,0 +1,222 @@
+from collections import defaultdict, deque
+from django.db import connection, transaction
+from django.db.models import Min
+from .models import Relaciones, ClausuraRelacion
+
+#Caminos que pasan por la relacion de origen a destino: los caminos que llegan al origen combinados con los
+#que salen del destino, incluyendo los caminos vacios que empiezan y terminan en la propia relacion
+CAMINOS_RELACION = """
+    WITH arriba AS (
+        SELECT ancestro, profundidad, tipo, caminos FROM relaciones_clausurarelacion WHERE proyecto = %(proyecto)s AND descendiente = %(origen)s
+        UNION ALL SELECT %(origen)s, 0, '', 1
+    ), abajo AS (
+        SELECT descendiente, profundidad, tipo, caminos FROM relaciones_clausurarelacion WHERE proyecto = %(proyecto)s AND ancestro = %(destino)s
+        UNION ALL SELECT %(destino)s, 0, '', 1
+    ), nuevos AS (
+        SELECT arriba.ancestro, abajo.descendiente, arriba.profundidad + abajo.profundidad + 1 AS profundidad,
+               CASE WHEN arriba.tipo IN ('', %(tipo)s) AND abajo.tipo IN ('', %(tipo)s) THEN %(tipo)s ELSE 'Mixta' END AS tipo,
+               SUM(arriba.caminos * abajo.caminos) AS caminos
+        FROM arriba CROSS JOIN abajo GROUP BY 1, 2, 3, 4
+    )"""
+
+AGREGAR_CAMINOS = CAMINOS_RELACION + """
+    INSERT INTO relaciones_clausurarelacion (proyecto, ancestro, descendiente, profundidad, tipo, caminos)
+    SELECT %(proyecto)s, ancestro, descendiente, profundidad, tipo, caminos FROM nuevos
+    ON CONFLICT (proyecto, ancestro, descendiente, profundidad, tipo) DO UPDATE SET caminos = relaciones_clausurarelacion.caminos + EXCLUDED.caminos"""
+
+QUITAR_CAMINOS = CAMINOS_RELACION + """, borrados AS (
+        DELETE FROM relaciones_clausurarelacion c USING nuevos
+        WHERE c.proyecto = %(proyecto)s AND c.ancestro = nuevos.ancestro AND c.descendiente = nuevos.descendiente
+        AND c.profundidad = nuevos.profundidad AND c.tipo = nuevos.tipo AND c.caminos <= nuevos.caminos
+    )
+    UPDATE relaciones_clausurarelacion c SET caminos = c.caminos - nuevos.caminos FROM nuevos
+    WHERE c.proyecto = %(proyecto)s AND c.ancestro = nuevos.ancestro AND c.descendiente = nuevos.descendiente
+    AND c.profundidad = nuevos.profundidad AND c.tipo = nuevos.tipo AND c.caminos > nuevos.caminos"""
+
+def extremos(relacion):
+
+    """ Obtiene el sentido de una relacion en el grafo de trazabilidad.
+
+    @type relacion: Relaciones.
+    @param relacion: Relacion de la que se obtienen los extremos.
+
+    @rtype: tupla o None.
+    @return: El item de origen, el de destino y el tipo (Padre o Antecesor), o None si la relacion esta incompleta.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    if relacion.padre_id is not None and relacion.hijo_id is not None:
+        return relacion.padre_id, relacion.hijo_id, 'Padre'
+    if relacion.antecesor_id is not None and relacion.sucesor_id is not None:
+        return relacion.antecesor_id, relacion.sucesor_id, 'Antecesor'
+    return None
+
+def actualizar_clausura(relacion, sql):
+    extremo = extremos(relacion)
+    if extremo is None:
+        return
+    origen, destino, tipo = extremo
+    cursor = connection.cursor()
+    cursor.execute(sql, {'proyecto': int(relacion.proyecto), 'origen': origen, 'destino': destino, 'tipo': tipo})
+
+def agregar_clausura(relacion):
+
+    """ Suma a la tabla de clausura los caminos que pasan por una relacion recien creada. Solo se tocan
+    las filas que van de los ancestros del origen a los descendientes del destino. Debe llamarse en la
+    misma transaccion que crea la relacion.
+
+    @type relacion: Relaciones.
+    @param relacion: Relacion activa creada.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    actualizar_clausura(relacion, AGREGAR_CAMINOS)
+
+def quitar_clausura(relacion):
+
+    """ Descuenta de la tabla de clausura los caminos que pasaban por una relacion desactivada, y
+    elimina las filas que se quedan sin caminos. Debe llamarse en la misma transaccion que desactiva
+    la relacion.
+
+    @type relacion: Relaciones.
+    @param relacion: Relacion desactivada.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    actualizar_clausura(relacion, QUITAR_CAMINOS)
+
+def ancestros(id_proyecto, id_item, tipo=None):
+
+    """ Obtiene los items de los que depende un item, con la menor profundidad a la que se encuentran.
+
+    @type tipo: string.
+    @param tipo: Padre o Antecesor para seguir solo caminos de ese tipo, None para todos.
+
+    @rtype: lista.
+    @return: Pares (id del ancestro, profundidad) ordenados por profundidad.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    filas = ClausuraRelacion.objects.filter(proyecto=id_proyecto, descendiente=id_item)
+    if tipo:
+        filas = filas.filter(tipo=tipo)
+    return list(filas.values('ancestro').annotate(distancia=Min('profundidad')).order_by('distancia', 'ancestro').values_list('ancestro', 'distancia'))
+
+def descendientes(id_proyecto, id_item, tipo=None):
+
+    """ Obtiene los items que dependen de un item, con la menor profundidad a la que se encuentran.
+
+    @type tipo: string.
+    @param tipo: Padre o Antecesor para seguir solo caminos de ese tipo, None para todos.
+
+    @rtype: lista.
+    @return: Pares (id del descendiente, profundidad) ordenados por profundidad.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    filas = ClausuraRelacion.objects.filter(proyecto=id_proyecto, ancestro=id_item)
+    if tipo:
+        filas = filas.filter(tipo=tipo)
+    return list(filas.values('descendiente').annotate(distancia=Min('profundidad')).order_by('distancia', 'descendiente').values_list('descendiente', 'distancia'))
+
+def es_ancestro(id_proyecto, id_ancestro, id_descendiente):
+
+    """ Indica si existe un camino de relaciones activas de un item a otro.
+
+    @rtype: booleano.
+    @return: True si id_descendiente depende de id_ancestro.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    return ClausuraRelacion.objects.filter(proyecto=id_proyecto, ancestro=id_ancestro, descendiente=id_descendiente).exists()
+
+def clausura_esperada(id_proyecto):
+
+    """ Calcula desde cero la clausura de las relaciones activas del proyecto, recorriendo el grafo en
+    orden topologico inverso y acumulando los caminos de cada item a partir de los de sus sucesores.
+
+    @rtype: diccionario.
+    @return: Cantidad de caminos por (ancestro, descendiente, profundidad, tipo).
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    salientes = defaultdict(list)
+    entrantes = defaultdict(int)
+    for relacion in Relaciones.activas.filter(proyecto=id_proyecto).only('padre_id', 'hijo_id', 'antecesor_id', 'sucesor_id'):
+        extremo = extremos(relacion)
+        if extremo is not None:
+            origen, destino, tipo = extremo
+            salientes[origen].append((destino, tipo))
+            entrantes[destino] += 1
+            entrantes[origen] += 0
+    pendientes = deque(nodo for nodo in entrantes if entrantes[nodo] == 0)
+    orden = []
+    while pendientes:
+        nodo = pendientes.popleft()
+        orden.append(nodo)
+        for destino, tipo in salientes[nodo]:
+            entrantes[destino] -= 1
+            if entrantes[destino] == 0:
+                pendientes.append(destino)
+    if len(orden) < len(entrantes):
+        raise ValueError('Las relaciones activas del proyecto %s forman un ciclo.' % id_proyecto)
+    caminos = {}
+    esperada = {}
+    for nodo in reversed(orden):
+        propios = defaultdict(int)
+        for destino, tipo in salientes[nodo]:
+            propios[(destino, 1, tipo)] += 1
+            for (descendiente, profundidad, tipocamino), cantidad in caminos[destino].iteritems():
+                propios[(descendiente, profundidad + 1, tipo if tipocamino == tipo else 'Mixta')] += cantidad
+        caminos[nodo] = propios
+        for (descendiente, profundidad, tipo), cantidad in propios.iteritems():
+            esperada[(nodo, descendiente, profundidad, tipo)] = cantidad
+    return esperada
+
+def diferencias_clausura(id_proyecto):
+
+    """ Compara la tabla de clausura del proyecto con la calculada desde cero.
+
+    @rtype: lista.
+    @return: Tuplas (ancestro, descendiente, profundidad, tipo, caminos guardados, caminos esperados) que no coinciden.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    esperada = clausura_esperada(id_proyecto)
+    guardada = dict(((ancestro, descendiente, profundidad, tipo), caminos) for ancestro, descendiente, profundidad, tipo, caminos in
+                    ClausuraRelacion.objects.filter(proyecto=id_proyecto).values_list('ancestro', 'descendiente', 'profundidad', 'tipo', 'caminos'))
+    return sorted(clave + (guardada.get(clave, 0), esperada.get(clave, 0)) for clave in set(esperada) | set(guardada) if guardada.get(clave, 0) != esperada.get(clave, 0))
+
+def reconstruir_clausura(id_proyecto):
+
+    """ Reemplaza la tabla de clausura del proyecto por la calculada desde cero.
+
+    @rtype: entero.
+    @return: Cantidad de filas guardadas.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    esperada = clausura_esperada(id_proyecto)
+    with transaction.atomic():
+        ClausuraRelacion.objects.filter(proyecto=id_proyecto).delete()
+        ClausuraRelacion.objects.bulk_create([ClausuraRelacion(proyecto=id_proyecto, ancestro=ancestro, descendiente=descendiente, profundidad=profundidad, tipo=tipo, caminos=caminos)
+                                              for (ancestro, descendiente, profundidad, tipo), caminos in esperada.iteritems()], batch_size=1000)
+    return len(esperada)
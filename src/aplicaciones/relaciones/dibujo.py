@@ -0,0 +1,124 @@
+import hashlib
+import subprocess
+from distutils.spawn import find_executable
+from django.conf import settings
+from django.core.cache import cache
+from aplicaciones.fases.models import Fases
+from aplicaciones.items.models import Items
+from .models import Relaciones
+
+DURACION_DIBUJO = 3600
+
+COLORES_ESTADO = {
+    'En Construccion': 'lightyellow',
+    'En Revision': 'orange',
+    'En revision': 'orange',
+    'Validado': 'palegreen',
+    'Bloqueado': 'lightgrey',
+}
+COLOR_DEFECTO = 'white'
+
+def texto_dot(valor):
+    return '"%s"' % unicode(valor if valor is not None else '').replace('\\', '\\\\').replace('"', '\\"')
+
+def arista_dot(relacion):
+    if relacion.padre_id is not None and relacion.hijo_id is not None:
+        return '  i%s -> i%s;' % (relacion.padre_id, relacion.hijo_id)
+    if relacion.antecesor_id is not None and relacion.sucesor_id is not None:
+        return '  i%s -> i%s [style=dashed];' % (relacion.antecesor_id, relacion.sucesor_id)
+    return None
+
+def dibujar_fase(id_proyecto, id_fase, nombre):
+
+    """ Genera el fragmento DOT de una fase: un subgrafo con sus items coloreados por estado y las
+    relaciones entre ellos, seguido de las relaciones que llegan a la fase desde otras fases.
+
+    @rtype: unicode.
+    @return: El fragmento DOT de la fase.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    lineas = [' subgraph cluster_%s {' % id_fase, '  label=%s;' % texto_dot(nombre)]
+    for id_item, nombreitem, estado in Items.objects.filter(fase_id=id_fase, is_active=True).order_by('id').values_list('id', 'nombre', 'estado'):
+        lineas.append('  i%s [label=%s, fillcolor=%s];' % (id_item, texto_dot(nombreitem), COLORES_ESTADO.get(estado, COLOR_DEFECTO)))
+    externas = []
+    for relacion in Relaciones.activas.filter(proyecto=id_proyecto, fasesegunda=id_fase).order_by('id'):
+        arista = arista_dot(relacion)
+        if arista is None:
+            continue
+        if relacion.faseprimera == relacion.fasesegunda:
+            lineas.append(arista)
+        else:
+            externas.append(arista)
+    lineas.append(' }')
+    return u'\n'.join(lineas + externas)
+
+def clave_fase(id_fase, nombre, version):
+    return 'relaciones:dot:fase:%s:%s:%s' % (id_fase, version, hashlib.md5(unicode(nombre).encode('utf-8')).hexdigest())
+
+def dot_proyecto(id_proyecto):
+
+    """ Genera el grafo de relaciones del proyecto en formato DOT, agrupado por fases. Cada fase se guarda en la
+    cache bajo su version de dibujo (Fases.version_dibujo), que cambia al modificar sus items o las relaciones
+    que llegan a ella, y el grafo completo bajo las versiones de todas las fases. Comprobar si el grafo guardado
+    sigue vigente solo lee las fases del proyecto, y al cambiar un item o una relacion solo se vuelve a
+    generar la fase que toca.
+
+    @type id_proyecto: entero.
+    @param id_proyecto: Proyecto a dibujar.
+
+    @rtype: unicode.
+    @return: El grafo en formato DOT.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    id_proyecto = int(id_proyecto)
+    fases = [(id_fase, nombre, clave_fase(id_fase, nombre, version))
+             for id_fase, nombre, version in Fases.objects.filter(proyecto_id=id_proyecto, is_active=True).order_by('id').values_list('id', 'nombre', 'version_dibujo')]
+    claves_fases = [clave_fragmento for id_fase, nombre, clave_fragmento in fases]
+    clave = 'relaciones:dot:%s:%s' % (id_proyecto, hashlib.md5(','.join(claves_fases)).hexdigest())
+    dot = cache.get(clave)
+    if dot is not None:
+        return dot
+    fragmentos = cache.get_many(claves_fases)
+    for id_fase, nombre, clave_fragmento in fases:
+        if clave_fragmento not in fragmentos:
+            fragmentos[clave_fragmento] = dibujar_fase(id_proyecto, id_fase, nombre)
+            cache.set(clave_fragmento, fragmentos[clave_fragmento], DURACION_DIBUJO)
+    dot = u'\n'.join([u'digraph proyecto_%s {' % id_proyecto, u' node [shape=box, style=filled];'] +
+                     [fragmentos[clave_fragmento] for id_fase, nombre, clave_fragmento in fases] + [u'}'])
+    cache.set(clave, dot, DURACION_DIBUJO)
+    return dot
+
+def ejecutable_dot():
+    return getattr(settings, 'GRAPHVIZ_DOT', None) or find_executable('dot')
+
+def svg_proyecto(id_proyecto):
+
+    """ Convierte a SVG el grafo DOT del proyecto con el programa dot de Graphviz instalado en el servidor.
+    El SVG se guarda en la cache indexado por el contenido del DOT.
+
+    @rtype: string o None.
+    @return: El grafo en formato SVG, o None si Graphviz no esta instalado.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    ejecutable = ejecutable_dot()
+    if ejecutable is None:
+        return None
+    dot = dot_proyecto(id_proyecto).encode('utf-8')
+    clave = 'relaciones:svg:%s' % hashlib.md5(dot).hexdigest()
+    svg = cache.get(clave)
+    if svg is None:
+        proceso = subprocess.Popen([ejecutable, '-Tsvg'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        svg, errores = proceso.communicate(dot)
+        if proceso.returncode != 0:
+            raise RuntimeError('Graphviz no pudo dibujar el grafo: %s' % errores)
+        cache.set(clave, svg, DURACION_DIBUJO)
+    return svg
@@ -0,0 +1,436 @@
+from array import array
+from collections import deque
+from django.db import connection
+from django.db.models import Sum
+from aplicaciones.proyectos.models import Proyectos
+from aplicaciones.items.models import Items
+from .models import Relaciones
+
+""" Cantidad de aristas agregadas incrementalmente a partir de la cual se vuelven a compactar las listas de adyacencia """
+MAXIMO_ARISTAS_SUELTAS = 256
+
+""" Grafos ya construidos en este proceso, indexados por id de proyecto: (version, GrafoProyecto) """
+_grafos = {}
+
+class GrafoProyecto(object):
+
+    """ Grafo de trazabilidad de un proyecto construido a partir de sus relaciones activas. Las aristas van
+    de padre a hijo y de antecesor a sucesor. Los items se numeran de forma densa y las listas de
+    adyacencia, hacia adelante y hacia atras, se guardan en arreglos compactos (formato CSR: un arreglo de
+    destinos y un arreglo con el inicio de cada item), por lo que recorrer el grafo no consulta la base de
+    datos. Las aristas agregadas despues de construirlo se guardan aparte hasta que se vuelve a compactar.
+    Ademas se mantiene un orden topologico de los items (arreglo orden) que se actualiza en cada insercion
+    con el algoritmo dinamico de Pearce y Kelly: solo se visitan y reordenan los items cuyo orden esta entre
+    los de los dos extremos de la nueva arista, lo que permite rechazar las aristas que formarian un ciclo
+    sin recorrer todo el grafo.
+
+    @author: Romina Diaz de Bedoya
+    """
+
+    def __init__(self, id_proyecto, aristas):
+        self.id_proyecto = id_proyecto
+        self.indices = {}
+        self.ids = array('l')
+        self.orden = array('l')
+        self.sueltas_adelante = {}
+        self.sueltas_atras = {}
+        self.cantidad_sueltas = 0
+        self.compactar(aristas)
+
+    @classmethod
+    def cargar(cls, id_proyecto):
+
+        """ Construye el grafo de un proyecto leyendo todas sus relaciones activas con una sola consulta. """
+
+        filas = Relaciones.activas.filter(proyecto=id_proyecto).values_list('padre_id', 'hijo_id', 'antecesor_id', 'sucesor_id')
+        aristas = []
+        for padre, hijo, antecesor, sucesor in filas:
+            if padre is not None and hijo is not None:
+                aristas.append((padre, hijo))
+            if antecesor is not None and sucesor is not None:
+                aristas.append((antecesor, sucesor))
+        return cls(id_proyecto, aristas)
+
+    def indice(self, id_item):
+        posicion = self.indices.get(id_item)
+        if posicion is None:
+            posicion = len(self.ids)
+            self.indices[id_item] = posicion
+            self.ids.append(id_item)
+            self.orden.append(posicion)
+        return posicion
+
+    def aristas(self):
+
+        """ Devuelve todas las aristas del grafo como pares (id origen, id destino). """
+
+        for origen in range(len(self.ids)):
+            for destino in self.vecinos(origen, True):
+                yield self.ids[origen], self.ids[destino]
+
+    def compactar(self, aristas):
+
+        """ Arma los arreglos de adyacencia hacia adelante y hacia atras a partir de la lista de aristas. """
+
+        pares = [(self.indice(origen), self.indice(destino)) for origen, destino in aristas]
+        self.inicio_adelante, self.destinos_adelante = self.csr(pares)
+        self.inicio_atras, self.destinos_atras = self.csr([(destino, origen) for origen, destino in pares])
+        self.sueltas_adelante = {}
+        self.sueltas_atras = {}
+        self.cantidad_sueltas = 0
+        self.ordenar()
+
+    def ordenar(self):
+
+        """ Calcula un orden topologico inicial con el algoritmo de Kahn. Si los datos ya tienen ciclos, los
+        items involucrados quedan al final en cualquier orden; el comando auditar_ciclos permite encontrarlos. """
+
+        cantidad = len(self.ids)
+        entrantes = array('l', [0] * cantidad)
+        for posicion in range(cantidad):
+            for vecino in self.vecinos(posicion, True):
+                entrantes[vecino] += 1
+        pendientes = deque(posicion for posicion in range(cantidad) if entrantes[posicion] == 0)
+        siguiente = 0
+        ordenados = set()
+        while pendientes:
+            posicion = pendientes.popleft()
+            self.orden[posicion] = siguiente
+            ordenados.add(posicion)
+            siguiente += 1
+            for vecino in self.vecinos(posicion, True):
+                entrantes[vecino] -= 1
+                if entrantes[vecino] == 0:
+                    pendientes.append(vecino)
+        for posicion in range(cantidad):
+            if posicion not in ordenados:
+                self.orden[posicion] = siguiente
+                siguiente += 1
+
+    def csr(self, pares):
+        cantidad = len(self.ids)
+        inicio = array('l', [0] * (cantidad + 1))
+        for origen, destino in pares:
+            inicio[origen + 1] += 1
+        for posicion in range(cantidad):
+            inicio[posicion + 1] += inicio[posicion]
+        destinos = array('l', [0] * len(pares))
+        siguiente = array('l', inicio)
+        for origen, destino in pares:
+            destinos[siguiente[origen]] = destino
+            siguiente[origen] += 1
+        return inicio, destinos
+
+    def vecinos(self, posicion, adelante):
+        if adelante:
+            inicio, destinos, sueltas = self.inicio_adelante, self.destinos_adelante, self.sueltas_adelante
+        else:
+            inicio, destinos, sueltas = self.inicio_atras, self.destinos_atras, self.sueltas_atras
+        if posicion + 1 < len(inicio):
+            for vecino in destinos[inicio[posicion]:inicio[posicion + 1]]:
+                yield vecino
+        for vecino in sueltas.get(posicion, ()):
+            yield vecino
+
+    def buscar(self, inicio, adelante, limite, objetivo=None):
+
+        """ Recorrido en profundidad desde inicio que solo visita items cuyo orden topologico no pasa el
+        limite (menor o igual yendo hacia adelante, mayor o igual yendo hacia atras). Devuelve los items
+        visitados y, si se alcanza el objetivo, el camino desde inicio hasta el. """
+
+        padres = {inicio: None}
+        pendientes = [inicio]
+        while pendientes:
+            posicion = pendientes.pop()
+            for vecino in self.vecinos(posicion, adelante):
+                if vecino in padres:
+                    continue
+                if vecino == objetivo:
+                    camino = [vecino, posicion]
+                    while padres[camino[-1]] is not None:
+                        camino.append(padres[camino[-1]])
+                    camino.reverse()
+                    return list(padres), camino
+                if (adelante and self.orden[vecino] <= limite) or (not adelante and self.orden[vecino] >= limite):
+                    padres[vecino] = posicion
+                    pendientes.append(vecino)
+        return list(padres), None
+
+    def camino_ciclo(self, origen, destino):
+
+        """ Verifica si agregar una arista de origen a destino formaria un ciclo. Como destino solo puede
+        alcanzar a origen si esta antes que el en el orden topologico, la busqueda se limita a los items
+        ubicados entre ambos.
+
+        @type origen: entero.
+        @param origen: id del item padre o antecesor.
+
+        @type destino: entero.
+        @param destino: id del item hijo o sucesor.
+
+        @rtype: lista o None.
+        @return: None si la arista no forma un ciclo, o los ids del ciclo que formaria, empezando y
+        terminando en origen.
+
+        """
+
+        origen, destino = int(origen), int(destino)
+        if origen == destino:
+            return [origen, destino]
+        x = self.indices.get(origen)
+        y = self.indices.get(destino)
+        if x is None or y is None or self.orden[x] < self.orden[y]:
+            return None
+        visitados, camino = self.buscar(y, True, self.orden[x], x)
+        if camino is None:
+            return None
+        return [origen] + [self.ids[posicion] for posicion in camino]
+
+    def agregar_arista(self, origen, destino):
+
+        """ Agrega una arista al grafo sin reconstruirlo y actualiza el orden topologico. Si la arista
+        formaria un ciclo no se agrega. Cuando se acumulan demasiadas aristas sueltas se vuelven a compactar
+        todas en los arreglos.
+
+        @type origen: entero.
+        @param origen: id del item padre o antecesor.
+
+        @type destino: entero.
+        @param destino: id del item hijo o sucesor.
+
+        @rtype: lista o None.
+        @return: None si la arista se agrego, o el ciclo que formaria (ver camino_ciclo).
+
+        """
+
+        camino = self.camino_ciclo(origen, destino)
+        if camino:
+            return camino
+        x = self.indice(int(origen))
+        y = self.indice(int(destino))
+        if self.orden[x] > self.orden[y]:
+            #Pearce-Kelly: los items alcanzables desde destino y los que alcanzan a origen, dentro de la
+            #region afectada, se reubican en las mismas posiciones dejando primero a los de origen
+            adelante, camino = self.buscar(y, True, self.orden[x])
+            atras, camino = self.buscar(x, False, self.orden[y])
+            atras.sort(key=lambda posicion: self.orden[posicion])
+            adelante.sort(key=lambda posicion: self.orden[posicion])
+            posiciones = sorted(self.orden[posicion] for posicion in atras + adelante)
+            for posicion, lugar in zip(atras + adelante, posiciones):
+                self.orden[posicion] = lugar
+        self.sueltas_adelante.setdefault(x, []).append(y)
+        self.sueltas_atras.setdefault(y, []).append(x)
+        self.cantidad_sueltas += 1
+        if self.cantidad_sueltas > MAXIMO_ARISTAS_SUELTAS:
+            self.compactar(list(self.aristas()))
+        return None
+
+    def ciclos(self):
+
+        """ Busca los ciclos existentes en el grafo. Calcula las componentes fuertemente conexas (algoritmo
+        de Tarjan, sin recursion) y devuelve un ciclo de cada componente con mas de un item o con un item
+        relacionado consigo mismo.
+
+        @rtype: lista.
+        @return: lista de ciclos, cada uno como lista de ids que empieza y termina en el mismo item.
+
+        """
+
+        cantidad = len(self.ids)
+        indice = {}
+        minimo = {}
+        pila = []
+        en_pila = set()
+        componentes = []
+        contador = 0
+        for raiz in range(cantidad):
+            if raiz in indice:
+                continue
+            llamadas = [(raiz, self.vecinos(raiz, True))]
+            indice[raiz] = minimo[raiz] = contador
+            contador += 1
+            pila.append(raiz)
+            en_pila.add(raiz)
+            while llamadas:
+                posicion, vecinos = llamadas[-1]
+                avanzo = False
+                for vecino in vecinos:
+                    if vecino not in indice:
+                        indice[vecino] = minimo[vecino] = contador
+                        contador += 1
+                        pila.append(vecino)
+                        en_pila.add(vecino)
+                        llamadas.append((vecino, self.vecinos(vecino, True)))
+                        avanzo = True
+                        break
+                    elif vecino in en_pila:
+                        minimo[posicion] = min(minimo[posicion], indice[vecino])
+                if avanzo:
+                    continue
+                llamadas.pop()
+                if llamadas:
+                    minimo[llamadas[-1][0]] = min(minimo[llamadas[-1][0]], minimo[posicion])
+                if minimo[posicion] == indice[posicion]:
+                    componente = []
+                    while True:
+                        miembro = pila.pop()
+                        en_pila.discard(miembro)
+                        componente.append(miembro)
+                        if miembro == posicion:
+                            break
+                    if len(componente) > 1 or posicion in self.vecinos(posicion, True):
+                        componentes.append(set(componente))
+        
+        ciclos = []
+        for componente in componentes:
+            inicio = min(componente, key=lambda posicion: self.ids[posicion])
+            padres = {inicio: None}
+            pendientes = deque([inicio])
+            camino = None
+            while pendientes and camino is None:
+                posicion = pendientes.popleft()
+                for vecino in self.vecinos(posicion, True):
+                    if vecino == inicio:
+                        camino = [posicion]
+                        while padres[camino[-1]] is not None:
+                            camino.append(padres[camino[-1]])
+                        camino.reverse()
+                        break
+                    if vecino in componente and vecino not in padres:
+                        padres[vecino] = posicion
+                        pendientes.append(vecino)
+            ciclos.append([self.ids[posicion] for posicion in camino] + [self.ids[inicio]])
+        return ciclos
+
+    def alcanzables(self, id_item, adelante=True):
+
+        """ Devuelve los ids de todos los items alcanzables desde el item recibido siguiendo las relaciones
+        hacia adelante (hijos y sucesores) o hacia atras (padres y antecesores), sin incluir al propio item.
+
+        @type id_item: entero.
+        @param id_item: id del item desde el cual se recorre el grafo.
+
+        @type adelante: booleano.
+        @param adelante: True para recorrer hacia hijos y sucesores, False hacia padres y antecesores.
+
+        @rtype: lista.
+        @return: ids de los items alcanzables, en orden de recorrido en anchura.
+
+        """
+
+        inicio = self.indices.get(int(id_item))
+        if inicio is None:
+            return []
+        visitados = set([inicio])
+        pendientes = deque([inicio])
+        alcanzados = []
+        while pendientes:
+            posicion = pendientes.popleft()
+            for vecino in self.vecinos(posicion, adelante):
+                if vecino not in visitados:
+                    visitados.add(vecino)
+                    alcanzados.append(self.ids[vecino])
+                    pendientes.append(vecino)
+        return alcanzados
+
+    def impacto(self, id_item, adelante=True):
+
+        """ Calcula el impacto de modificar un item: la suma del costo monetario y temporal del item y de todos
+        los items activos alcanzables desde el. Los costos se leen con una sola consulta, por lo que siempre
+        reflejan los valores actuales de los items.
+
+        @rtype: diccionario.
+        @return: diccionario con la lista de items afectados y los totales costoMonetario y costoTemporal.
+
+        """
+
+        return costos_impacto([int(id_item)] + self.alcanzables(id_item, adelante))
+
+def costos_impacto(afectados):
+
+    """ Suma con una sola consulta el costo monetario y temporal de los items activos de la lista.
+
+    @type afectados: lista.
+    @param afectados: ids de los items afectados, empezando por el item modificado.
+
+    @rtype: diccionario.
+    @return: diccionario con la lista de items afectados y los totales costoMonetario y costoTemporal.
+
+    """
+
+    totales = Items.objects.filter(id__in=afectados, is_active=True).aggregate(costoMonetario=Sum('costoMonetario'), costoTemporal=Sum('costoTemporal'))
+    return {'items': afectados, 'costoMonetario': totales['costoMonetario'] or 0, 'costoTemporal': totales['costoTemporal'] or 0}
+
+""" Marca una nueva version de las relaciones del proyecto con un valor de la secuencia proyectos_versiones_seq.
+Las secuencias no vuelven atras al deshacerse una transaccion, por lo que ningun cambio posterior repite la
+version con la que se indexo un grafo o un resultado calculado dentro de una transaccion deshecha """
+INCREMENTAR_VERSION = "UPDATE proyectos_proyectos SET version_relaciones = nextval('proyectos_versiones_seq') WHERE id = %s RETURNING version_relaciones"
+
+def version_grafo(id_proyecto):
+    
+    """ Devuelve la version actual de las relaciones del proyecto, guardada en Proyectos.version_relaciones.
+    Como la version cambia en la misma transaccion que las relaciones, todos los procesos ven la nueva
+    version exactamente cuando se confirman los cambios. """
+    
+    return Proyectos.objects.filter(id=id_proyecto).values_list('version_relaciones', flat=True).first()
+
+def incrementar_version(id_proyecto):
+    cursor = connection.cursor()
+    cursor.execute(INCREMENTAR_VERSION, [id_proyecto])
+    fila = cursor.fetchone()
+    return fila[0] if fila else None
+
+def grafo_proyecto(id_proyecto):
+
+    """ Devuelve el grafo de trazabilidad del proyecto. Se reutiliza el ya construido en este proceso mientras
+    su version coincida con la del proyecto en la base de datos, que cambia cada vez que se modifican sus
+    relaciones desde cualquier proceso. Para verificar ciclos debe llamarse con el proyecto bloqueado, de
+    modo que la version leida no pueda cambiar hasta terminar la transaccion.
+
+    @type id_proyecto: entero.
+    @param id_proyecto: id del proyecto.
+
+    @rtype: GrafoProyecto.
+    @return: grafo con las relaciones activas del proyecto.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    id_proyecto = int(id_proyecto)
+    version = version_grafo(id_proyecto)
+    guardado = _grafos.get(id_proyecto)
+    if guardado and guardado[0] == version:
+        return guardado[1]
+    grafo = GrafoProyecto.cargar(id_proyecto)
+    _grafos[id_proyecto] = (version, grafo)
+    return grafo
+
+def registrar_arista(id_proyecto, origen, destino):
+
+    """ Informa que se creo una relacion de origen a destino en el proyecto. Debe llamarse en la transaccion
+    que crea la relacion, con el proyecto bloqueado. El grafo de este proceso se actualiza sin reconstruirlo
+    y los demas procesos lo reconstruyen al ver la nueva version, una vez confirmada la transaccion.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    id_proyecto = int(id_proyecto)
+    version = version_grafo(id_proyecto)
+    guardado = _grafos.get(id_proyecto)
+    nueva = incrementar_version(id_proyecto)
+    if guardado and guardado[0] == version:
+        guardado[1].agregar_arista(origen, destino)
+        _grafos[id_proyecto] = (nueva, guardado[1])
+    else:
+        _grafos.pop(id_proyecto, None)
+
+def invalidar_grafo(id_proyecto):
+
+    """ Descarta el grafo del proyecto en todos los procesos, para cuando se eliminan o modifican relaciones.
+    Debe llamarse en la misma transaccion que las modifica. """
+
+    id_proyecto = int(id_proyecto)
+    incrementar_version(id_proyecto)
+    _grafos.pop(id_proyecto, None)
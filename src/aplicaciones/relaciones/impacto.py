@@ -0,0 +1,127 @@
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import pre_save, post_save
+from aplicaciones.items.models import Items
+from .models import ClausuraRelacion, ContadorImpacto, relaciones_modificadas
+from .grafo import grafo_proyecto, version_grafo
+
+DURACION_IMPACTO = 3600
+
+""" Campos de Items que cambian el resultado del analisis de impacto """
+CAMPOS_IMPACTO = ('costoMonetario', 'costoTemporal', 'is_active')
+
+CONTAR = """
+    INSERT INTO relaciones_contadorimpacto (nombre, cantidad) VALUES (%s, 1)
+    ON CONFLICT (nombre) DO UPDATE SET cantidad = relaciones_contadorimpacto.cantidad + 1"""
+
+def clave_impacto(id_proyecto, id_item, adelante):
+    return 'relaciones:impacto:%s:%s:%s' % (id_proyecto, id_item, 'adelante' if adelante else 'atras')
+
+def contar(nombre):
+    cursor = connection.cursor()
+    cursor.execute(CONTAR, [nombre])
+
+def estadisticas():
+
+    """ Devuelve los contadores de aciertos y fallos de la cache de impacto, guardados en ContadorImpacto.
+
+    @rtype: diccionario.
+    @return: aciertos, fallos y proporcion de aciertos.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    contadores = dict(ContadorImpacto.objects.values_list('nombre', 'cantidad'))
+    aciertos = contadores.get('aciertos', 0)
+    fallos = contadores.get('fallos', 0)
+    total = aciertos + fallos
+    return {'aciertos': aciertos, 'fallos': fallos, 'proporcion': float(aciertos) / total if total else 0.0}
+
+def calcular_impacto(id_proyecto, id_item, adelante=True):
+
+    """ Devuelve el impacto de modificar un item (ver GrafoProyecto.impacto), con los items afectados y sus
+    costos totales, guardado en la cache por item y sentido. Los resultados se descartan uno por uno con
+    invalidar_impacto al cambiar las relaciones o los costos de los items que alcanzan. Si las relaciones
+    del proyecto cambian mientras se calcula, el resultado no se guarda.
+
+    @type adelante: booleano.
+    @param adelante: True para los hijos y sucesores, False para los padres y antecesores.
+
+    @rtype: diccionario.
+    @return: items afectados (empezando por el propio item) y los costos monetario y temporal totales.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    id_proyecto = int(id_proyecto)
+    id_item = int(id_item)
+    clave = clave_impacto(id_proyecto, id_item, adelante)
+    resultado = cache.get(clave)
+    if resultado is not None:
+        contar('aciertos')
+        return resultado
+    contar('fallos')
+    version = version_grafo(id_proyecto)
+    resultado = grafo_proyecto(id_proyecto).impacto(id_item, adelante)
+    if version_grafo(id_proyecto) == version:
+        cache.set(clave, resultado, DURACION_IMPACTO)
+    return resultado
+
+def invalidar_impacto(id_proyecto, adelante=(), atras=()):
+
+    """ Descarta los resultados que pueden incluir a los items indicados: los impactos hacia adelante de los
+    items de adelante y de sus ancestros, y los impactos hacia atras de los items de atras y de sus
+    descendientes. Los ancestros y descendientes se leen de la tabla de clausura.
+
+    @type adelante: lista.
+    @param adelante: ids de los items cuyos ancestros llegan a ellos hacia adelante.
+
+    @type atras: lista.
+    @param atras: ids de los items cuyos descendientes llegan a ellos hacia atras.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    claves = []
+    if adelante:
+        ids = set(adelante) | set(ClausuraRelacion.objects.filter(proyecto=id_proyecto, descendiente__in=list(adelante)).values_list('ancestro', flat=True))
+        claves.extend(clave_impacto(id_proyecto, id_item, True) for id_item in ids)
+    if atras:
+        ids = set(atras) | set(ClausuraRelacion.objects.filter(proyecto=id_proyecto, ancestro__in=list(atras)).values_list('descendiente', flat=True))
+        claves.extend(clave_impacto(id_proyecto, id_item, False) for id_item in ids)
+    if claves:
+        cache.delete_many(claves)
+
+def relaciones_cambiadas(sender, id_proyecto, aristas, **kwargs):
+
+    """ Al crear o desactivar una relacion de origen a destino cambian los impactos hacia adelante del origen
+    y de sus ancestros, y los impactos hacia atras del destino y de sus descendientes. """
+
+    invalidar_impacto(int(id_proyecto), [origen for origen, destino in aristas], [destino for origen, destino in aristas])
+
+def leer_costos_anteriores(sender, instance, raw=False, update_fields=None, **kwargs):
+
+    """ Antes de guardar un item existente lee de la base de datos los campos que afectan al impacto, para
+    compararlos despues de guardarlo. """
+
+    instance._impacto_anterior = None
+    if raw or instance.pk is None or (update_fields is not None and not set(update_fields) & set(CAMPOS_IMPACTO)):
+        return
+    instance._impacto_anterior = Items.objects.filter(pk=instance.pk).values_list(*CAMPOS_IMPACTO).first()
+
+def item_guardado(sender, instance, created, **kwargs):
+
+    """ Descarta los resultados que incluyen al item si cambiaron sus costos o si fue eliminado. """
+
+    anterior = getattr(instance, '_impacto_anterior', None)
+    if created or anterior is None:
+        return
+    if anterior != tuple(getattr(instance, campo) for campo in CAMPOS_IMPACTO):
+        invalidar_impacto(instance.proyecto_id, [instance.id], [instance.id])
+
+relaciones_modificadas.connect(relaciones_cambiadas)
+pre_save.connect(leer_costos_anteriores, sender=Items)
+post_save.connect(item_guardado, sender=Items)
@@ -0,0 +1,162 @@
+import csv
+import json
+from django.db import transaction
+from aplicaciones.proyectos.models import Proyectos
+from aplicaciones.fases.models import Fases, incrementar_versiones_fase
+from aplicaciones.items.models import Items
+from .models import Relaciones, relaciones_modificadas
+from .grafo import GrafoProyecto, invalidar_grafo
+from .clausura import agregar_clausura, extremos
+
+TIPOS_IMPORTACION = ('Padre', 'Antecesor')
+
+def leer_aristas(archivo, formato):
+
+    """ Lee una lista de aristas en formato CSV (con columnas origen, destino y tipo) o JSON (una lista
+    de objetos con esas claves). El tipo indica el rol del item de origen: Padre o Antecesor del item
+    de destino.
+
+    @type archivo: file.
+    @param archivo: Archivo abierto con las aristas.
+
+    @type formato: string.
+    @param formato: csv o json.
+
+    @rtype: lista.
+    @return: Pares (numero de fila, diccionario con origen, destino y tipo).
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    if formato == 'json':
+        datos = json.load(archivo)
+        if not isinstance(datos, list):
+            raise ValueError('El archivo JSON debe contener una lista de aristas.')
+        return [(numero, fila if isinstance(fila, dict) else {}) for numero, fila in enumerate(datos, 1)]
+    return [(numero, fila) for numero, fila in enumerate(csv.DictReader(archivo), 2)]
+
+def id_entero(valor):
+
+    """ Convierte el id leido de una fila en entero. Solo acepta enteros o textos formados por digitos, de modo
+    que valores como 1.9 o true se rechazan en lugar de convertirse en otro id.
+
+    @raise ValueError: Si el valor no es un id entero.
+
+    """
+
+    if isinstance(valor, (int, long)) and not isinstance(valor, bool):
+        return int(valor)
+    if isinstance(valor, basestring) and valor.strip().isdigit():
+        return int(valor.strip())
+    raise ValueError('id no entero: %r' % (valor,))
+
+def validar_aristas(id_proyecto, filas):
+
+    """ Valida todas las aristas en una sola pasada: los items deben existir, estar activos y pertenecer al
+    proyecto, las relaciones Padre deben unir items de la misma fase y las Antecesor items de una fase con
+    los de la siguiente, no pueden repetir relaciones existentes ni del mismo archivo y no pueden formar
+    ciclos con las existentes ni con las anteriores del archivo. Los items se leen con una sola consulta y
+    los ciclos se detectan sobre una copia del grafo del proyecto.
+
+    @type filas: lista.
+    @param filas: Pares (numero de fila, diccionario con origen, destino y tipo), como los de leer_aristas.
+
+    @rtype: tupla.
+    @return: Las relaciones validas sin guardar y los errores como pares (numero de fila, mensaje).
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    id_proyecto = int(id_proyecto)
+    leidas = []
+    errores = []
+    for numero, fila in filas:
+        try:
+            origen = id_entero(fila.get('origen'))
+            destino = id_entero(fila.get('destino'))
+        except ValueError:
+            errores.append((numero, 'Los ids de origen y destino deben ser numeros enteros.'))
+            continue
+        tipo = unicode(fila.get('tipo') or '').strip().capitalize()
+        if tipo not in TIPOS_IMPORTACION:
+            errores.append((numero, 'El tipo debe ser Padre o Antecesor.'))
+            continue
+        leidas.append((numero, origen, destino, tipo))
+
+    ids = set()
+    for numero, origen, destino, tipo in leidas:
+        ids.update((origen, destino))
+    items = dict((fila[0], fila[1:]) for fila in Items.objects.filter(id__in=ids).values_list('id', 'proyecto_id', 'fase_id', 'is_active'))
+    fases = list(Fases.objects.filter(proyecto_id=id_proyecto, is_active=True).order_by('id').values_list('id', flat=True))
+    posiciones = dict((id_fase, posicion) for posicion, id_fase in enumerate(fases))
+    grafo = GrafoProyecto.cargar(id_proyecto)
+    existentes = set(grafo.aristas())
+
+    validas = []
+    for numero, origen, destino, tipo in leidas:
+        faltantes = [str(id_item) for id_item in (origen, destino) if id_item not in items or not items[id_item][2]]
+        if faltantes:
+            errores.append((numero, 'No existen los items %s.' % ', '.join(faltantes)))
+            continue
+        if items[origen][0] != id_proyecto or items[destino][0] != id_proyecto:
+            errores.append((numero, 'Los items no pertenecen al proyecto.'))
+            continue
+        fase_origen = posiciones.get(items[origen][1])
+        fase_destino = posiciones.get(items[destino][1])
+        if fase_origen is None or fase_destino is None:
+            errores.append((numero, 'Los items pertenecen a una fase eliminada.'))
+            continue
+        if tipo == 'Padre' and fase_origen != fase_destino:
+            errores.append((numero, 'Una relacion Padre solo puede unir items de la misma fase.'))
+            continue
+        if tipo == 'Antecesor' and fase_destino != fase_origen + 1:
+            errores.append((numero, 'Una relacion Antecesor debe unir un item con uno de la fase siguiente.'))
+            continue
+        if (origen, destino) in existentes:
+            errores.append((numero, 'La relacion ya existe.'))
+            continue
+        camino = grafo.agregar_arista(origen, destino)
+        if camino:
+            errores.append((numero, 'La relacion formaria un ciclo: %s' % ' -> '.join(str(id_ciclo) for id_ciclo in camino)))
+            continue
+        existentes.add((origen, destino))
+        relacion = Relaciones(proyecto=id_proyecto, faseprimera=items[origen][1], fasesegunda=items[destino][1], is_active=True)
+        if tipo == 'Padre':
+            relacion.padre_id, relacion.hijo_id = origen, destino
+        else:
+            relacion.antecesor_id, relacion.sucesor_id = origen, destino
+        validas.append(relacion)
+    errores.sort()
+    return validas, errores
+
+def importar_aristas(id_proyecto, filas, verificar=False):
+
+    """ Valida las aristas y crea las relaciones validas con inserciones masivas en una sola transaccion,
+    con el proyecto bloqueado para que ninguna relacion creada mientras tanto invalide la verificacion de
+    ciclos. En la misma transaccion se suman a la tabla de clausura los caminos que pasan por cada relacion
+    creada, como al crear una sola, y se descarta el grafo del proyecto.
+
+    @type verificar: booleano.
+    @param verificar: Si es verdadero solo se validan las aristas, sin crear relaciones.
+
+    @rtype: tupla.
+    @return: La cantidad de relaciones creadas (o que se crearian) y los errores por fila.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    with transaction.atomic():
+        Proyectos.objects.select_for_update().get(id=id_proyecto)
+        validas, errores = validar_aristas(id_proyecto, filas)
+        if verificar or not validas:
+            return len(validas), errores
+        Relaciones.objects.bulk_create(validas, batch_size=1000)
+        for relacion in validas:
+            agregar_clausura(relacion)
+        invalidar_grafo(id_proyecto)
+        incrementar_versiones_fase(*[relacion.fasesegunda for relacion in validas])
+    relaciones_modificadas.send(sender=Relaciones, id_proyecto=id_proyecto, aristas=[extremos(relacion)[:2] for relacion in validas])
+    return len(validas), errores
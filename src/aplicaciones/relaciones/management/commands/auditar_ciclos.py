@@ -0,0 +1,31 @@
+from optparse import make_option
+from django.core.management.base import BaseCommand
+from aplicaciones.relaciones.models import Relaciones
+from aplicaciones.relaciones.grafo import GrafoProyecto
+
+class Command(BaseCommand):
+    
+    """ Revisa las relaciones activas de cada proyecto en busca de ciclos, que pudieron crearse antes
+    de que crear_relacion los rechazara. Por cada ciclo encontrado muestra los ids de los items que
+    lo forman.
+    
+    Uso: python manage.py auditar_ciclos [--proyecto=ID]
+    """
+    
+    help = 'Busca ciclos en las relaciones de los proyectos.'
+    option_list = BaseCommand.option_list + (
+        make_option('--proyecto', action='store', type='int', dest='proyecto', default=None,
+                    help='Limita la revision a un proyecto.'),
+    )
+    
+    def handle(self, *args, **options):
+        if options['proyecto']:
+            proyectos = [options['proyecto']]
+        else:
+            proyectos = Relaciones.objects.filter(is_active=True).exclude(proyecto=None).order_by('proyecto').values_list('proyecto', flat=True).distinct()
+        encontrados = 0
+        for id_proyecto in proyectos:
+            for ciclo in GrafoProyecto.cargar(id_proyecto).ciclos():
+                self.stdout.write('Proyecto %s: %s' % (id_proyecto, ' -> '.join(str(id_item) for id_item in ciclo)))
+                encontrados = encontrados + 1
+        self.stdout.write('%s ciclos encontrados' % encontrados)
@@ -0,0 +1,42 @@
+from optparse import make_option
+from django.core.management.base import BaseCommand
+from aplicaciones.relaciones.archivo import archivar_relaciones, restaurar_relaciones, tamanio_relaciones, vaciar_relaciones
+
+class Command(BaseCommand):
+
+    """ Mueve a la tabla de archivo las relaciones inactivas dadas de baja hace mas de --dias dias, para
+    que las consultas sobre Relaciones no recorran filas eliminadas, e informa el espacio que ocupa la
+    tabla antes y despues. Con --vacuum el espacio liberado queda disponible para nuevas filas y con
+    --vacuum-completo se devuelve al sistema operativo. Con --restaurar devuelve las relaciones archivadas.
+
+    Uso: python manage.py compactar_relaciones [--dias=N] [--proyecto=ID] [--lote=N] [--vacuum | --vacuum-completo] [--restaurar]
+    """
+
+    help = 'Archiva las relaciones inactivas antiguas o las restaura.'
+    option_list = BaseCommand.option_list + (
+        make_option('--dias', action='store', type='int', dest='dias', default=90,
+                    help='Antiguedad minima de la baja de las relaciones a archivar.'),
+        make_option('--proyecto', action='store', type='int', dest='proyecto', default=None,
+                    help='Limita el proceso a un proyecto.'),
+        make_option('--lote', action='store', type='int', dest='lote', default=1000,
+                    help='Cantidad de relaciones movidas por transaccion.'),
+        make_option('--vacuum', action='store_true', dest='vacuum', default=False,
+                    help='Ejecuta VACUUM ANALYZE sobre la tabla al terminar.'),
+        make_option('--vacuum-completo', action='store_true', dest='vacuum_completo', default=False,
+                    help='Ejecuta VACUUM FULL ANALYZE sobre la tabla al terminar (la bloquea).'),
+        make_option('--restaurar', action='store_true', dest='restaurar', default=False,
+                    help='Devuelve las relaciones archivadas a la tabla de relaciones.'),
+    )
+
+    def handle(self, *args, **options):
+        if options['restaurar']:
+            restauradas = restaurar_relaciones(options['proyecto'], options['lote'])
+            self.stdout.write('%s relaciones restauradas' % restauradas)
+            return
+        antes = tamanio_relaciones()
+        archivadas = archivar_relaciones(options['dias'], options['proyecto'], options['lote'])
+        if options['vacuum'] or options['vacuum_completo']:
+            vaciar_relaciones(options['vacuum_completo'])
+        despues = tamanio_relaciones()
+        self.stdout.write('%s relaciones archivadas' % archivadas)
+        self.stdout.write('Tamanio de la tabla: %s KB antes, %s KB despues, %s KB recuperados' % (antes / 1024, despues / 1024, (antes - despues) / 1024))
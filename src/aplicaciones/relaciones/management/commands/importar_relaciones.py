@@ -0,0 +1,41 @@
+from optparse import make_option
+from django.core.management.base import BaseCommand, CommandError
+from aplicaciones.relaciones.importacion import leer_aristas, importar_aristas
+
+class Command(BaseCommand):
+    
+    """ Crea en bloque las relaciones de un proyecto a partir de un archivo CSV (columnas origen, destino
+    y tipo) o JSON (lista de objetos con esas claves). Valida todas las filas antes de guardar las validas
+    en una sola transaccion y muestra el error de cada fila rechazada. El formato se deduce de la
+    extension del archivo si no se indica.
+    
+    Uso: python manage.py importar_relaciones ARCHIVO --proyecto=ID [--formato=csv|json] [--verificar]
+    """
+    
+    args = '<archivo>'
+    help = 'Importa relaciones entre items desde un archivo CSV o JSON.'
+    option_list = BaseCommand.option_list + (
+        make_option('--proyecto', action='store', type='int', dest='proyecto', default=None,
+                    help='Proyecto al que pertenecen los items.'),
+        make_option('--formato', action='store', dest='formato', default=None,
+                    help='csv o json.'),
+        make_option('--verificar', action='store_true', dest='verificar', default=False,
+                    help='Solo valida las aristas, sin crear relaciones.'),
+    )
+    
+    def handle(self, *args, **options):
+        if len(args) != 1 or not options['proyecto']:
+            raise CommandError('Indique el archivo y el proyecto (--proyecto).')
+        formato = options['formato'] or ('json' if args[0].lower().endswith('.json') else 'csv')
+        try:
+            with open(args[0], 'rb') as archivo:
+                filas = leer_aristas(archivo, formato)
+        except (IOError, ValueError) as error:
+            raise CommandError('No se pudo leer el archivo: %s' % error)
+        creadas, errores = importar_aristas(options['proyecto'], filas, options['verificar'])
+        for numero, mensaje in errores:
+            self.stdout.write('Fila %s: %s' % (numero, mensaje))
+        if options['verificar']:
+            self.stdout.write('%s relaciones validas, %s filas con errores' % (creadas, len(errores)))
+        else:
+            self.stdout.write('%s relaciones creadas, %s filas con errores' % (creadas, len(errores)))
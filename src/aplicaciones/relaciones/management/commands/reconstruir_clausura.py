@@ -0,0 +1,44 @@
+from optparse import make_option
+from django.core.management.base import BaseCommand, CommandError
+from aplicaciones.relaciones.models import Relaciones, ClausuraRelacion
+from aplicaciones.relaciones.clausura import diferencias_clausura, reconstruir_clausura
+
+class Command(BaseCommand):
+
+    """ Recalcula desde cero la tabla de clausura de las relaciones de cada proyecto y verifica que
+    coincida con las relaciones activas. Con --verificar solo informa las diferencias entre la tabla
+    mantenida al crear y eliminar relaciones y la calculada, sin modificarla.
+
+    Uso: python manage.py reconstruir_clausura [--proyecto=ID] [--verificar]
+    """
+
+    help = 'Reconstruye y verifica la tabla de clausura de las relaciones.'
+    option_list = BaseCommand.option_list + (
+        make_option('--proyecto', action='store', type='int', dest='proyecto', default=None,
+                    help='Limita la reconstruccion a un proyecto.'),
+        make_option('--verificar', action='store_true', dest='verificar', default=False,
+                    help='Solo informa las diferencias, sin reconstruir.'),
+    )
+
+    def handle(self, *args, **options):
+        if options['proyecto']:
+            proyectos = [options['proyecto']]
+        else:
+            proyectos = set(Relaciones.objects.filter(is_active=True).exclude(proyecto=None).values_list('proyecto', flat=True).distinct())
+            proyectos.update(ClausuraRelacion.objects.values_list('proyecto', flat=True).distinct())
+            proyectos = sorted(proyectos)
+        inconsistentes = 0
+        for id_proyecto in proyectos:
+            try:
+                if not options['verificar']:
+                    filas = reconstruir_clausura(id_proyecto)
+                    self.stdout.write('Proyecto %s: %s filas' % (id_proyecto, filas))
+                diferencias = diferencias_clausura(id_proyecto)
+            except ValueError as error:
+                raise CommandError(str(error))
+            for ancestro, descendiente, profundidad, tipo, guardados, esperados in diferencias:
+                self.stdout.write('Proyecto %s: %s -> %s profundidad %s (%s) tiene %s caminos, se esperaban %s'
+                                  % (id_proyecto, ancestro, descendiente, profundidad, tipo, guardados, esperados))
+            if diferencias:
+                inconsistentes = inconsistentes + 1
+        self.stdout.write('%s proyectos inconsistentes' % inconsistentes)
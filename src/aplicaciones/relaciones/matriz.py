@@ -0,0 +1,114 @@
+import csv
+from django.db import connection
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+FILAS_POR_LECTURA = 2000
+
+COLUMNAS_MATRIZ = ('Id', 'Item', 'Fase', 'Estado', 'Version', 'Padres', 'Hijos', 'Antecesores', 'Sucesores')
+
+#Un lote de items con los ids de sus relaciones activas, a partir del ultimo (fase, item) leido. Cada subconsulta
+#fija la fase del extremo del item para poder usar los indices parciales de relaciones_relaciones
+CONSULTA_MATRIZ = """
+    SELECT i.fase_id, i.id, i.nombre, f.nombre, i.estado, i.version,
+        (SELECT string_agg(r.padre_id::text, ';' ORDER BY r.padre_id) FROM relaciones_relaciones r
+         WHERE r.proyecto = i.proyecto_id AND r.fasesegunda = i.fase_id AND r.hijo_id = i.id AND r.is_active = true),
+        (SELECT string_agg(r.hijo_id::text, ';' ORDER BY r.hijo_id) FROM relaciones_relaciones r
+         WHERE r.proyecto = i.proyecto_id AND r.faseprimera = i.fase_id AND r.padre_id = i.id AND r.is_active = true),
+        (SELECT string_agg(r.antecesor_id::text, ';' ORDER BY r.antecesor_id) FROM relaciones_relaciones r
+         WHERE r.proyecto = i.proyecto_id AND r.fasesegunda = i.fase_id AND r.sucesor_id = i.id AND r.is_active = true),
+        (SELECT string_agg(r.sucesor_id::text, ';' ORDER BY r.sucesor_id) FROM relaciones_relaciones r
+         WHERE r.proyecto = i.proyecto_id AND r.faseprimera = i.fase_id AND r.antecesor_id = i.id AND r.is_active = true)
+    FROM items_items i JOIN fases_fases f ON f.id = i.fase_id
+    WHERE i.proyecto_id = %s AND i.is_active = true AND (i.fase_id, i.id) > (%s, %s)
+    ORDER BY i.fase_id, i.id
+    LIMIT %s"""
+
+def filas_matriz(id_proyecto):
+
+    """ Genera las filas de la matriz de trazabilidad del proyecto leyendolas en lotes de FILAS_POR_LECTURA
+    items, cada lote con una consulta que continua desde el ultimo item leido (paginacion por clave), de modo
+    que solo se mantiene en memoria un lote a la vez. Entre un lote y otro no queda ninguna transaccion ni
+    cursor abierto, por lo que una descarga lenta o abandonada no bloquea la base de datos; a cambio, los
+    items modificados durante la descarga pueden aparecer con su estado anterior o el nuevo.
+
+    @type id_proyecto: entero.
+    @param id_proyecto: Proyecto del que se exporta la matriz.
+
+    @rtype: generador.
+    @return: Tuplas con el id, nombre, fase, estado y version del item y los ids de sus padres, hijos,
+    antecesores y sucesores separados por punto y coma.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    ultimo = (0, 0)
+    while True:
+        cursor = connection.cursor()
+        cursor.execute(CONSULTA_MATRIZ, [int(id_proyecto), ultimo[0], ultimo[1], FILAS_POR_LECTURA])
+        lote = cursor.fetchall()
+        cursor.close()
+        for fila in lote:
+            yield tuple('' if valor is None else valor for valor in fila[1:])
+        if len(lote) < FILAS_POR_LECTURA:
+            return
+        ultimo = lote[-1][:2]
+
+class Eco(object):
+
+    """ Archivo de solo escritura que devuelve lo escrito, para que csv.writer produzca cada linea sin acumularla. """
+
+    def write(self, valor):
+        return valor
+
+def codificar(valor):
+    if isinstance(valor, unicode):
+        return valor.encode('utf-8')
+    return valor
+
+def matriz_csv(id_proyecto):
+
+    """ Genera la matriz de trazabilidad del proyecto en formato CSV, linea por linea.
+
+    @rtype: generador.
+    @return: Las lineas del CSV, empezando por los titulos de las columnas.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    escritor = csv.writer(Eco())
+    yield escritor.writerow(COLUMNAS_MATRIZ)
+    for fila in filas_matriz(id_proyecto):
+        yield escritor.writerow([codificar(valor) for valor in fila])
+
+def matriz_xlsx(id_proyecto, archivo, avance=None):
+
+    """ Escribe la matriz de trazabilidad del proyecto como libro XLSX en el archivo recibido, en el modo de
+    memoria constante de xlsxwriter que baja cada fila a disco al pasar a la siguiente. El libro solo puede
+    enviarse una vez escrito completo, por lo que se genera en segundo plano (ver tareas.exportar_matriz).
+    Requiere el paquete opcional xlsxwriter.
+
+    @type archivo: file.
+    @param archivo: Archivo abierto para escritura binaria.
+
+    @type avance: funcion.
+    @param avance: Si se indica, se llama con la cantidad de filas escritas despues de escribir cada fila.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    if avance is None:
+        avance = lambda numero: None
+    libro = xlsxwriter.Workbook(archivo, {'constant_memory': True, 'in_memory': False})
+    hoja = libro.add_worksheet('Trazabilidad')
+    hoja.write_row(0, 0, COLUMNAS_MATRIZ)
+    for numero, fila in enumerate(filas_matriz(id_proyecto), 1):
+        hoja.write_row(numero, 0, fila)
+        avance(numero)
+    libro.close()
@@ -1,10 +1,18 @@
 from django.db import models
+from django.dispatch import Signal
 from aplicaciones.proyectos.models import Proyectos
 from aplicaciones.fases.models import Fases
 from aplicaciones.items.models import Items
 
 # Create your models here.
 
+class RelacionesActivasManager(models.Manager):
+    
+    """ Manager que solo devuelve las relaciones activas, para las consultas frecuentes. """
+    
+    def get_queryset(self):
+        return super(RelacionesActivasManager, self).get_queryset().filter(is_active=True)
+
 class Relaciones(models.Model):
     padre_id = models.IntegerField(null=True)
     antecesor_id = models.IntegerField(null=True)
@@ -14,14 +22,118 @@ class Relaciones(models.Model):
     proyecto = models.IntegerField(null=True)
     faseprimera = models.IntegerField(null=True)
     fasesegunda = models.IntegerField(null=True)
+    fecha_baja = models.DateTimeField(null=True)
+    
+    objects = models.Manager()
+    activas = RelacionesActivasManager()
     
     def __unicode__(self):
         return self.sucesor_id
 
+class RelacionArchivada(models.Model):
+    
+    """ Relaciones inactivas movidas fuera de Relaciones por el comando compactar_relaciones, para que las
+    consultas sobre relaciones no carguen con las filas eliminadas. Conservan el id original, por lo que
+    pueden restaurarse tal como estaban.
+    fecha_baja: fecha en que se desactivo la relacion. En las desactivadas antes de registrarla es la fecha en que
+    actualizar_base agrego la columna o compactar_relaciones las encontro sin fecha.
+    fecha_archivo: fecha en que se archivo la relacion.
+    """
+    
+    id = models.IntegerField(primary_key=True)
+    padre_id = models.IntegerField(null=True)
+    antecesor_id = models.IntegerField(null=True)
+    sucesor_id = models.IntegerField(null=True)
+    hijo_id = models.IntegerField(null=True)
+    proyecto = models.IntegerField(null=True, db_index=True)
+    faseprimera = models.IntegerField(null=True)
+    fasesegunda = models.IntegerField(null=True)
+    fecha_baja = models.DateTimeField(null=True)
+    fecha_archivo = models.DateTimeField()
+    
+    def __unicode__(self):
+        return unicode(self.id)
+
+class ClausuraRelacion(models.Model):
+    
+    """ Tabla de clausura de las relaciones activas de un proyecto. Cada fila agrupa los caminos de un
+    ancestro a un descendiente que tienen la misma profundidad y el mismo tipo, de modo que al desactivar
+    una relacion se pueden descontar solo los caminos que pasaban por ella. Se mantiene en
+    clausura.py al crear y desactivar relaciones.
+    proyecto: id del proyecto de la relacion.
+    ancestro: id del item padre o antecesor en el camino.
+    descendiente: id del item hijo o sucesor en el camino.
+    profundidad: cantidad de relaciones del camino.
+    tipo: Padre si todas las relaciones del camino son padre-hijo, Antecesor si todas son
+    antecesor-sucesor y Mixta en otro caso.
+    caminos: cantidad de caminos distintos con esa profundidad y tipo.
+    """
+    
+    proyecto = models.IntegerField()
+    ancestro = models.IntegerField()
+    descendiente = models.IntegerField()
+    profundidad = models.IntegerField()
+    tipo = models.CharField(max_length=10)
+    caminos = models.IntegerField(default=1)
+    
+    class Meta:
+        unique_together = (('proyecto', 'ancestro', 'descendiente', 'profundidad', 'tipo'),)
+        index_together = (('proyecto', 'descendiente', 'ancestro'),)
+    
+    def __unicode__(self):
+        return self.tipo
+
+class ContadorImpacto(models.Model):
+    
+    """ Contadores de aciertos y fallos de la cache del analisis de impacto. Se incrementan con una sola
+    sentencia en la base de datos, por lo que no se pierden cuentas con solicitudes simultaneas.
+    nombre: aciertos o fallos.
+    cantidad: cantidad de consultas contadas.
+    """
+    
+    nombre = models.CharField(max_length=20, unique=True)
+    cantidad = models.BigIntegerField(default=0)
+    
+    def __unicode__(self):
+        return self.nombre
+
 class ListaRelaciones(models.Model):
+    
+    """ Tabla en desuso: las vistas ya no guardan filas en ella, las relaciones a desplegar se
+    construyen con RelacionListada. Se mantiene para poder purgar las filas acumuladas con el
+    comando purgar_listas.
+    """
+    
     itemrelacionado = models.IntegerField(null=True)
     nombreitemrelacionado = models.CharField(max_length=30, null=True)
     tiporelacion = models.CharField(max_length=30, null=True)
     
     def __unicode__(self):
-        return self.tiporelacion
\ No newline at end of file
+        return self.tiporelacion
+
+class RelacionListada(object):
+    
+    """ Proyeccion en memoria de una relacion de un item, utilizada para desplegar las relaciones
+    en los templates sin persistir filas de ListaRelaciones.
+    id: id de la relacion (Relaciones) que se despliega.
+    itemrelacionado: id del item del otro extremo de la relacion.
+    nombreitemrelacionado: nombre del item del otro extremo de la relacion.
+    tiporelacion: rol del item relacionado (Padre, Hijo, Antecesor o Sucesor).
+    """
+    
+    __slots__ = ('id', 'itemrelacionado', 'nombreitemrelacionado', 'tiporelacion')
+    
+    def __init__(self, id=None, itemrelacionado=None, nombreitemrelacionado=None, tiporelacion=None):
+        self.id = id
+        self.itemrelacionado = itemrelacionado
+        self.nombreitemrelacionado = nombreitemrelacionado
+        self.tiporelacion = tiporelacion
+    
+    def __unicode__(self):
+        return self.tiporelacion
+
+""" Se envia despues de confirmar la creacion o desactivacion de relaciones de un proyecto: aristas es una
+lista de pares (id origen, id destino) con el padre o antecesor como origen """
+relaciones_modificadas = Signal(providing_args=['id_proyecto', 'aristas'])
+
+from . import impacto
@@ -0,0 +1,9 @@
+-- Indices de Relaciones. Se crean al crear la tabla con syncdb; en bases existentes ejecutar "python manage.py crear_indices"
+-- Relaciones activas en las que el item es antecesor o padre (fase del primer extremo)
+CREATE INDEX IF NOT EXISTS relaciones_relaciones_antecesor ON relaciones_relaciones (proyecto, faseprimera, antecesor_id) WHERE is_active = true;
+CREATE INDEX IF NOT EXISTS relaciones_relaciones_padre ON relaciones_relaciones (proyecto, faseprimera, padre_id) WHERE is_active = true;
+-- Relaciones activas en las que el item es sucesor o hijo (fase del segundo extremo)
+CREATE INDEX IF NOT EXISTS relaciones_relaciones_sucesor ON relaciones_relaciones (proyecto, fasesegunda, sucesor_id) WHERE is_active = true;
+CREATE INDEX IF NOT EXISTS relaciones_relaciones_hijo ON relaciones_relaciones (proyecto, fasesegunda, hijo_id) WHERE is_active = true;
+-- Relaciones inactivas por fecha de baja, para compactar_relaciones
+CREATE INDEX IF NOT EXISTS relaciones_relaciones_baja ON relaciones_relaciones (fecha_baja) WHERE is_active = false;
@@ -0,0 +1,44 @@
+import tempfile
+from django.core.files import File
+from aplicaciones.items.models import Items
+from aplicaciones.trabajos.ejecucion import avanzar
+from .matriz import matriz_csv, matriz_xlsx
+
+""" Cantidad de lineas de la matriz entre dos registros de avance """
+LINEAS_POR_AVANCE = 1000
+
+def exportar_matriz(trabajo, id_proyecto, formato):
+
+    """ Tarea de procesar_trabajos que genera la matriz de trazabilidad del proyecto en CSV o XLSX y la
+    guarda como archivo del trabajo. El XLSX debe escribirse completo antes de poder enviarse, por lo que
+    generarlo fuera de la solicitud web evita que el usuario espere sin respuesta. En ambos formatos se
+    registra el avance cada LINEAS_POR_AVANCE lineas, donde tambien puede cancelarse el trabajo.
+
+    @type formato: string.
+    @param formato: csv o xlsx.
+
+    @rtype: diccionario.
+    @return: Cantidad de items de la matriz.
+
+    @author: Romina Diaz de Bedoya.
+
+    """
+
+    total = Items.objects.filter(proyecto_id=id_proyecto, is_active=True).count()
+    mensaje = 'Generando la matriz de %s items' % total
+    avanzar(trabajo, 0, mensaje)
+
+    def avance(numero):
+        if numero and numero % LINEAS_POR_AVANCE == 0:
+            avanzar(trabajo, 90 * numero / total, mensaje)
+
+    with tempfile.TemporaryFile() as temporal:
+        if formato == 'xlsx':
+            matriz_xlsx(id_proyecto, temporal, avance=avance)
+        else:
+            for numero, linea in enumerate(matriz_csv(id_proyecto)):
+                temporal.write(linea)
+                avance(numero)
+        temporal.seek(0)
+        trabajo.archivo.save('trazabilidad_proyecto_%s.%s' % (id_proyecto, formato), File(temporal), save=False)
+    return {'items':total}
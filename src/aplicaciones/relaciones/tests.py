@@ -1,3 +1,446 @@
 from django.test import TestCase
+from django.test.client import RequestFactory
+from django.db import connection, transaction
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext
+from aplicaciones.pruebas import consultas_sin_cache, plan_consulta
+from django.core.management import call_command
+from StringIO import StringIO
+import json
+import tempfile
+from datetime import timedelta
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.models import User
+from aplicaciones.proyectos.models import Proyectos
+from aplicaciones.fases.models import Fases
+from aplicaciones.tipoitem.models import TipoItem
+from aplicaciones.items.models import Items
+from .models import Relaciones, RelacionArchivada
+from .views import crear_relacion, impacto_item, adm_relaciones, relaciones_item, listar_items, candidatos_relacion, eliminar_relacion, exportar_matriz, dibujar_relaciones, importar_relaciones, estadisticas_impacto
+from .impacto import calcular_impacto, clave_impacto
+from . import matriz
+from .matriz import xlsxwriter
+from .dibujo import dot_proyecto, ejecutable_dot
+from .grafo import GrafoProyecto, grafo_proyecto, registrar_arista
+from .clausura import ancestros, descendientes, es_ancestro, diferencias_clausura, reconstruir_clausura
 
-# Create your tests here.
+class test_relaciones (TestCase):
+
+    def setUp(self):
+        """ Creamos relaciones de los cuatro tipos entre items de dos fases de un proyecto, y un
+            segundo proyecto con una cadena de items relacionados para el grafo de trazabilidad.
+        """
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user('tester', 'tester@sicp.com', 'tester')
+        self.proyecto = Proyectos.objects.create(nombre='Proyecto Relaciones', fecha_inicio='2014-04-17', duracion=2, estado='En Construccion')
+        self.fase = Fases.objects.create(nombre='Fase 1', estado='DR', proyecto=self.proyecto)
+        self.tipoitem = TipoItem.objects.create(nombre='Requerimiento', descripcion='ninguna', id_proyecto=self.proyecto.id)
+        self.items = []
+        for i in range(6):
+            self.items.append(Items.objects.create(nombre='Item %s' % i, version=1, estado='En Construccion', costoMonetario=10 * (i + 1), costoTemporal=i + 1,
+                                                   fase=self.fase, proyecto=self.proyecto, tipo_item=self.tipoitem))
+        #Item 0 -> Item 1 -> Item 2 -> Item 3 y Item 1 -> Item 4; Item 5 queda suelto
+        for padre, hijo in ((0, 1), (1, 2), (1, 4)):
+            Relaciones.objects.create(padre_id=self.items[padre].id, hijo_id=self.items[hijo].id, proyecto=self.proyecto.id, faseprimera=self.fase.id, fasesegunda=self.fase.id, is_active=True)
+        Relaciones.objects.create(antecesor_id=self.items[2].id, sucesor_id=self.items[3].id, proyecto=self.proyecto.id, faseprimera=self.fase.id, fasesegunda=self.fase.id, is_active=True)
+        Relaciones.objects.create(padre_id=self.items[3].id, hijo_id=self.items[5].id, proyecto=self.proyecto.id, faseprimera=self.fase.id, fasesegunda=self.fase.id, is_active=False)
+        for i in range(1, 21):
+            Relaciones.objects.create(antecesor_id=i, sucesor_id=i + 100, proyecto=-1, faseprimera=1, fasesegunda=2, is_active=True)
+            Relaciones.objects.create(padre_id=i, hijo_id=i + 1, proyecto=-1, faseprimera=1, fasesegunda=1, is_active=i % 2 == 0)
+
+    def test_planes_consulta(self):
+
+        consultas = [
+            Relaciones.objects.filter(proyecto=-1, faseprimera=1, antecesor_id=5, is_active=True),
+            Relaciones.objects.filter(proyecto=-1, faseprimera=1, padre_id=5, is_active=True),
+            Relaciones.objects.filter(proyecto=-1, fasesegunda=2, sucesor_id=105, is_active=True),
+            Relaciones.objects.filter(proyecto=-1, fasesegunda=1, hijo_id=6, is_active=True),
+        ]
+        for consulta in consultas:
+            plan = plan_consulta(consulta)
+            self.assertNotIn('Seq Scan', plan, plan)
+        print 'Test de planes de consulta de relaciones ejecutado exitosamente.'
+
+    def test_grafo_alcanzables(self):
+
+        ids = [item.id for item in self.items]
+        #La version del proyecto y sus relaciones
+        with self.assertNumQueries(2):
+            grafo = grafo_proyecto(self.proyecto.id)
+        self.assertEqual(sorted(grafo.alcanzables(ids[0])), sorted(ids[1:5]))
+        self.assertEqual(sorted(grafo.alcanzables(ids[3], adelante=False)), sorted(ids[0:3]))
+        self.assertEqual(grafo.alcanzables(ids[5]), [])
+        with self.assertNumQueries(1):
+            self.assertTrue(grafo_proyecto(self.proyecto.id) is grafo)
+        impacto = grafo.impacto(ids[1])
+        self.assertEqual(impacto['costoMonetario'], 20 + 30 + 40 + 50)
+        self.assertEqual(impacto['costoTemporal'], 2 + 3 + 4 + 5)
+        print 'Test de recorridos del grafo de trazabilidad ejecutado exitosamente.'
+
+    def test_grafo_incremental(self):
+
+        ids = [item.id for item in self.items]
+        grafo = grafo_proyecto(self.proyecto.id)
+        request = self.factory.post('/adm_proyectos/gestionar/%s/adm_items/%s/relaciones/%s/nuevo/relacionnueva/%s/' % (self.proyecto.id, self.fase.id, ids[5], ids[3]), {'tiporelacion': 'Padre'})
+        request.user = self.user
+        crear_relacion(request, str(self.proyecto.id), str(self.fase.id), str(ids[5]), str(ids[3]))
+        with self.assertNumQueries(1):
+            self.assertTrue(grafo_proyecto(self.proyecto.id) is grafo)
+        self.assertIn(ids[5], grafo.alcanzables(ids[0]))
+
+        #Una relacion creada en una transaccion deshecha no queda en el grafo de este proceso
+        try:
+            with transaction.atomic():
+                registrar_arista(self.proyecto.id, ids[4], ids[1])
+                raise ValueError()
+        except ValueError:
+            pass
+        grafo = grafo_proyecto(self.proyecto.id)
+        self.assertNotIn(ids[1], grafo.alcanzables(ids[4]))
+        #Las relaciones creadas desde otro proceso se ven al cambiar la version del proyecto
+        Relaciones.objects.create(padre_id=ids[4], hijo_id=ids[5], proyecto=self.proyecto.id, faseprimera=self.fase.id, fasesegunda=self.fase.id, is_active=True)
+        Proyectos.objects.filter(id=self.proyecto.id).update(version_relaciones=-1)
+        self.assertFalse(grafo_proyecto(self.proyecto.id) is grafo)
+        self.assertIn(ids[5], grafo_proyecto(self.proyecto.id).alcanzables(ids[4]))
+        proyecto = Proyectos.objects.get(id=self.proyecto.id)
+        proyecto.nombre = 'Proyecto Renombrado'
+        proyecto.version_relaciones = 0
+        proyecto.save()
+        self.assertEqual(Proyectos.objects.get(id=self.proyecto.id).version_relaciones, -1)
+
+        request = self.factory.get('/adm_proyectos/gestionar/%s/adm_items/%s/relaciones/%s/impacto/' % (self.proyecto.id, self.fase.id, ids[0]))
+        request.user = self.user
+        response = impacto_item(request, str(self.proyecto.id), str(self.fase.id), str(ids[0]))
+        self.assertContains(response, 'Costo monetario total: 210')
+
+        cadena = GrafoProyecto(self.proyecto.id, [])
+        for i in range(1, 600):
+            cadena.agregar_arista(i, i + 1)
+        self.assertEqual(len(cadena.alcanzables(1)), 599)
+        self.assertEqual(cadena.alcanzables(600, adelante=False)[-1], 1)
+        print 'Test de actualizacion incremental del grafo ejecutado exitosamente.'
+
+    def test_ciclos(self):
+
+        ids = [item.id for item in self.items]
+        request = self.factory.post('/adm_proyectos/gestionar/%s/adm_items/%s/relaciones/%s/nuevo/relacionnueva/%s/' % (self.proyecto.id, self.fase.id, ids[0], ids[3]), {'tiporelacion': 'Padre'})
+        request.user = self.user
+        response = crear_relacion(request, str(self.proyecto.id), str(self.fase.id), str(ids[0]), str(ids[3]))
+        self.assertContains(response, 'formaria un ciclo: Item 3 -&gt; Item 0 -&gt; Item 1 -&gt; Item 2 -&gt; Item 3')
+        self.assertFalse(Relaciones.objects.filter(padre_id=ids[3], hijo_id=ids[0]).exists())
+
+        grafo = GrafoProyecto(self.proyecto.id, [])
+        for i in range(1, 200):
+            self.assertIsNone(grafo.agregar_arista(i + 1, i))
+        self.assertIsNone(grafo.agregar_arista(300, 200))
+        self.assertEqual(grafo.agregar_arista(1, 200), [1, 200, 199] + range(198, 0, -1))
+        self.assertEqual(grafo.agregar_arista(7, 7), [7, 7])
+        for origen, destino in grafo.aristas():
+            self.assertTrue(grafo.orden[grafo.indices[origen]] < grafo.orden[grafo.indices[destino]])
+
+        Relaciones.objects.create(padre_id=ids[4], hijo_id=ids[0], proyecto=self.proyecto.id, faseprimera=self.fase.id, fasesegunda=self.fase.id, is_active=True)
+        salida = StringIO()
+        call_command('auditar_ciclos', proyecto=self.proyecto.id, stdout=salida)
+        self.assertIn('Proyecto %s: %s -> %s -> %s' % (self.proyecto.id, ids[0], ids[1], ids[4]), salida.getvalue())
+        self.assertIn('1 ciclos encontrados', salida.getvalue())
+        print 'Test de deteccion de ciclos ejecutado exitosamente.'
+
+    def test_adm_relaciones(self):
+        """ Las relaciones del item se listan con una consulta para los cuatro tipos y otra para los
+            nombres, y se pueden filtrar por tipo y paginar.
+        """
+        lista = relaciones_item(self.proyecto.id, self.fase.id, self.items[2].id)
+        self.assertEqual([(relacion.tiporelacion, relacion.nombreitemrelacionado) for relacion in lista], [('Padre', 'Item 1'), ('Sucesor', 'Item 3')])
+        self.assertEqual([relacion.itemrelacionado for relacion in relaciones_item(self.proyecto.id, self.fase.id, self.items[1].id, 'Hijo')],
+                         [self.items[2].id, self.items[4].id])
+        self.assertEqual(relaciones_item(self.proyecto.id, self.fase.id, self.items[5].id), [])
+        url = '/adm_proyectos/gestionar/%s/adm_items/%s/relaciones/%s/' % (self.proyecto.id, self.fase.id, self.items[1].id)
+        request = self.factory.get(url)
+        request.user = self.user
+        with self.assertNumQueries(5):
+            response = adm_relaciones(request, str(self.proyecto.id), str(self.fase.id), str(self.items[1].id))
+        self.assertContains(response, 'Item 0')
+        self.assertContains(response, 'Item 4')
+        request = self.factory.get(url, {'tipo': 'Padre', 'pagina': 'x'})
+        request.user = self.user
+        response = adm_relaciones(request, str(self.proyecto.id), str(self.fase.id), str(self.items[1].id))
+        self.assertContains(response, 'Item 0')
+        self.assertNotContains(response, 'Item 4')
+        print 'Test de adm_relaciones con una sola consulta de relaciones exitoso'
+
+    def test_listar_items(self):
+        """ Los candidatos a relacionar se obtienen con una consulta que excluye al item y a los ya
+            relacionados, incluyen los items de la fase anterior como antecesores y se pueden buscar.
+        """
+        ids = [item.id for item in self.items]
+        candidatos, anterior = candidatos_relacion(self.proyecto.id, self.fase.id, ids[1])
+        self.assertIsNone(anterior)
+        self.assertEqual([item.id for item in candidatos], [ids[3], ids[5]])
+
+        fase2 = Fases.objects.create(nombre='Fase 2', estado='DR', proyecto=self.proyecto)
+        diseno = Items.objects.create(nombre='Diseno', version=1, estado='En Construccion', fase=fase2, proyecto=self.proyecto, tipo_item=self.tipoitem)
+        url = '/adm_proyectos/gestionar/%s/adm_items/%s/relaciones/%s/nuevo/' % (self.proyecto.id, fase2.id, diseno.id)
+        request = self.factory.get(url, {'busqueda': 'item 2'})
+        request.user = self.user
+        with self.assertNumQueries(3):
+            response = listar_items(request, str(self.proyecto.id), str(fase2.id), str(diseno.id))
+        self.assertContains(response, 'Item 2')
+        self.assertContains(response, 'Anterior')
+        self.assertNotContains(response, 'Item 3')
+
+        request = self.factory.post(url + 'relacionnueva/%s/' % ids[2], {'tiporelacion': 'Padre'})
+        request.user = self.user
+        response = crear_relacion(request, str(self.proyecto.id), str(fase2.id), str(diseno.id), str(ids[2]))
+        self.assertContains(response, 'No se puede crear la relacion: el tipo de relacion seleccionado no es valido')
+        self.assertNotContains(response, 'creada con exito')
+        self.assertFalse(Relaciones.objects.filter(hijo_id=diseno.id).exists())
+        request = self.factory.post(url + 'relacionnueva/%s/' % ids[2], {})
+        request.user = self.user
+        self.assertContains(crear_relacion(request, str(self.proyecto.id), str(fase2.id), str(diseno.id), str(ids[2])), 'No se puede crear la relacion')
+        request = self.factory.post(url + 'relacionnueva/%s/' % ids[2], {'tiporelacion': 'Antecesor'})
+        request.user = self.user
+        crear_relacion(request, str(self.proyecto.id), str(fase2.id), str(diseno.id), str(ids[2]))
+        self.assertTrue(Relaciones.objects.filter(antecesor_id=ids[2], faseprimera=self.fase.id, sucesor_id=diseno.id, fasesegunda=fase2.id).exists())
+        self.assertIn(diseno.id, grafo_proyecto(self.proyecto.id).alcanzables(ids[0]))
+        candidatos, anterior = candidatos_relacion(self.proyecto.id, fase2.id, diseno.id)
+        self.assertEqual(anterior, self.fase.id)
+        self.assertNotIn(ids[2], [item.id for item in candidatos])
+        self.assertEqual(len(candidatos), 5)
+        print 'Test de candidatos para nuevas relaciones ejecutado exitosamente.'
+
+    def test_clausura(self):
+        """ La tabla de clausura se reconstruye con el comando y se mantiene al crear y eliminar
+            relaciones, respondiendo las consultas de ancestros con una sola consulta.
+        """
+        ids = [item.id for item in self.items]
+        salida = StringIO()
+        call_command('reconstruir_clausura', proyecto=self.proyecto.id, verificar=True, stdout=salida)
+        self.assertIn('1 proyectos inconsistentes', salida.getvalue())
+        salida = StringIO()
+        call_command('reconstruir_clausura', proyecto=self.proyecto.id, stdout=salida)
+        self.assertIn('0 proyectos inconsistentes', salida.getvalue())
+        with self.assertNumQueries(1):
+            self.assertEqual(ancestros(self.proyecto.id, ids[3]), [(ids[2], 1), (ids[1], 2), (ids[0], 3)])
+        self.assertEqual(ancestros(self.proyecto.id, ids[3], 'Padre'), [])
+        self.assertEqual(descendientes(self.proyecto.id, ids[0], 'Padre'), [(ids[1], 1), (ids[2], 2), (ids[4], 2)])
+
+        url = '/adm_proyectos/gestionar/%s/adm_items/%s/relaciones/%s/' % (self.proyecto.id, self.fase.id, ids[4])
+        request = self.factory.post(url + 'nuevo/relacionnueva/%s/' % ids[3], {'tiporelacion': 'Hijo'})
+        request.user = self.user
+        crear_relacion(request, str(self.proyecto.id), str(self.fase.id), str(ids[4]), str(ids[3]))
+        self.assertEqual(diferencias_clausura(self.proyecto.id), [])
+        self.assertEqual(ancestros(self.proyecto.id, ids[3], 'Padre'), [(ids[4], 1), (ids[1], 2), (ids[0], 3)])
+
+        relacion = Relaciones.objects.get(proyecto=self.proyecto.id, padre_id=ids[1], hijo_id=ids[2])
+        request = self.factory.get(url + 'eliminar/%s/' % relacion.id)
+        request.user = self.user
+        response = eliminar_relacion(request, str(self.proyecto.id), str(self.fase.id), str(ids[4]), str(relacion.id))
+        self.assertContains(response, 'eliminada con exito')
+        self.assertEqual(diferencias_clausura(self.proyecto.id), [])
+        self.assertFalse(es_ancestro(self.proyecto.id, ids[0], ids[2]))
+        self.assertTrue(es_ancestro(self.proyecto.id, ids[0], ids[3]))
+        self.assertNotIn(ids[2], grafo_proyecto(self.proyecto.id).alcanzables(ids[0]))
+        print 'Test de la tabla de clausura de relaciones ejecutado exitosamente.'
+
+    def test_exportar_matriz(self):
+        """ La matriz de trazabilidad se genera a medida que se recorre la respuesta, leyendo los items por
+            lotes, con una fila por item activo y los ids de sus relaciones activas.
+        """
+        ids = [item.id for item in self.items]
+        request = self.factory.get('/adm_proyectos/gestionar/%s/matriz/csv/' % self.proyecto.id)
+        request.user = self.user
+        response = exportar_matriz(request, str(self.proyecto.id))
+        self.assertTrue(response.streaming)
+        filas_por_lectura = matriz.FILAS_POR_LECTURA
+        matriz.FILAS_POR_LECTURA = 4
+        try:
+            with self.assertNumQueries(2):
+                lineas = ''.join(response.streaming_content).splitlines()
+        finally:
+            matriz.FILAS_POR_LECTURA = filas_por_lectura
+        self.assertEqual(lineas[0], 'Id,Item,Fase,Estado,Version,Padres,Hijos,Antecesores,Sucesores')
+        self.assertEqual(len(lineas), 7)
+        self.assertEqual(lineas[2], '%s,Item 1,Fase 1,En Construccion,1,%s,%s;%s,,' % (ids[1], ids[0], ids[2], ids[4]))
+        self.assertEqual(lineas[4], '%s,Item 3,Fase 1,En Construccion,1,,,%s,' % (ids[3], ids[2]))
+        self.assertEqual(lineas[6], '%s,Item 5,Fase 1,En Construccion,1,,,,' % ids[5])
+
+        if xlsxwriter is not None:
+            archivo = tempfile.TemporaryFile()
+            matriz.matriz_xlsx(self.proyecto.id, archivo)
+            archivo.seek(0)
+            self.assertEqual(archivo.read(2), 'PK')
+            archivo.close()
+        print 'Test de exportacion de la matriz de trazabilidad ejecutado exitosamente.'
+
+    def test_dibujar_relaciones(self):
+        """ El grafo DOT se agrupa por fases y se guarda en la cache; al crear una relacion o modificar un
+            item solo se vuelve a generar el fragmento de la fase que cambio.
+        """
+        ids = [item.id for item in self.items]
+        fase2 = Fases.objects.create(nombre='Fase 2', estado='DR', proyecto=self.proyecto)
+        diseno = Items.objects.create(nombre='Diseno "A"', version=1, estado='Validado', fase=fase2, proyecto=self.proyecto, tipo_item=self.tipoitem)
+        dot = dot_proyecto(self.proyecto.id)
+        self.assertIn('subgraph cluster_%s {' % self.fase.id, dot)
+        self.assertIn('i%s [label="Diseno \\"A\\"", fillcolor=palegreen];' % diseno.id, dot)
+        self.assertIn('i%s -> i%s [style=dashed];' % (ids[2], ids[3]), dot)
+        self.assertNotIn('i%s -> i%s;' % (ids[3], ids[5]), dot)
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(dot_proyecto(self.proyecto.id), dot)
+        self.assertEqual(len(consultas_sin_cache(consultas)), 1)
+
+        request = self.factory.post('/adm_proyectos/gestionar/%s/adm_items/%s/relaciones/%s/nuevo/relacionnueva/%s/' % (self.proyecto.id, fase2.id, diseno.id, ids[2]), {'tiporelacion': 'Antecesor'})
+        request.user = self.user
+        crear_relacion(request, str(self.proyecto.id), str(fase2.id), str(diseno.id), str(ids[2]))
+        with CaptureQueriesContext(connection) as consultas:
+            dot = dot_proyecto(self.proyecto.id)
+        #Las fases del proyecto, y los items y relaciones de la fase 2
+        self.assertEqual(len(consultas_sin_cache(consultas)), 3)
+        self.assertIn('i%s -> i%s [style=dashed];' % (ids[2], diseno.id), dot)
+
+        self.items[0].nombre = 'Item Renombrado'
+        self.items[0].save()
+        with CaptureQueriesContext(connection) as consultas:
+            dot = dot_proyecto(self.proyecto.id)
+        self.assertEqual(len(consultas_sin_cache(consultas)), 3)
+        self.assertIn('i%s [label="Item Renombrado"' % ids[0], dot)
+
+        request = self.factory.get('/adm_proyectos/gestionar/%s/grafo/svg/' % self.proyecto.id)
+        request.user = self.user
+        response = dibujar_relaciones(request, str(self.proyecto.id), 'svg')
+        if ejecutable_dot() is None:
+            self.assertContains(response, 'Graphviz no esta instalado')
+        else:
+            self.assertContains(response, '<svg')
+        print 'Test de dibujo del grafo de relaciones ejecutado exitosamente.'
+
+    def test_importar_relaciones(self):
+        """ Las aristas de un archivo se validan todas antes de crear las validas en bloque, y se informa
+            el error de cada fila rechazada.
+        """
+        ids = [item.id for item in self.items]
+        reconstruir_clausura(self.proyecto.id)
+        fase2 = Fases.objects.create(nombre='Fase 2', estado='DR', proyecto=self.proyecto)
+        diseno = Items.objects.create(nombre='Diseno', version=1, estado='En Construccion', fase=fase2, proyecto=self.proyecto, tipo_item=self.tipoitem)
+        filas = [(ids[3], ids[5], 'Padre'), (ids[0], ids[1], 'Padre'), (ids[3], ids[0], 'Padre'), (ids[2], diseno.id, 'antecesor'),
+                 (diseno.id, ids[2], 'Antecesor'), (ids[0], diseno.id, 'Padre'), (999999, ids[0], 'Padre'), ('x', 1, 'Padre'),
+                 (ids[3], ids[5], 'Padre'), (ids[4], ids[5], 'Hijo')]
+        contenido = 'origen,destino,tipo\n' + ''.join('%s,%s,%s\n' % fila for fila in filas)
+        request = self.factory.post('/adm_proyectos/gestionar/%s/importar_relaciones/' % self.proyecto.id,
+                                    {'archivo': SimpleUploadedFile('relaciones.csv', contenido), 'formato': 'csv'})
+        request.user = self.user
+        response = importar_relaciones(request, str(self.proyecto.id))
+        self.assertContains(response, '2 relaciones creadas, 8 filas con errores')
+        for mensaje in ('La relacion ya existe', 'formaria un ciclo', 'fase siguiente', 'misma fase', 'No existen los items 999999',
+                        'deben ser numeros', 'Padre o Antecesor'):
+            self.assertContains(response, mensaje)
+        self.assertTrue(Relaciones.objects.filter(proyecto=self.proyecto.id, padre_id=ids[3], hijo_id=ids[5], is_active=True).exists())
+        self.assertTrue(Relaciones.objects.filter(antecesor_id=ids[2], sucesor_id=diseno.id, faseprimera=self.fase.id, fasesegunda=fase2.id).exists())
+        self.assertIn(diseno.id, grafo_proyecto(self.proyecto.id).alcanzables(ids[0]))
+        self.assertEqual(diferencias_clausura(self.proyecto.id), [])
+
+        archivo = tempfile.NamedTemporaryFile(suffix='.json')
+        json.dump([{'origen': ids[4], 'destino': diseno.id, 'tipo': 'Antecesor'}, {'origen': ids[5], 'destino': ids[3], 'tipo': 'Padre'},
+                   {'origen': ids[4] + 0.9, 'destino': diseno.id, 'tipo': 'Antecesor'}, {'origen': True, 'destino': ids[1], 'tipo': 'Padre'},
+                   {'origen': ids[5], 'destino': ids[4], 'tipo': 1}, {'origen': ids[5], 'destino': ids[4], 'tipo': ['Padre']}], archivo)
+        archivo.flush()
+        salida = StringIO()
+        call_command('importar_relaciones', archivo.name, proyecto=self.proyecto.id, verificar=True, stdout=salida)
+        self.assertIn('Fila 2: La relacion formaria un ciclo', salida.getvalue())
+        self.assertIn('Fila 3: Los ids de origen y destino deben ser numeros enteros', salida.getvalue())
+        self.assertIn('Fila 4: Los ids de origen y destino deben ser numeros enteros', salida.getvalue())
+        self.assertIn('Fila 5: El tipo debe ser Padre o Antecesor', salida.getvalue())
+        self.assertIn('Fila 6: El tipo debe ser Padre o Antecesor', salida.getvalue())
+        self.assertIn('1 relaciones validas, 5 filas con errores', salida.getvalue())
+        self.assertFalse(Relaciones.objects.filter(antecesor_id=ids[4]).exists())
+        print 'Test de importacion de relaciones ejecutado exitosamente.'
+
+    def test_compactar_relaciones(self):
+        """ Las relaciones inactivas antiguas se mueven a la tabla de archivo y se pueden restaurar con
+            su id original; las relaciones activas, las dadas de baja recientemente y las que no tenian
+            fecha de baja no se tocan.
+        """
+        ids = [item.id for item in self.items]
+        relacion = Relaciones.objects.get(proyecto=self.proyecto.id, padre_id=ids[1], hijo_id=ids[4])
+        request = self.factory.get('/adm_proyectos/gestionar/%s/adm_items/%s/relaciones/%s/eliminar/%s/' % (self.proyecto.id, self.fase.id, ids[1], relacion.id))
+        request.user = self.user
+        eliminar_relacion(request, str(self.proyecto.id), str(self.fase.id), str(ids[1]), str(relacion.id))
+        self.assertIsNotNone(Relaciones.objects.get(id=relacion.id).fecha_baja)
+
+        #La relacion inactiva sin fecha de baja recibe la fecha actual y espera el plazo como las demas
+        call_command('compactar_relaciones', proyecto=self.proyecto.id, lote=1, stdout=StringIO())
+        antigua = Relaciones.objects.get(proyecto=self.proyecto.id, padre_id=ids[3], hijo_id=ids[5])
+        self.assertIsNotNone(antigua.fecha_baja)
+        self.assertEqual(RelacionArchivada.objects.count(), 0)
+        Relaciones.objects.filter(id=antigua.id).update(fecha_baja=antigua.fecha_baja - timedelta(days=100))
+
+        salida = StringIO()
+        call_command('compactar_relaciones', proyecto=self.proyecto.id, lote=1, stdout=salida)
+        self.assertIn('1 relaciones archivadas', salida.getvalue())
+        self.assertIn('KB recuperados', salida.getvalue())
+        self.assertEqual(list(RelacionArchivada.objects.values_list('padre_id', 'hijo_id')), [(ids[3], ids[5])])
+        self.assertEqual(Relaciones.objects.filter(proyecto=self.proyecto.id).count(), 4)
+        self.assertEqual(Relaciones.activas.filter(proyecto=self.proyecto.id).count(), 3)
+
+        call_command('compactar_relaciones', dias=0, stdout=StringIO())
+        self.assertFalse(Relaciones.objects.filter(is_active=False).exists())
+        self.assertEqual(RelacionArchivada.objects.count(), 12)
+
+        salida = StringIO()
+        call_command('compactar_relaciones', proyecto=self.proyecto.id, restaurar=True, stdout=salida)
+        self.assertIn('2 relaciones restauradas', salida.getvalue())
+        restaurada = Relaciones.objects.get(id=relacion.id)
+        self.assertFalse(restaurada.is_active)
+        self.assertEqual((restaurada.padre_id, restaurada.hijo_id, restaurada.faseprimera), (ids[1], ids[4], self.fase.id))
+        self.assertEqual(RelacionArchivada.objects.count(), 10)
+        print 'Test de compactacion de relaciones ejecutado exitosamente.'
+
+    def test_cache_impacto(self):
+        """ El impacto se guarda por item y sentido, y solo se descartan los resultados que incluyen a un
+            item cuyos costos cambian o a los extremos de una relacion creada o eliminada.
+        """
+        ids = [item.id for item in self.items]
+        proyecto = self.proyecto.id
+        #Los ancestros y descendientes de los items a invalidar se leen de la tabla de clausura
+        reconstruir_clausura(proyecto)
+        self.assertEqual(calcular_impacto(proyecto, ids[0])['costoMonetario'], 150)
+        #Solo se cuenta el acierto
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(calcular_impacto(proyecto, ids[0])['costoMonetario'], 150)
+        self.assertEqual(len(consultas_sin_cache(consultas)), 1)
+        calcular_impacto(proyecto, ids[5])
+        calcular_impacto(proyecto, ids[5], adelante=False)
+        calcular_impacto(proyecto, ids[2], adelante=False)
+
+        item = Items.objects.get(id=ids[4])
+        item.descripcion = 'sin cambios de costo'
+        item.save()
+        self.assertIsNotNone(cache.get(clave_impacto(proyecto, ids[0], True)))
+        item.costoMonetario = 100
+        item.save()
+        self.assertIsNone(cache.get(clave_impacto(proyecto, ids[0], True)))
+        self.assertIsNotNone(cache.get(clave_impacto(proyecto, ids[2], False)))
+        self.assertIsNotNone(cache.get(clave_impacto(proyecto, ids[5], True)))
+        self.assertEqual(calcular_impacto(proyecto, ids[0])['costoMonetario'], 200)
+
+        request = self.factory.post('/adm_proyectos/gestionar/%s/adm_items/%s/relaciones/%s/nuevo/relacionnueva/%s/' % (proyecto, self.fase.id, ids[5], ids[4]), {'tiporelacion': 'Padre'})
+        request.user = self.user
+        crear_relacion(request, str(proyecto), str(self.fase.id), str(ids[5]), str(ids[4]))
+        self.assertIsNone(cache.get(clave_impacto(proyecto, ids[0], True)))
+        self.assertIsNone(cache.get(clave_impacto(proyecto, ids[5], False)))
+        self.assertIsNotNone(cache.get(clave_impacto(proyecto, ids[5], True)))
+        self.assertIsNotNone(cache.get(clave_impacto(proyecto, ids[2], False)))
+        self.assertEqual(calcular_impacto(proyecto, ids[0])['costoMonetario'], 260)
+
+        relacion = Relaciones.activas.get(proyecto=proyecto, padre_id=ids[4], hijo_id=ids[5])
+        request = self.factory.get('/adm_proyectos/gestionar/%s/adm_items/%s/relaciones/%s/eliminar/%s/' % (proyecto, self.fase.id, ids[4], relacion.id))
+        request.user = self.user
+        eliminar_relacion(request, str(proyecto), str(self.fase.id), str(ids[4]), str(relacion.id))
+        self.assertIsNone(cache.get(clave_impacto(proyecto, ids[0], True)))
+        self.assertIsNotNone(cache.get(clave_impacto(proyecto, ids[5], True)))
+        self.assertEqual(calcular_impacto(proyecto, ids[0])['costoMonetario'], 200)
+
+        response = estadisticas_impacto(self.factory.get('/adm_proyectos/impacto/estadisticas/'))
+        datos = json.loads(response.content)
+        self.assertEqual((datos['aciertos'], datos['fallos']), (1, 7))
+        print 'Test de la cache del analisis de impacto ejecutado exitosamente.'
@@ -1,10 +1,15 @@
 from django.conf.urls import patterns, url
-from .views import adm_relaciones, crear_relacion, listar_items
-#, eliminar_relacion
+from .views import adm_relaciones, crear_relacion, listar_items, impacto_item, eliminar_relacion, exportar_matriz, generar_matriz, dibujar_relaciones, importar_relaciones, estadisticas_impacto
 
 urlpatterns = patterns('',
                        url(r'^adm_proyectos/gestionar/(?P<id_proyecto>\d+)/adm_items/(?P<id_fase>\d+)/relaciones/(?P<id_item>\d+)/$', adm_relaciones),
                        url(r'^adm_proyectos/gestionar/(?P<id_proyecto>\d+)/adm_items/(?P<id_fase>\d+)/relaciones/(?P<id_item>\d+)/nuevo/$', listar_items),
                        url(r'^adm_proyectos/gestionar/(?P<id_proyecto>\d+)/adm_items/(?P<id_fase>\d+)/relaciones/(?P<id_item>\d+)/nuevo/relacionnueva/(?P<id_importar>\d+)/$', crear_relacion),
-                       #url(r'^adm_proyectos/gestionar/(?P<id_proyecto>\d+)/adm_items/(?P<id_fase>\d+)/relaciones/(?P<id_item>\d+)/eliminar/(?P<id_relacion>\d+)/$', eliminar_relacion),
+                       url(r'^adm_proyectos/gestionar/(?P<id_proyecto>\d+)/adm_items/(?P<id_fase>\d+)/relaciones/(?P<id_item>\d+)/impacto/$', impacto_item),
+                       url(r'^adm_proyectos/gestionar/(?P<id_proyecto>\d+)/adm_items/(?P<id_fase>\d+)/relaciones/(?P<id_item>\d+)/eliminar/(?P<id_relacion>\d+)/$', eliminar_relacion),
+                       url(r'^adm_proyectos/gestionar/(?P<id_proyecto>\d+)/matriz/csv/$', exportar_matriz),
+                       url(r'^adm_proyectos/gestionar/(?P<id_proyecto>\d+)/matriz/(?P<formato>csv|xlsx)/generar/$', generar_matriz),
+                       url(r'^adm_proyectos/gestionar/(?P<id_proyecto>\d+)/grafo/(?P<formato>dot|svg)/$', dibujar_relaciones),
+                       url(r'^adm_proyectos/gestionar/(?P<id_proyecto>\d+)/importar_relaciones/$', importar_relaciones),
+                       url(r'^adm_proyectos/impacto/estadisticas/$', estadisticas_impacto),
                        )
\ No newline at end of file
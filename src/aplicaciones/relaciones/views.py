@@ -1,21 +1,84 @@
 from django.shortcuts import render
 from django.views.generic import TemplateView
+from django.views.decorators.http import require_POST
 from django.core.urlresolvers import reverse
 from django.shortcuts import render_to_response, render
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, HttpResponse, StreamingHttpResponse
 from django.template.context import RequestContext
 from aplicaciones.proyectos.models import Proyectos
-from aplicaciones.fases.models import Fases
+from aplicaciones.fases.models import Fases, incrementar_versiones_fase
 from aplicaciones.tipoitem.models import TipoItem
 from aplicaciones.tipoatributo.models import TipoAtributo, Numerico, Fecha, Texto, ArchivoExterno, Logico
-from aplicaciones.items.models import Items, ListaValores, ValorItem
+from aplicaciones.items.models import Items, ValorItem
 from datetime import datetime
 from django.contrib.auth.decorators import login_required, permission_required
 from django.db.models import Q
+from django.db import transaction
+from django.utils import timezone
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from aplicaciones.tipoitem.views import ordenar_mantener
-from .models import Relaciones, ListaRelaciones
+from .models import Relaciones, RelacionListada, relaciones_modificadas
+from .grafo import grafo_proyecto, registrar_arista, invalidar_grafo
+from .clausura import agregar_clausura, quitar_clausura, extremos
+from .matriz import matriz_csv, xlsxwriter
+from .dibujo import dot_proyecto, svg_proyecto
+from .importacion import leer_aristas, importar_aristas
+from .impacto import calcular_impacto, estadisticas
+from aplicaciones.trabajos.ejecucion import encolar
+import json
+
+RELACIONES_POR_PAGINA = 20
+TIPOS_RELACION = ('Padre', 'Hijo', 'Antecesor', 'Sucesor')
+
+#Por cada rol del item relacionado: columna del item actual, columna de su fase y columna del item relacionado
+EXTREMOS_RELACION = {
+    'Sucesor': ('antecesor_id', 'faseprimera', 'sucesor_id'),
+    'Antecesor': ('sucesor_id', 'fasesegunda', 'antecesor_id'),
+    'Hijo': ('padre_id', 'faseprimera', 'hijo_id'),
+    'Padre': ('hijo_id', 'fasesegunda', 'padre_id'),
+}
+
+def relaciones_item(id_proyecto, id_fase, id_item, tipo='', nombres=True):
+    
+    """ Obtiene las relaciones activas de un item en una sola consulta que combina con OR los cuatro
+    extremos posibles de la relacion, y resuelve los nombres de los items relacionados con un unico
+    in_bulk. No guarda filas, devuelve proyecciones en memoria.
+    
+    @type id_fase: entero.
+    @param id_fase: Fase del item actual.
+    
+    @type tipo: string.
+    @param tipo: Rol del item relacionado (Padre, Hijo, Antecesor o Sucesor), vacio para todos.
+    
+    @type nombres: booleano.
+    @param nombres: Si es falso no se consultan los nombres de los items relacionados.
+    
+    @rtype: lista de RelacionListada.
+    @return: Las relaciones del item ordenadas por id.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    id_item = int(id_item)
+    id_fase = int(id_fase)
+    extremos = [(tipo, EXTREMOS_RELACION[tipo])] if tipo else [(rol, EXTREMOS_RELACION[rol]) for rol in TIPOS_RELACION]
+    condicion = Q()
+    for rol, (campo_item, campo_fase, campo_relacionado) in extremos:
+        condicion |= Q(**{campo_item: id_item, campo_fase: id_fase})
+    filas = Relaciones.activas.filter(condicion, proyecto=id_proyecto).order_by('id')
+    lista_relaciones = []
+    for relacion in filas:
+        for rol, (campo_item, campo_fase, campo_relacionado) in extremos:
+            if getattr(relacion, campo_item)==id_item and getattr(relacion, campo_fase)==id_fase:
+                lista_relaciones.append(RelacionListada(relacion.id, getattr(relacion, campo_relacionado), None, rol))
+    if nombres:
+        items_relacionados = Items.objects.only('id', 'nombre').in_bulk(set(relacion.itemrelacionado for relacion in lista_relaciones))
+        for relacion in lista_relaciones:
+            if relacion.itemrelacionado in items_relacionados:
+                relacion.nombreitemrelacionado = items_relacionados[relacion.itemrelacionado].nombre
+    return lista_relaciones
 
-# Create your views here.
 def adm_relaciones(request, id_proyecto, id_fase, id_item):
     
     """ Recibe un request, se verifica cual es el usuario registrado y el proyecto del cual se solicita,
@@ -40,82 +103,123 @@ def adm_relaciones(request, id_proyecto, id_fase, id_item):
         ctx = {'mensaje': mensaje, 'id_proyecto':id_proyecto, 'id_fase': id_fase}
         template_name = './items/itemalerta.html'
         return render_to_response(template_name, ctx, context_instance=RequestContext(request))
-    rantecesor = Relaciones.objects.filter(proyecto=id_proyecto, faseprimera=id_fase, antecesor_id=id_item, is_active=True)
-    rpadre = Relaciones.objects.filter(proyecto=id_proyecto, faseprimera=id_fase, padre_id=id_item, is_active=True)
-    rsucesor = Relaciones.objects.filter(proyecto=id_proyecto, fasesegunda=id_fase, sucesor_id=id_item, is_active=True)
-    rhijo = Relaciones.objects.filter(proyecto=id_proyecto, fasesegunda=id_fase, hijo_id=id_item, is_active=True)
-    lista_relaciones = []
-    
-    for antecesor in rantecesor:
-        valor = ListaRelaciones()
-        valor.itemrelacionado = antecesor.sucesor_id
-        valor.tiporelacion = 'Sucesor'
-        itemrelacionado = Items.objects.get(id=valor.itemrelacionado)
-        valor.nombreitemrelacionado = itemrelacionado.nombre
-        valor.save()
-        lista_relaciones.append(valor)
-    for sucesor in rsucesor:
-        valor = ListaRelaciones()
-        valor.itemrelacionado = sucesor.antecesor_id
-        valor.tiporelacion = 'Antecesor'
-        itemrelacionado = Items.objects.get(id=valor.itemrelacionado)
-        valor.nombreitemrelacionado = itemrelacionado.nombre
-        valor.save()
-        lista_relaciones.append(valor)
-    for padre in rpadre:
-        valor = ListaRelaciones()
-        valor.itemrelacionado = padre.hijo_id
-        valor.tiporelacion = 'Hijo'
-        itemrelacionado = Items.objects.get(id=valor.itemrelacionado)
-        valor.nombreitemrelacionado = itemrelacionado.nombre
-        valor.save()
-        lista_relaciones.append(valor)
-    for hijo in rhijo:
-        valor = ListaRelaciones()
-        valor.itemrelacionado = hijo.padre_id
-        valor.tiporelacion = 'Padre'
-        itemrelacionado = Items.objects.get(id=valor.itemrelacionado)
-        valor.nombreitemrelacionado = itemrelacionado.nombre
-        valor.save()
-        lista_relaciones.append(valor)
-
-    ctx = {'lista_relaciones': lista_relaciones, 'id_proyecto':id_proyecto, 'id_fase': id_fase, 'id_item': id_item}
+    tipo = request.GET.get('tipo', '')
+    if tipo not in EXTREMOS_RELACION:
+        tipo = ''
+    lista_relaciones = relaciones_item(id_proyecto, id_fase, id_item, tipo)
+    paginator = Paginator(lista_relaciones, RELACIONES_POR_PAGINA)
+    try:
+        pagina = paginator.page(request.GET.get('pagina', 1))
+    except PageNotAnInteger:
+        pagina = paginator.page(1)
+    except EmptyPage:
+        pagina = paginator.page(paginator.num_pages)
+
+    ctx = {'lista_relaciones': pagina.object_list, 'pagina': pagina, 'tipo': tipo, 'tipos': TIPOS_RELACION,
+           'id_proyecto':id_proyecto, 'id_fase': id_fase, 'id_item': int(id_item)}
     template_name = './relaciones/relaciones.html'
     return render_to_response(template_name, ctx, context_instance=RequestContext(request))
 
-def listar_items(request, id_proyecto, id_fase, id_item):
-    proyecto = Proyectos.objects.get(id=id_proyecto)
-    fase = Fases.objects.get(id=id_fase)
-    item = Items.objects.get(id=id_item)
+#Anti-join: descarta los items que ya tienen una relacion activa con el item actual en cualquier sentido
+NO_RELACIONADO = """NOT EXISTS (SELECT 1 FROM relaciones_relaciones r WHERE r.proyecto = %s AND r.is_active = true AND (
+    (r.padre_id = %s AND r.hijo_id = items_items.id) OR (r.hijo_id = %s AND r.padre_id = items_items.id) OR
+    (r.antecesor_id = %s AND r.sucesor_id = items_items.id) OR (r.sucesor_id = %s AND r.antecesor_id = items_items.id)))"""
 
-    itemstodos = Items.objects.filter(proyecto_id=id_proyecto, fase_id=id_fase, is_active=True)
-    rantecesor = Relaciones.objects.filter(proyecto=id_proyecto, faseprimera=id_fase, antecesor_id=id_item, is_active=True)
-    rpadre = Relaciones.objects.filter(proyecto=id_proyecto, faseprimera=id_fase, padre_id=id_item, is_active=True)
-    rsucesor = Relaciones.objects.filter(proyecto=id_proyecto, fasesegunda=id_fase, sucesor_id=id_item, is_active=True)
-    rhijo = Relaciones.objects.filter(proyecto=id_proyecto, fasesegunda=id_fase, hijo_id=id_item, is_active=True)
-    lista_items = []
-
-    for itemtodo in itemstodos:
-        relacionado='Vacio'
-        for antecesor in rantecesor:
-            if antecesor.sucesor_id==itemtodo.id:
-                relacionado = 'Si'
-        for sucesor in rsucesor:
-            if sucesor.antecesor_id==itemtodo.id:
-                relacionado = 'Si'
-        for padre in rpadre:
-            if padre.hijo_id==itemtodo.id:
-                relacionado = 'Si'
-        for hijo in rhijo:
-            if hijo.padre_id==itemtodo.id:
-                relacionado = 'Si'
-        
-        if itemtodo.id==int(id_item):
-            relacionado = 'No'
-        if relacionado=='Vacio': 
-            lista_items.append(itemtodo)
+def fase_anterior(id_proyecto, id_fase):
+    
+    """ Obtiene la fase activa del proyecto creada inmediatamente antes de la fase indicada.
+    
+    @type id_fase: entero.
+    @param id_fase: Fase a partir de la cual se busca la anterior.
+    
+    @rtype: entero o None.
+    @return: El id de la fase anterior, o None si la fase es la primera.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    anterior = Fases.objects.filter(proyecto_id=id_proyecto, is_active=True, id__lt=id_fase).order_by('-id').values_list('id', flat=True)[:1]
+    return anterior[0] if anterior else None
+
+def candidatos_relacion(id_proyecto, id_fase, id_item, busqueda=''):
+    
+    """ Construye la consulta de los items que se pueden relacionar con el item actual: los de su fase,
+    como padres o hijos, y los de la fase anterior, como antecesores. Excluye al propio item y a los
+    que ya estan relacionados con el mediante un anti-join resuelto en la base de datos.
+    
+    @type busqueda: string.
+    @param busqueda: Texto que debe contener el nombre de los items, vacio para no filtrar.
+    
+    @rtype: tupla.
+    @return: La consulta de los items candidatos y el id de la fase anterior (o None).
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    id_item = int(id_item)
+    anterior = fase_anterior(id_proyecto, id_fase)
+    fases = [int(id_fase)] if anterior is None else [int(id_fase), anterior]
+    candidatos = Items.objects.filter(proyecto_id=id_proyecto, fase_id__in=fases, is_active=True).exclude(id=id_item)
+    if busqueda:
+        candidatos = candidatos.filter(nombre__icontains=busqueda)
+    candidatos = candidatos.extra(where=[NO_RELACIONADO], params=[int(id_proyecto), id_item, id_item, id_item, id_item])
+    return candidatos.order_by('-fase', 'nombre', 'id'), anterior
+
+def tipos_relacion(id_proyecto, item, itemrelacionado):
+    
+    """ Indica los roles que puede tener el item seleccionado respecto al item actual: padre o hijo si
+    estan en la misma fase, antecesor si esta en la fase anterior y sucesor si esta en la siguiente.
+    
+    @type item: Items.
+    @param item: Item actual.
     
-    ctx = {'lista_items': lista_items, 'id_proyecto': id_proyecto, 'id_fase': id_fase, 'id_item': id_item}
+    @type itemrelacionado: Items.
+    @param itemrelacionado: Item seleccionado para relacionar con el item actual.
+    
+    @rtype: tupla.
+    @return: Los tipos de relacion permitidos.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    if item.fase_id==itemrelacionado.fase_id:
+        return ('Padre', 'Hijo')
+    if fase_anterior(id_proyecto, item.fase_id)==itemrelacionado.fase_id:
+        return ('Antecesor',)
+    if fase_anterior(id_proyecto, itemrelacionado.fase_id)==item.fase_id:
+        return ('Sucesor',)
+    return ()
+
+def listar_items(request, id_proyecto, id_fase, id_item):
+    
+    """ Recibe un request y el item actual y lista, paginados, los items con los que se puede crear
+    una nueva relacion. Permite buscar por nombre.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene en GET la busqueda y la pagina solicitada.
+    
+    @rtype: django.shortcuts.render_to_response.
+    @return: relacionnueva.html, donde se listan los items candidatos.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    busqueda = request.GET.get('busqueda', '').strip()
+    candidatos, anterior = candidatos_relacion(id_proyecto, id_fase, id_item, busqueda)
+    paginator = Paginator(candidatos, RELACIONES_POR_PAGINA)
+    try:
+        pagina = paginator.page(request.GET.get('pagina', 1))
+    except PageNotAnInteger:
+        pagina = paginator.page(1)
+    except EmptyPage:
+        pagina = paginator.page(paginator.num_pages)
+    
+    ctx = {'lista_items': pagina.object_list, 'pagina': pagina, 'query': busqueda, 'fase_anterior': anterior,
+           'id_proyecto': id_proyecto, 'id_fase': id_fase, 'id_item': id_item}
     template_name = './relaciones/relacionnueva.html'
     return render_to_response(template_name, ctx, context_instance=RequestContext(request))
 
@@ -126,23 +230,20 @@ def crear_relacion(request, id_proyecto, id_fase, id_item, id_importar):
     itemrelacionado = Items.objects.get(id=id_importar) 
     
     if request.method=='POST':
-        relacioncreada = Relaciones()
-        if (request.POST.get('tiporelacion', ''))=='Padre':
-            relacioncreada.padre_id = id_importar
-            relacioncreada.faseprimera = itemrelacionado.fase_id
-            relacioncreada.hijo_id = id_item
-            relacioncreada.fasesegunda = item.fase_id
-            relacioncreada.is_active = True
-            relacioncreada.proyecto = id_proyecto
-        if (request.POST.get('tiporelacion', ''))=='Hijo':
-            relacioncreada.hijo_id = id_importar
-            relacioncreada.fasesegunda = itemrelacionado.fase_id
-            relacioncreada.padre_id = id_item
-            relacioncreada.faseprimera = item.fase_id
-            relacioncreada.is_active = True
-            relacioncreada.proyecto = id_proyecto
-        relacioncreada.save()
-        mensaje = 'La relacion ha sido creada con exito.'
+        try:
+            with transaction.atomic():
+                #Las relaciones de un proyecto se crean de a una para que la verificacion de ciclos sea valida
+                Proyectos.objects.select_for_update().get(id=id_proyecto)
+                relacion, camino = guardar_relacion(request, id_proyecto, item, itemrelacionado)
+            if relacion is not None:
+                relaciones_modificadas.send(sender=Relaciones, id_proyecto=id_proyecto, aristas=[extremos(relacion)[:2]])
+            if camino:
+                nombres = Items.objects.in_bulk(camino)
+                mensaje = 'No se puede crear la relacion porque formaria un ciclo: %s' % ' -> '.join(nombres[id_ciclo].nombre if id_ciclo in nombres else str(id_ciclo) for id_ciclo in camino)
+            else:
+                mensaje = 'La relacion ha sido creada con exito.'
+        except ValueError as error:
+            mensaje = 'No se puede crear la relacion: %s' % error
         id_item = int(id_item)
         
         ctx = {'mensaje': mensaje, 'id_proyecto': id_proyecto, 'id_fase': id_fase, 'id_item': id_item}
@@ -150,7 +251,248 @@ def crear_relacion(request, id_proyecto, id_fase, id_item, id_importar):
         return render_to_response(template_name, ctx, context_instance=RequestContext(request))
     else:
         mensaje = 'El item seleccionado sera (seleccione opcion) del item actual: '
-        ctx = {'mensaje': mensaje, 'id_proyecto': id_proyecto, 'id_fase': id_fase, 'id_item': id_item, 'id_importar': id_importar}
+        ctx = {'mensaje': mensaje, 'tipos': tipos_relacion(id_proyecto, item, itemrelacionado), 'id_proyecto': id_proyecto, 'id_fase': id_fase, 'id_item': id_item, 'id_importar': id_importar}
     template_name = './relaciones/tiporelacion.html'
     return render_to_response(template_name, ctx, context_instance=RequestContext(request))
-    
\ No newline at end of file
+
+def guardar_relacion(request, id_proyecto, item, itemrelacionado):
+    
+    """ Crea la relacion del tipo indicado en el request entre el item actual y el item seleccionado,
+    salvo que forme un ciclo en el grafo de trazabilidad del proyecto. Debe llamarse dentro de una
+    transaccion que bloquee el proyecto.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene en POST el tipo de relacion que tendra el item seleccionado.
+    
+    @type item: Items.
+    @param item: Item actual.
+    
+    @type itemrelacionado: Items.
+    @param itemrelacionado: Item seleccionado para relacionar con el item actual.
+    
+    @rtype: tupla.
+    @return: La relacion creada y None, o None y los ids del ciclo que formaria.
+    
+    @raise ValueError: Si falta el tipo de relacion o no es uno de los permitidos entre los dos items.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    tiporelacion = request.POST.get('tiporelacion', '')
+    if tiporelacion not in tipos_relacion(id_proyecto, item, itemrelacionado):
+        raise ValueError('el tipo de relacion seleccionado no es valido para estos items.')
+    campo_item, campo_fase, campo_relacionado = EXTREMOS_RELACION[tiporelacion]
+    relacioncreada = Relaciones(proyecto=id_proyecto, is_active=True)
+    setattr(relacioncreada, campo_item, item.id)
+    setattr(relacioncreada, campo_fase, item.fase_id)
+    setattr(relacioncreada, campo_relacionado, itemrelacionado.id)
+    setattr(relacioncreada, 'fasesegunda' if campo_fase=='faseprimera' else 'faseprimera', itemrelacionado.fase_id)
+    if relacioncreada.padre_id is not None:
+        origen, destino = relacioncreada.padre_id, relacioncreada.hijo_id
+    else:
+        origen, destino = relacioncreada.antecesor_id, relacioncreada.sucesor_id
+    camino = grafo_proyecto(id_proyecto).camino_ciclo(origen, destino)
+    if camino:
+        return None, camino
+    relacioncreada.save()
+    agregar_clausura(relacioncreada)
+    registrar_arista(id_proyecto, origen, destino)
+    incrementar_versiones_fase(relacioncreada.fasesegunda)
+    return relacioncreada, None
+
+def eliminar_relacion(request, id_proyecto, id_fase, id_item, id_relacion):
+    
+    """ Recibe un request y la relacion a eliminar, la desactiva y descuenta de la tabla de clausura
+    los caminos que pasaban por ella. El grafo de trazabilidad del proyecto se descarta para que se
+    reconstruya sin la relacion.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista.
+    
+    @type id_relacion: string.
+    @param id_relacion: Contiene el id de la relacion a eliminar.
+    
+    @rtype: django.shortcuts.render_to_response.
+    @return: relacionalerta.html, donde se notifica el resultado.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    with transaction.atomic():
+        Proyectos.objects.select_for_update().get(id=id_proyecto)
+        relaciones = Relaciones.activas.filter(id=id_relacion, proyecto=id_proyecto)
+        relacion = relaciones.first()
+        if relacion is not None:
+            relaciones.update(is_active=False, fecha_baja=timezone.now())
+            quitar_clausura(relacion)
+            invalidar_grafo(id_proyecto)
+            incrementar_versiones_fase(relacion.fasesegunda)
+    if relacion is None:
+        mensaje = 'La relacion ya no existe.'
+    else:
+        extremo = extremos(relacion)
+        if extremo is not None:
+            relaciones_modificadas.send(sender=Relaciones, id_proyecto=id_proyecto, aristas=[extremo[:2]])
+        mensaje = 'La relacion ha sido eliminada con exito.'
+    ctx = {'mensaje': mensaje, 'id_proyecto': id_proyecto, 'id_fase': id_fase, 'id_item': int(id_item)}
+    template_name = './relaciones/relacionalerta.html'
+    return render_to_response(template_name, ctx, context_instance=RequestContext(request))
+
+def impacto_item(request, id_proyecto, id_fase, id_item):
+    
+    """ Recibe un request y un item y despliega el analisis de impacto de modificarlo: los items
+    alcanzables siguiendo sus relaciones hacia hijos y sucesores, y la suma de los costos monetario
+    y temporal del item y de todos ellos. Tambien se listan los items de los que depende. El
+    recorrido se hace sobre el grafo del proyecto en memoria.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista.
+    
+    @rtype: django.shortcuts.render_to_response.
+    @return: impacto.html, donde se despliega el impacto del item.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    item = Items.objects.get(id=id_item)
+    impacto = calcular_impacto(id_proyecto, item.id)
+    ancestros = calcular_impacto(id_proyecto, item.id, adelante=False)['items'][1:]
+    nombres = Items.objects.in_bulk(impacto['items'][1:] + ancestros)
+    ctx = {'item': item, 'impacto': impacto, 'afectados': [nombres[id_afectado] for id_afectado in impacto['items'][1:] if id_afectado in nombres],
+           'ancestros': [nombres[id_ancestro] for id_ancestro in ancestros if id_ancestro in nombres], 'id_proyecto': id_proyecto, 'id_fase': id_fase, 'id_item': id_item}
+    template_name = './relaciones/impacto.html'
+    return render_to_response(template_name, ctx, context_instance=RequestContext(request))
+
+def exportar_matriz(request, id_proyecto):
+    
+    """ Recibe un request y un proyecto y descarga su matriz de trazabilidad en CSV: cada item con su fase,
+    estado y version y los ids de sus padres, hijos, antecesores y sucesores. La respuesta se genera
+    a medida que se envia, sin cargar el proyecto completo en memoria. El XLSX se genera en segundo plano
+    con generar_matriz.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista.
+    
+    @rtype: django.http.StreamingHttpResponse.
+    @return: El archivo CSV de la matriz.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    proyecto = Proyectos.objects.get(id=id_proyecto)
+    response = StreamingHttpResponse(matriz_csv(proyecto.id), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="trazabilidad_proyecto_%s.csv"' % proyecto.id
+    return response
+
+@login_required(login_url='/login/')
+@require_POST
+def generar_matriz(request, id_proyecto, formato):
+    
+    """ Recibe un request y un proyecto y encola la generacion de su matriz de trazabilidad, que se descarga
+    desde la pagina del trabajo cuando termina. A diferencia de exportar_matriz no ocupa la solicitud web
+    mientras se genera el archivo, y es la unica forma de obtener el XLSX, que debe escribirse completo antes de enviarse.
+    Solo acepta POST, para que recargar la pagina o seguir un enlace no encole otro trabajo.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista.
+    
+    @type formato: string.
+    @param formato: csv o xlsx.
+    
+    @rtype: django.http.HttpResponseRedirect.
+    @return: Redireccion a la pagina del trabajo, donde se muestra su avance, o fasealerta.html si no esta disponible el formato XLSX.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    proyecto = Proyectos.objects.get(id=id_proyecto)
+    if formato=='xlsx' and xlsxwriter is None:
+        mensaje = 'La exportacion a XLSX requiere el paquete xlsxwriter. Utilice la exportacion a CSV.'
+        ctx = {'mensaje': mensaje, 'id_proyecto': id_proyecto}
+        return render_to_response('./Fases/fasealerta.html', ctx, context_instance=RequestContext(request))
+    parametros = {'id_proyecto':proyecto.id, 'formato':formato}
+    trabajo = encolar('aplicaciones.relaciones.tareas.exportar_matriz', parametros, 'Matriz de trazabilidad de %s (%s)' % (proyecto.nombre, formato.upper()), request.user)
+    return HttpResponseRedirect('/trabajos/%s/' % trabajo.id)
+
+def dibujar_relaciones(request, id_proyecto, formato):
+    
+    """ Recibe un request y un proyecto y devuelve el grafo de relaciones de sus items agrupado por
+    fases y coloreado por estado, en formato DOT o, si Graphviz esta instalado, en SVG.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista.
+    
+    @type formato: string.
+    @param formato: dot o svg.
+    
+    @rtype: django.http.HttpResponse.
+    @return: El grafo, o fasealerta.html si no se puede generar el SVG.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    proyecto = Proyectos.objects.get(id=id_proyecto)
+    if formato=='svg':
+        svg = svg_proyecto(proyecto.id)
+        if svg is None:
+            mensaje = 'Graphviz no esta instalado en el servidor. Descargue el grafo en formato DOT.'
+            ctx = {'mensaje': mensaje, 'id_proyecto': id_proyecto}
+            return render_to_response('./Fases/fasealerta.html', ctx, context_instance=RequestContext(request))
+        return HttpResponse(svg, content_type='image/svg+xml')
+    return HttpResponse(dot_proyecto(proyecto.id), content_type='text/vnd.graphviz; charset=utf-8')
+
+def importar_relaciones(request, id_proyecto):
+    
+    """ Recibe un request y un proyecto y crea en bloque las relaciones de un archivo CSV o JSON. Todas las
+    filas se validan antes de guardar las validas en una sola transaccion, y se informan los errores de
+    cada fila rechazada.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene en FILES el archivo y en POST su formato y si solo se debe verificar.
+    
+    @rtype: django.shortcuts.render_to_response.
+    @return: importarrelaciones.html, con el formulario y el resultado de la importacion.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    proyecto = Proyectos.objects.get(id=id_proyecto)
+    ctx = {'id_proyecto': id_proyecto}
+    if request.method=='POST':
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            ctx['mensaje'] = 'Seleccione un archivo.'
+        else:
+            try:
+                filas = leer_aristas(archivo, request.POST.get('formato', 'csv'))
+            except ValueError as error:
+                ctx['mensaje'] = 'No se pudo leer el archivo: %s' % error
+            else:
+                verificar = bool(request.POST.get('verificar'))
+                creadas, errores = importar_aristas(proyecto.id, filas, verificar)
+                ctx.update({'resultado': True, 'creadas': creadas, 'errores': errores, 'verificar': verificar})
+    template_name = './relaciones/importarrelaciones.html'
+    return render_to_response(template_name, ctx, context_instance=RequestContext(request))
+
+def estadisticas_impacto(request):
+    
+    """ Devuelve en JSON los contadores de aciertos y fallos de la cache del analisis de impacto.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista.
+    
+    @rtype: django.http.HttpResponse.
+    @return: aciertos, fallos y proporcion de aciertos.
+    
+    @author: Romina Diaz de Bedoya.
+    
+    """
+    
+    return HttpResponse(json.dumps(estadisticas()), content_type='application/json')
@@ -2,7 +2,9 @@ from django.db import models
 
 # Create your models here.
 from aplicaciones.fases.models import Fases
+from aplicaciones.proyectos.models import invalidar_proyectos_visibles
 from django.contrib.auth.models import Group
+from django.db.models.signals import post_save, pre_delete
 
 class Roles(Group):
     """ La clase Roles crea un perfil a cada instancia de la clase
@@ -35,3 +37,12 @@ class Roles(Group):
         return u'%s' % (self.name)
     
     
+
+def rol_modificado(sender, instance, **kwargs):
+    
+    """ Al cambiar el proyecto de un rol o eliminarlo cambian los proyectos visibles de sus usuarios. """
+    
+    invalidar_proyectos_visibles(list(instance.user_set.values_list('id', flat=True)))
+
+post_save.connect(rol_modificado, sender=Roles)
+pre_delete.connect(rol_modificado, sender=Roles)
@@ -0,0 +1,2 @@
+-- Indice de los valores por item. Se crea al crear la tabla con syncdb; en bases existentes ejecutar "python manage.py crear_indices"
+CREATE INDEX IF NOT EXISTS tipoatributo_numerico_id_item ON tipoatributo_numerico (id_item);
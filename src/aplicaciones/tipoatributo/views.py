@@ -5,6 +5,7 @@ from django.template import RequestContext
 from forms import TipoAtributoForm, TipoAtributoModificadoForm
 from aplicaciones.proyectos.models import Proyectos
 from aplicaciones.tipoitem.models import TipoItem
+from aplicaciones.tipoitem.views import invalidar_esquemas_atributo
 from django.contrib.auth.decorators import login_required, permission_required
 from django.db.models import Q
 
@@ -178,6 +179,7 @@ def modificarTipoAtributo(request, id_proyecto, id_tipo_atributo):
                     tipo_atributo.obligatorio = True 
                 tipo_atributo.descripcion = descripcion
                 tipo_atributo.save()
+                invalidar_esquemas_atributo(tipo_atributo.id)
                 
                 
                         
@@ -1,4 +1,5 @@
 from django.db import models
+from collections import namedtuple
 from aplicaciones.tipoatributo.models import TipoAtributo
 
 class ListaAtributo (models.Model):
@@ -48,4 +49,18 @@ class TipoItem (models.Model):
         return self.nombre
     
     class Meta:
-        ordering = ["nombre"]
\ No newline at end of file
+        ordering = ["nombre"]
+
+class AtributoEsquema(namedtuple('AtributoEsquema', 'id id_atributo nombre orden tipo precision longitud obligatorio')):
+    
+    """ Descripcion inmutable de un atributo dentro del esquema compilado de un tipo de item.
+    id: id del ListaAtributo.
+    id_atributo: id del TipoAtributo.
+    nombre: nombre del atributo en el tipo de item.
+    orden: posicion del atributo en el tipo de item, a partir de 1.
+    tipo, precision, longitud, obligatorio: copia de los campos del TipoAtributo.
+    
+    @author: Juana Maldonado
+    """
+    
+    __slots__ = ()
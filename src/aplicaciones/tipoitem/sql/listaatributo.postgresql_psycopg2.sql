@@ -0,0 +1,3 @@
+-- Indices de ListaAtributo. Se crean al crear la tabla con syncdb; en bases existentes ejecutar "python manage.py crear_indices"
+-- Atributos activos de un tipo de item en orden
+CREATE INDEX IF NOT EXISTS tipoitem_listaatributo_tipoitem ON tipoitem_listaatributo (id_tipoitem, orden) WHERE is_active = true;
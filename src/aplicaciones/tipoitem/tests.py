@@ -1,8 +1,9 @@
 from django.test import TestCase
 from django.test.client import RequestFactory
-from .views import adm_tipoitem, crear_tipoitem, listar_proyectos, listar_tipoitem, importar_tipoitem, eliminar_tipoitem, modificar_tipoitem, consultar_tipoitem, gestionar_tipoitem, agregar_tipo_atributo, quitar_tipo_atributo, subir_tipo_atributo, bajar_tipo_atributo, ordenar_mantener
+from .views import adm_tipoitem, crear_tipoitem, listar_proyectos, listar_tipoitem, importar_tipoitem, eliminar_tipoitem, modificar_tipoitem, consultar_tipoitem, gestionar_tipoitem, agregar_tipo_atributo, quitar_tipo_atributo, subir_tipo_atributo, bajar_tipo_atributo, ordenar_mantener, esquema_tipoitem
 from .models import TipoItem, ListaAtributo
 from django.contrib.auth.models import User
+from django.core.cache import cache
 
 class test_tipoitem (TestCase):
     
@@ -13,6 +14,7 @@ class test_tipoitem (TestCase):
             un request para utilizarlo en las vistas.
         """
         self.factory = RequestFactory()
+        cache.clear()
         
     def test_adm_tipoitem(self):
        
@@ -126,6 +128,23 @@ class test_tipoitem (TestCase):
         self.assertTrue(lista)
         print 'Test de la funcion ordenar_mantener ejecutado correctamente'
         
+    def test_esquema_tipoitem(self):
+        
+        id_tipoitem = 1
+        esquema = esquema_tipoitem(id_tipoitem)
+        self.assertTrue(esquema)
+        self.assertEqual([atributo.orden for atributo in esquema], range(1, len(esquema) + 1))
+        #Solo se lee la cache
+        with self.assertNumQueries(1):
+            self.assertEqual(esquema_tipoitem(id_tipoitem), esquema)
+        
+        self.user = User.objects.get(pk=2)
+        request = self.factory.get('/adm_proyectos/gestionar/1/adm_tipos_item/gestionar_tipoitem/1/quitar_tipo_atributo/%s/' % esquema[0].id)
+        request.user = self.user
+        quitar_tipo_atributo(request, id_tipoitem, 1, esquema[0].id)
+        self.assertEqual(esquema_tipoitem(id_tipoitem), tuple(atributo._replace(orden=atributo.orden - 1) for atributo in esquema[1:]))
+        print 'Test de la funcion esquema_tipoitem ejecutado correctamente'
+        
     def test_quitar_tipo_atributo(self):
         
         self.user = User.objects.get(pk=2)
@@ -1,6 +1,7 @@
 from django.shortcuts import render_to_response, render, HttpResponseRedirect
 from django.template import RequestContext
-from .models import TipoItem, ListaAtributo
+from .models import TipoItem, ListaAtributo, AtributoEsquema
+from django.core.cache import cache
 from .forms import TipoItemNuevoForm, TipoItemModificadoForm
 from django.db.models import Q
 from aplicaciones.tipoatributo.models import TipoAtributo
@@ -143,6 +144,7 @@ def modificar_tipoitem (request, id_tipoitem, id_proyecto):
                     tipoitem.nombre=nombre
                     tipoitem.descripcion=descripcion
                     tipoitem.save()
+                    invalidar_esquema(id_tipoitem)
                         
                     mensaje="Tipo de Item modificado exitosamente"
                     
@@ -192,6 +194,7 @@ def eliminar_tipoitem (request, id_tipoitem, id_proyecto):
         
     tipoitem.is_active = False
     tipoitem.save()
+    invalidar_esquema(id_tipoitem)
     return HttpResponseRedirect('/adm_proyectos/gestionar/%s/adm_tipos_item/' % id_proyecto)
 
 @login_required(login_url='/login/')
@@ -219,10 +222,11 @@ def consultar_tipoitem (request, id_tipoitem, id_proyecto):
     
     tipoitem = TipoItem.objects.get(id=id_tipoitem)
     
-    elementos_existentes = ordenar_mantener (id_tipoitem)
+    esquema = esquema_tipoitem(id_tipoitem)
+    tipos = TipoAtributo.objects.in_bulk([atributo.id_atributo for atributo in esquema])
     consulta = []
-    for elemento in elementos_existentes:
-        tupla = (elemento.nombre, TipoAtributo.objects.get(id=elemento.id_atributo).descripcion)
+    for atributo in esquema:
+        tupla = (atributo.nombre, tipos[atributo.id_atributo].descripcion)
         consulta.append(tupla)
         
     ctx = {'tipoitem':tipoitem, 'atributos':consulta, 'id_proyecto':id_proyecto}
@@ -300,6 +304,7 @@ def agregar_tipo_atributo (request, id_tipoitem, id_proyecto, id_tipoatributo):
     
     tipoitem = TipoItem.objects.get(id=id_tipoitem)
     tipoitem.listaAtributo.add(lista_atributo)
+    invalidar_esquema(id_tipoitem)
     
     return HttpResponseRedirect('/adm_proyectos/gestionar/%s/adm_tipos_item/gestionar_tipoitem/%s/' % (id_proyecto, id_tipoitem))
 
@@ -330,6 +335,7 @@ def quitar_tipo_atributo (request, id_tipoitem, id_proyecto, id_tipoatributo):
     tipo_atributo.orden = 0
     tipo_atributo.save()
     elementos_existentes = ordenar_mantener(id_tipoitem)
+    invalidar_esquema(id_tipoitem)
     return HttpResponseRedirect('/adm_proyectos/gestionar/%s/adm_tipos_item/gestionar_tipoitem/%s/' % (id_proyecto, id_tipoitem))
 
 
@@ -358,6 +364,67 @@ def ordenar_mantener (id_tipoitem):
     return elementos_existentes
 
 
+""" Tiempo en segundos que un esquema compilado permanece en cache. La cache es compartida por todos los
+procesos (ver CACHES en settings), por lo que invalidar_esquema lo descarta para todos; la duracion solo
+acota cuanto dura un esquema guardado por una lectura concurrente con la modificacion """
+DURACION_ESQUEMA = 300
+
+def clave_esquema(id_tipoitem):
+    return 'tipoitem:esquema:%s' % id_tipoitem
+
+def esquema_tipoitem (id_tipoitem):
+    
+    """ Recibe un id de tipo de item y devuelve su esquema compilado: la lista ordenada de sus tipos de atributo
+    con los datos necesarios para cargar y validar valores. El esquema se arma con dos consultas y se guarda en
+    cache hasta que se modifique el tipo de item, por lo que a diferencia de ordenar_mantener nunca escribe en
+    la base de datos.
+    
+    @type id_tipoitem: string.
+    @param id_tipoitem: Contiene el id del tipo de item cuyo esquema se desea obtener.
+    
+    @rtype: tupla.
+    @return: tupla de objetos AtributoEsquema ordenados por el campo orden.
+    
+    @author: Juana Maldonado.
+    
+    """
+    
+    esquema = cache.get(clave_esquema(id_tipoitem))
+    if esquema is None:
+        elementos = list(ListaAtributo.objects.filter(id_tipoitem=id_tipoitem, is_active=True).exclude(orden='0').order_by('orden', 'id'))
+        tipos = TipoAtributo.objects.in_bulk([elemento.id_atributo for elemento in elementos])
+        esquema = []
+        for elemento in elementos:
+            tipo = tipos.get(elemento.id_atributo)
+            if tipo:
+                esquema.append(AtributoEsquema(elemento.id, elemento.id_atributo, elemento.nombre, len(esquema) + 1,
+                                               tipo.tipo, tipo.precision, tipo.longitud, tipo.obligatorio))
+        esquema = tuple(esquema)
+        cache.set(clave_esquema(id_tipoitem), esquema, DURACION_ESQUEMA)
+    return esquema
+
+def invalidar_esquema (*ids_tipoitem):
+    
+    """ Descarta de la cache el esquema compilado de los tipos de item recibidos. Debe llamarse cada vez que se
+    modifican los tipos de atributo de un tipo de item.
+    
+    @author: Juana Maldonado.
+    
+    """
+    
+    cache.delete_many([clave_esquema(id_tipoitem) for id_tipoitem in ids_tipoitem])
+
+def invalidar_esquemas_atributo (id_tipoatributo):
+    
+    """ Descarta de la cache el esquema de todos los tipos de item que usan el tipo de atributo recibido, cuando
+    se modifican sus datos (tipo, precision, longitud u obligatoriedad).
+    
+    @author: Juana Maldonado.
+    
+    """
+    
+    invalidar_esquema(*set(ListaAtributo.objects.filter(id_atributo=id_tipoatributo).values_list('id_tipoitem', flat=True)))
+
 def subir_tipo_atributo (request, id_tipoitem, id_proyecto, id_tipoatributo):
     
     """ Recibe un request, el id de proyecto, el id del tipo de item y el id del tipo de atributo a subir un nivel
@@ -387,6 +454,7 @@ def subir_tipo_atributo (request, id_tipoitem, id_proyecto, id_tipoatributo):
         atributo_a_subir.orden = orden
         atributo_a_bajar.save()
         atributo_a_subir.save()
+        invalidar_esquema(id_tipoitem)
         
     return HttpResponseRedirect('/adm_proyectos/gestionar/%s/adm_tipos_item/gestionar_tipoitem/%s/' % (id_proyecto, id_tipoitem))
 
@@ -421,6 +489,7 @@ def bajar_tipo_atributo (request, id_tipoitem, id_proyecto, id_tipoatributo):
         atributo_a_bajar.orden = orden
         atributo_a_subir.save()
         atributo_a_bajar.save()
+        invalidar_esquema(id_tipoitem)
         
     return HttpResponseRedirect('/adm_proyectos/gestionar/%s/adm_tipos_item/gestionar_tipoitem/%s/' % (id_proyecto, id_tipoitem))
 
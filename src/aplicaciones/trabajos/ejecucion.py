@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import time
+from django.db import connection, connections, transaction, DEFAULT_DB_ALIAS
+from django.utils import timezone
+from django.utils.encoding import force_text
+from django.utils.module_loading import import_by_path
+from .models import Trabajo
+
+#Marca como en ejecucion el trabajo pendiente mas antiguo que no este tomando otro proceso
+TOMAR_TRABAJO = """
+    UPDATE trabajos_trabajo SET estado = 'En Ejecucion', fecha_inicio = %s, proceso = %s
+    WHERE id = (SELECT id FROM trabajos_trabajo WHERE estado = 'Pendiente' ORDER BY id LIMIT 1 FOR UPDATE SKIP LOCKED)
+    RETURNING id"""
+
+REGISTRAR_AVANCE = "UPDATE trabajos_trabajo SET progreso = %s, mensaje = %s WHERE id = %s RETURNING cancelar"
+
+logger = logging.getLogger(__name__)
+
+""" Conexion propia de cada proceso para registrar el avance, indexada por pid """
+CONEXIONES_AVANCE = {}
+
+class TrabajoCancelado(Exception):
+
+    """ Se lanza desde avanzar cuando el usuario pidio cancelar el trabajo, para que la tarea se
+    interrumpa y se deshaga su transaccion. """
+
+def encolar(tarea, parametros, nombre, usuario=None):
+
+    """ Agrega un trabajo a la cola para que lo ejecute un proceso de procesar_trabajos.
+
+    @type tarea: string.
+    @param tarea: Ruta de la funcion que ejecuta el trabajo. Recibe el trabajo y los parametros como
+    argumentos con nombre, y devuelve un resultado serializable en JSON o None.
+
+    @type parametros: diccionario.
+    @param parametros: Argumentos de la tarea, serializables en JSON.
+
+    @type nombre: string.
+    @param nombre: Descripcion del trabajo para mostrar al usuario.
+
+    @type usuario: User.
+    @param usuario: Usuario que encola el trabajo.
+
+    @rtype: Trabajo.
+    @return: El trabajo pendiente.
+
+    @author: Juana Maldonado.
+
+    """
+
+    import_by_path(tarea)
+    return Trabajo.objects.create(tarea=tarea, parametros=json.dumps(parametros), nombre=nombre[:100], usuario=usuario)
+
+def conexion_avance():
+    conexion = CONEXIONES_AVANCE.get(os.getpid())
+    if conexion is None:
+        principal = connections[DEFAULT_DB_ALIAS]
+        conexion = principal.__class__(dict(principal.settings_dict), 'avance_trabajos')
+        CONEXIONES_AVANCE[os.getpid()] = conexion
+    return conexion
+
+def cerrar_conexion_avance():
+    conexion = CONEXIONES_AVANCE.pop(os.getpid(), None)
+    if conexion is not None:
+        conexion.close()
+
+def avanzar(trabajo, progreso, mensaje=''):
+
+    """ Registra el avance de un trabajo en ejecucion y comprueba si se pidio cancelarlo. El avance se
+    escribe con una conexion propia, fuera de la transaccion de la tarea, para que se vea mientras la tarea
+    sigue en curso y para no bloquear la fila del trabajo hasta que termine. Por eso el trabajo debe estar
+    confirmado en la base de datos: si la conexion propia no lo encuentra el avance no se registra.
+
+    @type progreso: entero.
+    @param progreso: Porcentaje completado, de 0 a 100.
+
+    @type mensaje: string.
+    @param mensaje: Descripcion del paso en curso.
+
+    @raise TrabajoCancelado: Si el usuario pidio cancelar el trabajo.
+
+    @author: Juana Maldonado.
+
+    """
+
+    parametros = [max(0, min(100, int(progreso))), mensaje[:300], trabajo.id]
+    cursor = conexion_avance().cursor()
+    cursor.execute(REGISTRAR_AVANCE, parametros)
+    fila = cursor.fetchone()
+    trabajo.progreso, trabajo.mensaje = parametros[0], parametros[1]
+    if fila and fila[0]:
+        raise TrabajoCancelado()
+
+def tomar_trabajo():
+
+    """ Toma el trabajo pendiente mas antiguo. Los procesos que consultan la cola al mismo tiempo saltean
+    las filas que esta tomando otro (FOR UPDATE SKIP LOCKED), por lo que cada trabajo se ejecuta una sola vez.
+
+    @rtype: Trabajo.
+    @return: El trabajo tomado, ya en ejecucion, o None si la cola esta vacia.
+
+    @author: Juana Maldonado.
+
+    """
+
+    cursor = connection.cursor()
+    cursor.execute(TOMAR_TRABAJO, [timezone.now(), os.getpid()])
+    fila = cursor.fetchone()
+    if fila is None:
+        return None
+    return Trabajo.objects.get(id=fila[0])
+
+def ejecutar_trabajo(trabajo):
+
+    """ Ejecuta la tarea de un trabajo tomado y guarda su estado final, su resultado y el archivo que haya
+    generado. La tarea se ejecuta en una transaccion, que se deshace si la tarea falla o se cancela. Un error
+    en la tarea deja el trabajo con estado Error y su mensaje, sin detener al proceso. La conexion de avance
+    se cierra al terminar cada trabajo.
+
+    @type trabajo: Trabajo.
+    @param trabajo: Trabajo devuelto por tomar_trabajo.
+
+    @author: Juana Maldonado.
+
+    """
+
+    resultado = None
+    try:
+        tarea = import_by_path(trabajo.tarea)
+        with transaction.atomic():
+            resultado = tarea(trabajo, **json.loads(trabajo.parametros))
+        estado, progreso, mensaje = 'Terminado', 100, 'Trabajo terminado'
+    except TrabajoCancelado:
+        estado, progreso, mensaje = 'Cancelado', trabajo.progreso, 'Trabajo cancelado'
+    except Exception as error:
+        estado, progreso, mensaje = 'Error', trabajo.progreso, force_text(error) or error.__class__.__name__
+    finally:
+        cerrar_conexion_avance()
+    Trabajo.objects.filter(id=trabajo.id).update(estado=estado, progreso=progreso, mensaje=mensaje[:300], fecha_fin=timezone.now(),
+                                                 resultado='' if resultado is None else json.dumps(resultado), archivo=trabajo.archivo.name or '')
+    trabajo.estado, trabajo.progreso, trabajo.mensaje = estado, progreso, mensaje[:300]
+    return trabajo
+
+def procesar_pendientes():
+
+    """ Ejecuta en el proceso actual los trabajos pendientes, hasta vaciar la cola.
+
+    @rtype: entero.
+    @return: Cantidad de trabajos ejecutados.
+
+    @author: Juana Maldonado.
+
+    """
+
+    procesados = 0
+    trabajo = tomar_trabajo()
+    while trabajo is not None:
+        ejecutar_trabajo(trabajo)
+        procesados = procesados + 1
+        trabajo = tomar_trabajo()
+    return procesados
+
+def bucle_trabajador(espera):
+
+    """ Ciclo de cada proceso de procesar_trabajos: ejecuta los trabajos pendientes y, con la cola vacia,
+    espera la cantidad de segundos indicada antes de volver a consultarla. Cualquier error fuera de las
+    tareas (por ejemplo, si se pierde la conexion con la base de datos) se registra en el log, se cierran
+    las conexiones y se reintenta en el siguiente ciclo, de modo que el proceso no termina.
+
+    @author: Juana Maldonado.
+
+    """
+
+    while True:
+        try:
+            procesar_pendientes()
+        except Exception:
+            logger.exception('Error al procesar la cola de trabajos')
+            cerrar_conexion_avance()
+            connection.close()
+        time.sleep(espera)
+
+def pedir_cancelacion(id_trabajo):
+
+    """ Cancela un trabajo pendiente o pide a la tarea en ejecucion que se interrumpa en su proximo avance.
+
+    @rtype: booleano.
+    @return: False si el trabajo ya habia terminado.
+
+    @author: Juana Maldonado.
+
+    """
+
+    if Trabajo.objects.filter(id=id_trabajo, estado='Pendiente').update(estado='Cancelado', cancelar=True, mensaje='Trabajo cancelado', fecha_fin=timezone.now()):
+        return True
+    return bool(Trabajo.objects.filter(id=id_trabajo, estado='En Ejecucion').update(cancelar=True))
+
+def recuperar_trabajos():
+
+    """ Devuelve a la cola los trabajos que quedaron en ejecucion porque su proceso se detuvo. Solo debe
+    usarse cuando no hay otros procesos de procesar_trabajos en ejecucion.
+
+    @rtype: entero.
+    @return: Cantidad de trabajos devueltos a la cola.
+
+    @author: Juana Maldonado.
+
+    """
+
+    return Trabajo.objects.filter(estado='En Ejecucion').update(estado='Pendiente', progreso=0, proceso=None, fecha_inicio=None)
+
+def trabajos_interrumpidos(pid):
+
+    """ Da por terminados con error los trabajos que estaba ejecutando un proceso que se detuvo. No se devuelven
+    a la cola porque el mismo trabajo podria volver a detener al proceso que lo tome.
+
+    @type pid: entero.
+    @param pid: Identificador del proceso detenido.
+
+    @rtype: entero.
+    @return: Cantidad de trabajos interrumpidos.
+
+    @author: Juana Maldonado.
+
+    """
+
+    return Trabajo.objects.filter(estado='En Ejecucion', proceso=pid).update(estado='Error', mensaje='El proceso que ejecutaba el trabajo se detuvo', fecha_fin=timezone.now())
@@ -0,0 +1,63 @@
+import time
+from multiprocessing import Process
+from optparse import make_option
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from aplicaciones.trabajos.ejecucion import bucle_trabajador, procesar_pendientes, recuperar_trabajos, trabajos_interrumpidos
+
+""" Segundos entre cada revision de los procesos en ejecucion """
+REVISION_PROCESOS = 5
+
+class Command(BaseCommand):
+    
+    """ Inicia los procesos que ejecutan los trabajos encolados (importaciones y exportaciones largas)
+    fuera de las solicitudes web. La cola es la tabla de trabajos, por lo que no hace falta otro servicio.
+    Con --una-vez ejecuta los trabajos pendientes en el proceso actual y termina, para usarlo desde cron.
+    Con --recuperar devuelve a la cola los trabajos que quedaron en ejecucion por un proceso detenido.
+    Si un proceso termina se inicia otro en su lugar y el trabajo que estaba ejecutando queda con error.
+    
+    Uso: python manage.py procesar_trabajos [--procesos=N] [--espera=SEGUNDOS] [--una-vez] [--recuperar]
+    """
+    
+    help = 'Ejecuta los trabajos encolados con un grupo de procesos.'
+    option_list = BaseCommand.option_list + (
+        make_option('--procesos', action='store', type='int', dest='procesos', default=2,
+                    help='Cantidad de procesos que ejecutan trabajos.'),
+        make_option('--espera', action='store', type='float', dest='espera', default=2.0,
+                    help='Segundos de espera entre consultas con la cola vacia.'),
+        make_option('--una-vez', action='store_true', dest='una_vez', default=False,
+                    help='Ejecuta los trabajos pendientes y termina.'),
+        make_option('--recuperar', action='store_true', dest='recuperar', default=False,
+                    help='Devuelve a la cola los trabajos interrumpidos. Usar solo sin otros procesos en ejecucion.'),
+    )
+    
+    def handle(self, *args, **options):
+        if options['procesos'] < 1:
+            raise CommandError('La cantidad de procesos debe ser mayor a cero.')
+        if options['recuperar']:
+            self.stdout.write('%s trabajos devueltos a la cola' % recuperar_trabajos())
+        if options['una_vez']:
+            self.stdout.write('%s trabajos ejecutados' % procesar_pendientes())
+            return
+        #Cada proceso abre su propia conexion a la base de datos
+        connection.close()
+        procesos = [self.iniciar_proceso(options['espera']) for numero in range(options['procesos'])]
+        self.stdout.write('%s procesos iniciados' % len(procesos))
+        try:
+            while True:
+                for numero, proceso in enumerate(procesos):
+                    if not proceso.is_alive():
+                        proceso.join()
+                        trabajos_interrumpidos(proceso.pid)
+                        connection.close()
+                        procesos[numero] = self.iniciar_proceso(options['espera'])
+                        self.stderr.write('El proceso %s termino con codigo %s, se inicio el proceso %s' % (proceso.pid, proceso.exitcode, procesos[numero].pid))
+                time.sleep(REVISION_PROCESOS)
+        except KeyboardInterrupt:
+            for proceso in procesos:
+                proceso.terminate()
+
+    def iniciar_proceso(self, espera):
+        proceso = Process(target=bucle_trabajador, args=(espera,))
+        proceso.start()
+        return proceso
@@ -0,0 +1,54 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+# Create your models here.
+
+class Trabajo(models.Model):
+    
+    """ El modelo Trabajo describe una operacion larga (importar un proyecto o una fase, generar una
+    exportacion) que se ejecuta fuera de la solicitud web. La tabla funciona como cola: los procesos
+    lanzados con procesar_trabajos toman los trabajos pendientes en orden de llegada.
+    Los campos que contiene el modelo son:
+    nombre: descripcion del trabajo para mostrar al usuario.
+    tarea: ruta de la funcion que ejecuta el trabajo, por ejemplo aplicaciones.proyectos.tareas.importar_proyecto.
+    parametros: argumentos de la tarea en JSON.
+    estado: Pendiente, En Ejecucion, Terminado, Error o Cancelado.
+    progreso: porcentaje completado, de 0 a 100.
+    mensaje: ultimo mensaje de avance o de error.
+    resultado: valor devuelto por la tarea en JSON.
+    archivo: archivo generado por la tarea, si lo hay.
+    cancelar: indica que el usuario pidio cancelar un trabajo en ejecucion.
+    usuario: usuario que encolo el trabajo.
+    proceso: pid del proceso que lo ejecuta.
+    
+    @author: Juana Maldonado
+    """
+    
+    ESTADOS_TRABAJO = (
+        ('Pendiente', 'Pendiente'),
+        ('En Ejecucion', 'En Ejecucion'),
+        ('Terminado', 'Terminado'),
+        ('Error', 'Error'),
+        ('Cancelado', 'Cancelado'),
+    )
+    
+    nombre = models.CharField(max_length=100)
+    tarea = models.CharField(max_length=100)
+    parametros = models.TextField(default='{}')
+    estado = models.CharField(max_length=15, choices=ESTADOS_TRABAJO, default='Pendiente')
+    progreso = models.IntegerField(default=0)
+    mensaje = models.CharField(max_length=300, blank=True)
+    resultado = models.TextField(blank=True)
+    archivo = models.FileField(upload_to='trabajos', null=True, blank=True)
+    cancelar = models.BooleanField(default=False)
+    usuario = models.ForeignKey(User, null=True)
+    proceso = models.IntegerField(null=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True)
+    fecha_fin = models.DateTimeField(null=True)
+    
+    def __unicode__ (self):
+        return self.nombre
+    
+    def terminado(self):
+        return self.estado in ('Terminado', 'Error', 'Cancelado')
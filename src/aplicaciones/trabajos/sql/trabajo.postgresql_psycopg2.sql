@@ -0,0 +1,3 @@
+-- Indices de Trabajo. Se crean al crear la tabla con syncdb; en bases existentes ejecutar "python manage.py crear_indices"
+-- Cola de trabajos pendientes, en orden de llegada, para procesar_trabajos
+CREATE INDEX IF NOT EXISTS trabajos_trabajo_pendientes ON trabajos_trabajo (id) WHERE estado = 'Pendiente';
@@ -0,0 +1,147 @@
+import json
+from datetime import date
+from StringIO import StringIO
+from django.test import TestCase, TransactionTestCase
+from django.test.client import RequestFactory
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from aplicaciones.proyectos.models import Proyectos
+from aplicaciones.relaciones.views import generar_matriz
+from .models import Trabajo
+from .ejecucion import encolar, avanzar, tomar_trabajo, ejecutar_trabajo, procesar_pendientes, pedir_cancelacion, trabajos_interrumpidos
+from .views import consultar_trabajo, estado_trabajo, cancelar_trabajo, descargar_trabajo
+
+def tarea_sumar(trabajo, a, b):
+    avanzar(trabajo, 50, 'Sumando')
+    return {'suma': a + b}
+
+def tarea_fallar(trabajo):
+    Proyectos.objects.create(nombre='Proyecto Fallido', fecha_inicio=date(2014, 4, 17), duracion=1)
+    raise ValueError('Fallo de prueba')
+
+def tarea_cancelable(trabajo, nombre):
+    Proyectos.objects.create(nombre=nombre, fecha_inicio=date(2014, 4, 17), duracion=1)
+    avanzar(trabajo, 50, 'Proyecto creado')
+
+def tarea_archivo(trabajo):
+    trabajo.archivo.save('prueba_trabajo.txt', ContentFile('contenido de prueba'), save=False)
+
+class test_trabajos(TestCase):
+
+    def setUp(self):
+        """ Inicializamos la variable factory que posteriormente nos permitira cargar
+            un request para utilizarlo en las vista.
+        """
+        self.factory = RequestFactory()
+        self.usuario = User.objects.create_user('trabajador', 'trabajador@sicp.com', 'trabajador')
+        self.otro = User.objects.create_user('otro', 'otro@sicp.com', 'otro')
+
+    def test_cola(self):
+        """ Los trabajos se ejecutan en orden de llegada y guardan su resultado o su error; los cambios de
+            una tarea que falla se deshacen.
+        """
+        primero = encolar('aplicaciones.trabajos.tests.tarea_sumar', {'a': 2, 'b': 3}, 'Sumar', self.usuario)
+        segundo = encolar('aplicaciones.trabajos.tests.tarea_fallar', {}, 'Fallar', self.usuario)
+        self.assertEqual(tomar_trabajo().id, primero.id)
+        Trabajo.objects.filter(id=primero.id).update(estado='Pendiente')
+
+        salida = StringIO()
+        call_command('procesar_trabajos', una_vez=True, stdout=salida)
+        self.assertIn('2 trabajos ejecutados', salida.getvalue())
+        primero = Trabajo.objects.get(id=primero.id)
+        self.assertEqual((primero.estado, primero.progreso, json.loads(primero.resultado)), ('Terminado', 100, {'suma': 5}))
+        segundo = Trabajo.objects.get(id=segundo.id)
+        self.assertEqual((segundo.estado, segundo.mensaje), ('Error', 'Fallo de prueba'))
+        self.assertFalse(Proyectos.objects.filter(nombre='Proyecto Fallido').exists())
+        self.assertIsNone(tomar_trabajo())
+        print 'Test de la cola de trabajos ejecutado exitosamente.'
+
+    def test_trabajos_interrumpidos(self):
+        """ Los trabajos de un proceso que se detuvo quedan con error y los de otros procesos no se tocan. """
+        primero = encolar('aplicaciones.trabajos.tests.tarea_sumar', {'a': 1, 'b': 1}, 'Sumar', self.usuario)
+        segundo = encolar('aplicaciones.trabajos.tests.tarea_sumar', {'a': 2, 'b': 2}, 'Sumar', self.usuario)
+        Trabajo.objects.filter(id=primero.id).update(estado='En Ejecucion', proceso=1000001)
+        Trabajo.objects.filter(id=segundo.id).update(estado='En Ejecucion', proceso=1000002)
+        self.assertEqual(trabajos_interrumpidos(1000001), 1)
+        self.assertEqual(Trabajo.objects.get(id=primero.id).estado, 'Error')
+        self.assertEqual(Trabajo.objects.get(id=segundo.id).estado, 'En Ejecucion')
+        print 'Test de trabajos interrumpidos ejecutado exitosamente.'
+
+    def test_estado_trabajo(self):
+        """ El estado se consulta en JSON, el archivo generado se descarga y solo el usuario que encolo el
+            trabajo puede verlo.
+        """
+        trabajo = encolar('aplicaciones.trabajos.tests.tarea_archivo', {}, 'Archivo', self.usuario)
+        request = self.factory.get('/trabajos/%s/estado/' % trabajo.id)
+        request.user = self.usuario
+        datos = json.loads(estado_trabajo(request, trabajo.id).content)
+        self.assertEqual((datos['estado'], datos['terminado'], datos['archivo']), ('Pendiente', False, None))
+
+        procesar_pendientes()
+        datos = json.loads(estado_trabajo(request, trabajo.id).content)
+        self.assertEqual((datos['estado'], datos['terminado']), ('Terminado', True))
+        request = self.factory.get(datos['archivo'])
+        request.user = self.usuario
+        response = descargar_trabajo(request, trabajo.id)
+        self.assertEqual(''.join(response.streaming_content), 'contenido de prueba')
+        response = consultar_trabajo(request, trabajo.id)
+        self.assertContains(response, 'Terminado')
+
+        request.user = self.otro
+        self.assertRaises(PermissionDenied, estado_trabajo, request, trabajo.id)
+        Trabajo.objects.get(id=trabajo.id).archivo.delete(save=False)
+        print 'Test de consultar el estado de un trabajo ejecutado exitosamente.'
+
+    def test_generar_matriz(self):
+        """ La matriz de trazabilidad se genera en segundo plano y queda como archivo del trabajo. """
+        proyecto = Proyectos.objects.create(nombre='Proyecto Matriz', fecha_inicio=date(2014, 4, 17), duracion=1)
+        request = self.factory.get('/adm_proyectos/gestionar/%s/matriz/csv/generar/' % proyecto.id)
+        request.user = self.usuario
+        self.assertEqual(generar_matriz(request, proyecto.id, 'csv').status_code, 405)
+        self.assertFalse(Trabajo.objects.exists())
+        request = self.factory.post('/adm_proyectos/gestionar/%s/matriz/csv/generar/' % proyecto.id)
+        request.user = self.usuario
+        response = generar_matriz(request, proyecto.id, 'csv')
+        trabajo = Trabajo.objects.get(usuario=self.usuario)
+        self.assertEqual((response.status_code, response['Location']), (302, '/trabajos/%s/' % trabajo.id))
+        procesar_pendientes()
+        trabajo = Trabajo.objects.get(usuario=self.usuario)
+        self.assertEqual((trabajo.estado, json.loads(trabajo.resultado)), ('Terminado', {'items': 0}))
+        trabajo.archivo.open('rb')
+        self.assertTrue(trabajo.archivo.read().startswith('Id,Item,Fase'))
+        trabajo.archivo.close()
+        trabajo.archivo.delete(save=False)
+        print 'Test de generar la matriz en segundo plano ejecutado exitosamente.'
+
+class test_cancelar_trabajos(TransactionTestCase):
+
+    """ El avance de los trabajos se registra con una conexion propia, que solo ve los trabajos confirmados,
+        por lo que estas pruebas no pueden ejecutarse dentro de una transaccion.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.usuario = User.objects.create_user('trabajador', 'trabajador@sicp.com', 'trabajador')
+
+    def test_cancelar(self):
+        """ Un trabajo pendiente cancelado no se ejecuta y uno en ejecucion se interrumpe en su proximo
+            avance, deshaciendo su transaccion.
+        """
+        pendiente = encolar('aplicaciones.trabajos.tests.tarea_sumar', {'a': 1, 'b': 1}, 'Sumar', self.usuario)
+        self.assertTrue(pedir_cancelacion(pendiente.id))
+        self.assertEqual(procesar_pendientes(), 0)
+        self.assertEqual(Trabajo.objects.get(id=pendiente.id).estado, 'Cancelado')
+        self.assertFalse(pedir_cancelacion(pendiente.id))
+
+        encolar('aplicaciones.trabajos.tests.tarea_cancelable', {'nombre': 'Proyecto Cancelado'}, 'Cancelable', self.usuario)
+        trabajo = tomar_trabajo()
+        request = self.factory.post('/trabajos/%s/cancelar/' % trabajo.id)
+        request.user = self.usuario
+        response = cancelar_trabajo(request, trabajo.id)
+        self.assertEqual(response.status_code, 302)
+        ejecutar_trabajo(trabajo)
+        self.assertEqual(Trabajo.objects.get(id=trabajo.id).estado, 'Cancelado')
+        self.assertFalse(Proyectos.objects.filter(nombre='Proyecto Cancelado').exists())
+        print 'Test de cancelar trabajos ejecutado exitosamente.'
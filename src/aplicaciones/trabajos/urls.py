@@ -0,0 +1,11 @@
+from django.conf.urls import patterns, url
+from .views import consultar_trabajo, estado_trabajo, cancelar_trabajo, descargar_trabajo
+
+urlpatterns = patterns('',
+                       
+        url(r'^trabajos/(?P<id_trabajo>\d+)/$', consultar_trabajo),
+        url(r'^trabajos/(?P<id_trabajo>\d+)/estado/$', estado_trabajo),
+        url(r'^trabajos/(?P<id_trabajo>\d+)/cancelar/$', cancelar_trabajo),
+        url(r'^trabajos/(?P<id_trabajo>\d+)/descargar/$', descargar_trabajo),
+
+)
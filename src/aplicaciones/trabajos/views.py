@@ -0,0 +1,122 @@
+import json
+import os
+from django.shortcuts import render_to_response
+from django.template import RequestContext
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.core.exceptions import PermissionDenied
+from django.core.servers.basehttp import FileWrapper
+from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+from .models import Trabajo
+from .ejecucion import pedir_cancelacion
+
+def obtener_trabajo(request, id_trabajo):
+    
+    """ Devuelve el trabajo si lo encolo el usuario del request o si este es el administrador. """
+    
+    trabajo = Trabajo.objects.get(id=id_trabajo)
+    if trabajo.usuario_id != request.user.id and request.user.id != 1:
+        raise PermissionDenied
+    return trabajo
+
+def datos_trabajo(trabajo):
+    return {'id':trabajo.id, 'nombre':trabajo.nombre, 'estado':trabajo.estado, 'progreso':trabajo.progreso, 'mensaje':trabajo.mensaje,
+            'terminado':trabajo.terminado(), 'resultado':json.loads(trabajo.resultado) if trabajo.resultado else None,
+            'archivo':'/trabajos/%s/descargar/' % trabajo.id if trabajo.archivo else None}
+
+@login_required(login_url='/login/')
+def consultar_trabajo (request, id_trabajo):
+    
+    """ Recibe un request y el id de un trabajo y muestra su estado, que la pagina actualiza consultando
+    estado_trabajo hasta que el trabajo termina.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista consultar_trabajo.
+    
+    @type id_trabajo: string.
+    @param id_trabajo: Contiene el id del trabajo a consultar.
+    
+    @rtype: django.shortcuts.render_to_response.
+    @return: trabajo.html, donde se muestra el avance del trabajo.
+    
+    @author: Juana Maldonado.
+    
+    """
+    
+    trabajo = obtener_trabajo(request, id_trabajo)
+    ctx = {'trabajo':trabajo}
+    return render_to_response('trabajos/trabajo.html', ctx, context_instance=RequestContext(request))
+
+@login_required(login_url='/login/')
+def estado_trabajo (request, id_trabajo):
+    
+    """ Recibe un request y el id de un trabajo y devuelve en JSON su estado, progreso, mensaje, resultado
+    y la direccion de descarga del archivo generado, si lo hay.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista estado_trabajo.
+    
+    @type id_trabajo: string.
+    @param id_trabajo: Contiene el id del trabajo a consultar.
+    
+    @rtype: django.http.HttpResponse.
+    @return: El estado del trabajo en JSON.
+    
+    @author: Juana Maldonado.
+    
+    """
+    
+    trabajo = obtener_trabajo(request, id_trabajo)
+    return HttpResponse(json.dumps(datos_trabajo(trabajo)), content_type='application/json')
+
+@login_required(login_url='/login/')
+@require_POST
+def cancelar_trabajo (request, id_trabajo):
+    
+    """ Recibe un request y el id de un trabajo, lo cancela si esta pendiente o pide que se interrumpa si
+    esta en ejecucion, y vuelve a la pagina del trabajo.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista cancelar_trabajo.
+    
+    @type id_trabajo: string.
+    @param id_trabajo: Contiene el id del trabajo a cancelar.
+    
+    @rtype: django.http.HttpResponseRedirect.
+    @return: Redireccion a la pagina del trabajo.
+    
+    @author: Juana Maldonado.
+    
+    """
+    
+    trabajo = obtener_trabajo(request, id_trabajo)
+    pedir_cancelacion(trabajo.id)
+    return HttpResponseRedirect('/trabajos/%s/' % trabajo.id)
+
+@login_required(login_url='/login/')
+def descargar_trabajo (request, id_trabajo):
+    
+    """ Recibe un request y el id de un trabajo terminado y descarga el archivo que genero.
+    
+    @type request: django.http.HttpRequest.
+    @param request: Contiene informacion sobre la solicitud web actual que llamo a esta vista descargar_trabajo.
+    
+    @type id_trabajo: string.
+    @param id_trabajo: Contiene el id del trabajo cuyo archivo se descarga.
+    
+    @rtype: django.http.StreamingHttpResponse.
+    @return: El archivo generado, o trabajo.html si el trabajo no genero ninguno.
+    
+    @author: Juana Maldonado.
+    
+    """
+    
+    trabajo = obtener_trabajo(request, id_trabajo)
+    if trabajo.estado != 'Terminado' or not trabajo.archivo:
+        return consultar_trabajo(request, id_trabajo)
+    archivo = trabajo.archivo
+    archivo.open('rb')
+    response = StreamingHttpResponse(FileWrapper(archivo), content_type='application/octet-stream')
+    response['Content-Length'] = archivo.size
+    response['Content-Disposition'] = 'attachment; filename="%s"' % os.path.basename(archivo.name)
+    return response
@@ -50,7 +50,8 @@ INSTALLED_APPS = (
     'aplicaciones.tipoatributo',
     'aplicaciones.tipoitem',
     'aplicaciones.items',
-    'aplicaciones.relaciones'
+    'aplicaciones.relaciones',
+    'aplicaciones.trabajos'
 )
 
 MIDDLEWARE_CLASSES = (
@@ -82,6 +83,22 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/1.6/topics/cache/
+# La cache se guarda en la base de datos para que la compartan todos los procesos del servidor y los
+# de procesar_trabajos: una invalidacion hecha en un proceso se ve en los demas. La tabla se crea con
+# "python manage.py createcachetable sicp_cache".
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'sicp_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
+    }
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/1.6/topics/i18n/
 
@@ -37,6 +37,9 @@ urlpatterns = patterns('',
     
      #""" Incluimos la urls.py de la aplicacion relaciones"""
     url(r'^', include('aplicaciones.relaciones.urls')),
+    
+     #""" Incluimos la urls.py de la aplicacion trabajos"""
+    url(r'^', include('aplicaciones.trabajos.urls')),
 
 
 )
@@ -23,6 +23,46 @@ $(document).on("click", ".fases", function () {
 	document.getElementById("fase").setAttribute("href",'eliminar/'+id);
 });
 
+$(document).on("click", ".relaciones", function () {
+	var id = $(this).data('id');
+	document.getElementById("relacion").setAttribute("href",'eliminar/'+id+'/');
+});
+
+$(document).on("input", ".buscar-lider", function () {
+	var campo = $(this);
+	$.getJSON(campo.data('url'), {q: campo.val()}, function (candidatos) {
+		var lista = $('#' + campo.attr('list')).empty();
+		$.each(candidatos, function (i, candidato) {
+			lista.append($('<option>').attr('value', candidato.username).text(candidato.nombre));
+		});
+	});
+});
+
+$(function () {
+	$('.trabajo').each(function () {
+		var trabajo = $(this);
+		if (trabajo.data('terminado')) {
+			return;
+		}
+		var consultar = function () {
+			$.getJSON(trabajo.data('url'), function (datos) {
+				trabajo.find('.trabajo-estado').text(datos.estado);
+				trabajo.find('.trabajo-progreso').css('width', datos.progreso + '%').text(datos.progreso + '%');
+				trabajo.find('.trabajo-mensaje').text(datos.mensaje);
+				if (datos.terminado) {
+					trabajo.find('.trabajo-cancelar').hide();
+					if (datos.archivo && datos.estado == 'Terminado') {
+						trabajo.find('.trabajo-archivo').attr('href', datos.archivo).show();
+					}
+				} else {
+					setTimeout(consultar, 2000);
+				}
+			});
+		};
+		setTimeout(consultar, 1000);
+	});
+});
+
 $(document).on("click", ".tipoitems", function () {
 	var id = $(this).data('id');
 	document.getElementById("tipoitem").setAttribute("href",'eliminar/'+id);